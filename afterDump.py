@@ -11,27 +11,56 @@ import czescimowyReplace
 import frequencyList
 from statystyka import *
 from klasa import readRCLimit, checkForNewDumps
+from dumpEngine import DumpEngine, Checkpoint
+from parseCache import ParseCache
+from dumpIndex import IndexVisitor
+from pageStore import PageStoreVisitor
+from dumpCatalog import getCatalog
 
 def main():
 
     lastDump = readRCLimit('statystyka')
+    getCatalog().verifyUnchecked() # in the background; checksum() below waits for the new dump
     newDump = checkForNewDumps(lastDump)
     #aTergo.aTergo(lastDump)
 
     if newDump == 1:
         return 0 # new dump not found, do nothing
 
+    elif getCatalog().checksum(newDump) == 'bad':
+        print('New dump (%s) doesn\'t match its checksums, not processing it' % newDump)
+        return 0
+
     else:
         print('Found new dump (%s), processing... (old dump was %s)' % (newDump, lastDump))
-        brakCzesciMowy.brakCzesciMowy(newDump)
-        rzeczownik_rodzaj.rzeczownikRodzaj(newDump)
-        rzeczownik_rodzaj_niepotrzebny.rzeczownikRodzajNiepotrzebny(newDump)
-        fraz.fraz(newDump)
-        czescimowy.czescimowy(newDump)
-        czescimowyReplace.czescimowyReplace()
-        frequencyList.frequencyList(newDump)
-        missingLangs.missingLangs(newDump)
-        statystyka(lastDump, newDump)
+
+        # all the lists are generated in a single scan of the new dump; if this
+        # script dies, the next run resumes the scan (or skips the steps
+        # already done) from the checkpoint instead of starting over
+        checkpoint = Checkpoint('afterDump-%s' % newDump)
+        cache = ParseCache()
+        engine = DumpEngine(newDump, cache=cache, previous=lastDump, checkpoint=checkpoint)
+        engine.register(brakCzesciMowy.BrakCzesciMowyVisitor())
+        engine.register(rzeczownik_rodzaj.RzeczownikRodzajVisitor())
+        engine.register(rzeczownik_rodzaj_niepotrzebny.RzeczownikRodzajNiepotrzebnyVisitor())
+        engine.register(fraz.FrazVisitor())
+        engine.register(czescimowy.CzescimowyVisitor())
+        engine.register(frequencyList.FrequencyListVisitor())
+        engine.register(missingLangs.MissingLangsVisitor())
+        stats = engine.register(LiczJezykiVisitor())
+        engine.register(IndexVisitor()) # for the ad-hoc searches, see dumpIndex.py
+        engine.register(PageStoreVisitor()) # the scripts run later read the store instead of the bz2 dump
+        engine.run()
+
+        if not checkpoint.stageDone('czescimowyReplace'):
+            czescimowyReplace.czescimowyReplace() # uses output/czescimowy_input.txt written by CzescimowyVisitor
+            checkpoint.markStage('czescimowyReplace')
+        if not checkpoint.stageDone('statystyka'):
+            statystyka(lastDump, newDump, new=stats.statList, cache=cache)
+            checkpoint.markStage('statystyka')
+        cache.prune(newDump) # the new dump will be the old one in the next run
+        cache.close()
+        checkpoint.remove()
 
 
 if __name__ == '__main__':
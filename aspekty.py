@@ -11,7 +11,7 @@ from importsjp import *
 def addAspekt(title):
     # regex fetching all the data needed for the creation of new pages
     re_aspekt = re.compile(r'\'\'czasownik (nie|)przechodni (nie|)dokonany\'\'\s*\(\{\{(n|)dk\}\}( .*?)\)')
-    word = Haslo(title)
+    word = Haslo(title, languages=('polski',))
 
     przech = None # transitive/intransitive
     dk = None # dk = perfective
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# worst case of splitting pages into language sections: the largest pages of
+# a dump (long multi-language pages, Chinese characters...) are split with
+# the regexes Haslo.langs() and LanguageSection() used to run (langs-lang over
+# the page, init-lang, init-langLong and init-headerAndContent over every
+# section) and with languageSectionSpans() and the header line regexes.
+# Checks that both give the same sections and prints the time each took. Usage:
+#
+#   python3 benchmark_langs.py 20170101 [number of pages, 1000 by default]
+
+import heapq
+import re
+import sys
+import time
+from klasa import *
+
+
+def splitRegex(content):
+    #(header, lang, langLong, content) of every section, as before languageSectionSpans()
+    sections = []
+    for text in re.findall(Haslo.regex['langs-lang'], content):
+        s_lang = re.search(LanguageSection.regex['init-lang'], text)
+        s_langLong = re.search(LanguageSection.regex['init-langLong'], text)
+        s_headerAndContent = re.search(LanguageSection.regex['init-headerAndContent'], text)
+        if s_lang and s_langLong and s_headerAndContent:
+            sections.append((s_headerAndContent.group(1).strip(), s_lang.group(3), s_langLong.group(2), s_headerAndContent.group(2)))
+        else:
+            sections.append(None)
+    return sections
+
+def splitSpans(content):
+    sections = []
+    for start, end in languageSectionSpans(content):
+        try: section = LanguageSection(content[start:end])
+        except WrongHeader:
+            sections.append(None)
+        else:
+            sections.append((section.header, section.lang, section.langLong, section.content))
+    return sections
+
+def benchmark(data, number=1000):
+    pages = heapq.nlargest(number, getListFromXML(data, namespaces=(0,)), key=lambda entry: len(entry.text))
+    print('%d largest pages, %d to %d characters' % (len(pages), len(pages[-1].text), len(pages[0].text)))
+
+    different = 0
+    timeRegex = 0.0
+    timeSpans = 0.0
+    slowest = []
+    for entry in pages:
+        start = time.perf_counter()
+        old = splitRegex(entry.text)
+        pageRegex = time.perf_counter() - start
+        timeRegex += pageRegex
+
+        start = time.perf_counter()
+        new = splitSpans(entry.text)
+        pageSpans = time.perf_counter() - start
+        timeSpans += pageSpans
+
+        slowest.append((pageRegex, pageSpans, entry.title))
+        if old != new:
+            different += 1
+            print('different: %s' % entry.title)
+
+    print('%d pages split differently' % different)
+    print('regexes:              %8.2f s' % timeRegex)
+    print('languageSectionSpans: %8.2f s' % timeSpans)
+    if timeSpans:
+        print('speed-up:             %8.2fx' % (timeRegex/timeSpans))
+    print('slowest pages with the regexes:')
+    for pageRegex, pageSpans, title in sorted(slowest, reverse=True)[:10]:
+        print('%-40s %8.4f s %8.4f s' % (title, pageRegex, pageSpans))
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# compares the two ways of splitting language sections into subsections on a
+# whole dump: the regexes from generateRegexp() (one search over the section
+# per subsection, as pola() used to do) and LanguageSection.splitSubSections()
+# (all templates found in one pass). Checks that both give the same
+# subsections and prints the time each of them took. Usage:
+#
+#   python3 benchmark_pola.py 20170101
+
+import collections
+import re
+import sys
+import time
+from klasa import *
+
+
+def splitRegex(section, order):
+    #the old pola(): returns the subsections and False if one that isn't optional is missing
+    subSections = collections.OrderedDict()
+    for sect in order:
+        s = re.search(sect.regex, section.content)
+        if s:
+            subSections[sect.name] = s.group(1)
+        elif sect.optional:
+            subSections[sect.name] = ''
+        else:
+            return subSections, False
+    return subSections, True
+
+def benchmark(data):
+    sections = 0
+    different = 0
+    timeRegex = 0.0
+    timeSplit = 0.0
+    for entry in getListFromXML(data, namespaces=(0,)):
+        try: word = Haslo(entry)
+        except sectionsNotFound:
+            continue
+        except WrongHeader:
+            continue
+        if word.type != 3:
+            continue
+        for section in word.listLangs:
+            if section.type != 1:
+                continue
+            try: order = LanguageSection.sectionOrder[section.lang]
+            except KeyError:
+                order = LanguageSection.sectionOrder['default']
+            sections += 1
+
+            start = time.perf_counter()
+            subSections, ok = splitRegex(section, order)
+            timeRegex += time.perf_counter() - start
+
+            start = time.perf_counter()
+            okSplit = section.splitSubSections(order)
+            timeSplit += time.perf_counter() - start
+
+            if ok != okSplit or subSections != collections.OrderedDict((name, section.subSections[name].text) for name in section.subSections):
+                different += 1
+                print('different: %s (%s)' % (entry.title, section.lang))
+
+    print('%d sections, %d split differently' % (sections, different))
+    print('regexes:          %8.2f s' % timeRegex)
+    print('splitSubSections: %8.2f s' % timeSplit)
+    if timeSplit:
+        print('speed-up:         %8.2fx' % (timeRegex/timeSplit))
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1])
@@ -7,50 +7,47 @@ import re
 from pywikibot import xmlreader
 import collections
 from klasa import *
+from dumpEngine import DeltaVisitor, runVisitors
+from mapReduce import ListDict
+
+class BrakCzesciMowyVisitor(DeltaVisitor):
+
+    namespaces = (0,)
+
+    def begin(self, data):
+        self.data_slownie = data[6] + data[7] + '.' + data[4] + data[5] + '.' + data[0] + data[1] + data[2] + data[3]
+        wikt = pywikibot.Site('pl', 'wiktionary')
+        self.outputPage = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/części_mowy')
+        self.LangsMediaWiki = getAllLanguages()
+
+    def pageResult(self, entry, word):
+        #[title, languages without parts of speech]
+        if word is not None and word.type == 3:
+            langs = [lang.lang for lang in word.listLangs if lang.type == 5]
+            if langs:
+                return [word.title, langs]
+
+    def finish(self):
+        self.notFoundList = ListDict()
+        with open('output/missing_pos.txt', encoding='utf-8', mode='w') as f:
+            for pageId, (title, langs) in self.results():
+                for lang in langs:
+                    self.notFoundList[lang].append(title)
+                    f.write(title + '\n')
+
+        text = 'Do poniższych haseł nie wpisano, jakimi są częściami mowy - jeśli potrafisz, zrób to. Ostatnia aktualizacja wg zrzutu bazy danych z %s.\n' % (self.data_slownie)
+        for a in self.LangsMediaWiki:
+            if self.notFoundList['%s' % a.shortName]:
+                text += '== %s ==' % (a.longName)
+                for b in self.notFoundList['%s' % a.shortName]:
+                    text += '\n*[[%s]]' % (b)
+                text += '\n'
+
+        #with open('output/missing_pos.txt', encoding='utf-8', mode='w') as f:
+        #    f.write(text)
+
+        self.outputPage.text = text
+        self.outputPage.save(comment="Aktualizacja listy", botflag=False)
 
 def brakCzesciMowy(data):
-
-    data_slownie = data[6] + data[7] + '.' + data[4] + data[5] + '.' + data[0] + data[1] + data[2] + data[3]
-    lista_stron = getListFromXML(data)
-    wikt = pywikibot.Site('pl', 'wiktionary')
-    outputPage = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/części_mowy')
-
-    tempLangs = []
-
-    notFound = []
-    text = 'Do poniższych haseł nie wpisano, jakimi są częściami mowy - jeśli potrafisz, zrób to. Ostatnia aktualizacja wg zrzutu bazy danych z %s.\n' % (data_slownie)
-    notFoundList = collections.defaultdict(list)
-
-    LangsMediaWiki = getAllLanguages()
-
-    with open('output/missing_pos.txt', encoding='utf-8', mode='w') as f:
-        for a in lista_stron:
-            try: word = Haslo(a)
-            except notFromMainNamespace:
-                pass
-            except sectionsNotFound:
-                pass
-            except WrongHeader:
-                pass
-            else:
-                if word.type == 3:
-                    for lang in word.listLangs:
-                        if lang.type != 2 and lang.type != 7:
-                            lang.pola()
-                            if lang.type == 5:
-                                notFoundList['%s' % lang.lang].append(lang.title)
-                                #print(lang.title)
-                                f.write(lang.title + '\n')
-
-    for a in LangsMediaWiki:
-        if notFoundList['%s' % a.shortName]:
-            text += '== %s ==' % (a.longName)
-            for b in notFoundList['%s' % a.shortName]:
-                text += '\n*[[%s]]' % (b)
-            text += '\n'
-
-    #with open('output/missing_pos.txt', encoding='utf-8', mode='w') as f:
-    #    f.write(text)
-
-    outputPage.text = text
-    outputPage.save(comment="Aktualizacja listy", botflag=False)
+    runVisitors(data, [BrakCzesciMowyVisitor()])
@@ -42,29 +42,21 @@ def czescimowyReplace():
     #    print replaceText[0]
     #    print replaceText[1]
 
-    for line in inp:
-        if line:
-            try: h = Haslo(line)
-            except sectionsNotFound:
-                pass
-            except pywikibot.InvalidTitle:
-                pass
-            except AttributeError:
-                pass
-            else:
-                #print h.title
-                if h.type == 3:
-                    changed = 0
-                    for c in h.listLangs:
-                        c.pola()
-                        if c.type == 1:
-                            for d in c.znaczeniaDetail:
-                                temp = d[0]
-                                for replaceText in replaceList:
-                                    d[0] = d[0].replace(replaceText[0], replaceText[1])
-                                    if d[0] != temp:
-                                        c.saveChanges()
-                                if d[0] != temp:
-                                    changed = 1
-                    if changed:
-                        h.push(myComment='automatyczne porządkowanie części mowy wg [[Wikipedysta:AlkamidBot/części_mowy/zamiana]]')
+    # the pages are fetched 50 at a time; invalid titles come back with type 2
+    for h in Haslo.fromTitles(line for line in inp if line):
+        #print h.title
+        if h.type == 3:
+            changed = 0
+            for c in h.listLangs:
+                c.pola()
+                if c.type == 1:
+                    for d in c.znaczeniaDetail:
+                        temp = d[0]
+                        for replaceText in replaceList:
+                            d[0] = d[0].replace(replaceText[0], replaceText[1])
+                            if d[0] != temp:
+                                c.saveChanges()
+                        if d[0] != temp:
+                            changed = 1
+            if changed:
+                h.push(myComment='automatyczne porządkowanie części mowy wg [[Wikipedysta:AlkamidBot/części_mowy/zamiana]]')
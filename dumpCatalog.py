@@ -0,0 +1,178 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# catalog of the dumps in config.path['dumps']. The dumps folder is listed
+# once per process and what is known about every dump (files, sizes, page
+# count, checksum) is kept in output/dump_catalog.json, so that finding the
+# latest, previous or next dump doesn't stat the folder day by day.
+# Checksums are verified in background threads started by afterDump (hashing
+# a dump takes minutes, so other scripts don't start it), so a broken
+# download is known before afterDump starts on it.
+
+import bisect
+import bz2
+import hashlib
+import json
+import os
+import re
+import threading
+import config
+
+re_dumpDir = re.compile(r'^\d{8}$')
+
+class DumpCatalog():
+    """
+    Args:
+        path (str): folder with one subfolder per dump (YYYYMMDD), default config.path['dumps']
+        filename (str): json file the metadata is cached in
+        verify (bool): start checking new dumps in the background right away (see verifyUnchecked())
+
+    Every dump is a dict:
+        date, articles, multistream, multistreamIndex (paths, None if the file
+        is missing), files (name -> size), size (bytes), pages (number of pages,
+        from the multistream index; None until checked) and checksum: None (not
+        checked yet), 'ok', 'bad' or 'missing' (no sha1sums/md5sums file)
+    """
+
+    def __init__(self, path=None, filename=None, verify=True):
+        if path is None:
+            path = config.path['dumps']
+        if filename is None:
+            filename = '%soutput/dump_catalog.json' % config.path['scripts']
+        self.path = path
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.threads = {}
+        self.dumps = {}
+        if os.path.isfile(filename):
+            with open(filename, encoding='utf-8') as f:
+                self.dumps = json.load(f)
+        self.scan()
+        if verify:
+            self.verifyUnchecked()
+
+    def scan(self):
+        #one listing of the dumps folder; only new or changed dumps are looked into
+        found = {}
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                folder = os.path.join(self.path, name)
+                if re_dumpDir.match(name) and os.path.isdir(folder):
+                    files = dict((f, os.path.getsize(os.path.join(folder, f))) for f in os.listdir(folder))
+                    old = self.dumps.get(name)
+                    if old is not None and old['files'] == files:
+                        found[name] = old
+                    else:
+                        found[name] = self.describe(name, files)
+        with self.lock:
+            self.dumps = found
+            self.dates = sorted(found)
+            self.positions = dict((date, i) for i, date in enumerate(self.dates))
+            self.save()
+
+    def describe(self, date, files):
+        folder = os.path.join(self.path, date)
+        def path(name):
+            return os.path.join(folder, name) if name in files else None
+        return {'date': date,
+                'articles': path('plwiktionary-%s-pages-articles.xml.bz2' % date),
+                'multistream': path('plwiktionary-%s-pages-articles-multistream.xml.bz2' % date),
+                'multistreamIndex': path('plwiktionary-%s-pages-articles-multistream-index.txt.bz2' % date),
+                'files': files,
+                'size': sum(files.values()),
+                'pages': None,
+                'checksum': None}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with open(self.filename, encoding='utf-8', mode='w') as f:
+            json.dump(self.dumps, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    def get(self, date):
+        #metadata of the dump from `date`, None if there's no such dump
+        return self.dumps.get(date)
+
+    def latest(self, file='articles'):
+        #date of the newest dump that has the given file ('articles', 'multistream'...), None if there are none;
+        #folders of unfinished downloads or of other wikis' dumps are skipped
+        for date in reversed(self.dates):
+            if self.dumps[date][file] is not None:
+                return date
+        return None
+
+    def previous(self, date):
+        #date of the dump before `date` (which has to be in the catalog), None if it's the first one
+        i = self.positions[date]
+        return self.dates[i-1] if i > 0 else None
+
+    def next(self, date):
+        #date of the first dump newer than `date` (which doesn't have to be in the catalog), None if there's none
+        i = bisect.bisect_right(self.dates, date)
+        return self.dates[i] if i < len(self.dates) else None
+
+    def verifyUnchecked(self):
+        #start checking all dumps that haven't been checked yet in the background
+        for date in self.dates:
+            if self.dumps[date]['checksum'] is None:
+                self.verify(date)
+
+    def verify(self, date):
+        #start checking the dump in the background; checksum() waits for the result
+        if date not in self.threads:
+            thread = threading.Thread(target=self.check, args=(date,), daemon=True)
+            self.threads[date] = thread
+            thread.start()
+
+    def checksum(self, date):
+        """
+        Returns:
+            str: 'ok', 'bad' or 'missing' (there's nothing to check the files against)
+        """
+        if self.dumps[date]['checksum'] is None:
+            self.verify(date)
+            self.threads[date].join()
+        return self.dumps[date]['checksum']
+
+    def check(self, date):
+        dump = self.dumps[date]
+        folder = os.path.join(self.path, date)
+        status = 'missing'
+        for listName, algorithm in (('sha1sums', hashlib.sha1), ('md5sums', hashlib.md5)):
+            listFile = os.path.join(folder, 'plwiktionary-%s-%s.txt' % (date, listName))
+            if os.path.isfile(listFile):
+                status = 'ok'
+                with open(listFile, encoding='utf-8') as f:
+                    for line in f:
+                        expected, name = line.split()
+                        if name in dump['files'] and fileHash(os.path.join(folder, name), algorithm) != expected:
+                            status = 'bad'
+                break
+
+        pages = None
+        if dump['multistreamIndex'] is not None and status != 'bad':
+            with bz2.open(dump['multistreamIndex'], mode='rb') as f:
+                pages = sum(1 for line in f)
+
+        with self.lock:
+            dump['checksum'] = status
+            dump['pages'] = pages
+            self.save()
+
+def fileHash(filename, algorithm):
+    h = algorithm()
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(1<<20)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+catalog = None
+
+def getCatalog():
+    #the catalog of config.path['dumps'], scanned once per process; checksums are only verified when asked for
+    #(verifyUnchecked(), checksum())
+    global catalog
+    if catalog is None:
+        catalog = DumpCatalog(verify=False)
+    return catalog
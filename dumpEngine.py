@@ -0,0 +1,422 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# single-pass dump engine: every page of the dump is decompressed and parsed
+# once and the parsed Haslo is handed over to all registered visitors
+
+import time
+import collections
+import json
+import os
+import pickle
+import config
+import dumpReader
+from klasa import *
+from mapReduce import PageResults
+
+class DumpVisitor():
+    """Base class for the plugins run by DumpEngine.
+
+    A visitor gets begin() once before the scan (this is where it fetches
+    everything it needs from the wiki), visit() for every page in the dump and
+    finish() once after the scan (where it writes files and saves pages).
+
+    visit() receives the raw xml entry and the parsed Haslo. The Haslo is None
+    if the parser raised sectionsNotFound or WrongHeader for this page. For
+    pages of type 3 every LanguageSection has already been through pola(),
+    so visitors must not call it again and should not modify the shared
+    parse objects.
+
+    A visitor that only needs some namespaces sets `namespaces` (e.g. (0,));
+    if none of the registered visitors needs the others, they are skipped on
+    the raw bytes of the dump, before parsing. A visitor that only needs the
+    raw entry sets `parsed = False`; pages no other visitor wants are then
+    not parsed at all and it gets None for word.
+
+    Results should be kept in mergeable accumulators (mapReduce.CountDict,
+    ListDict etc.), named in `accumulators` and created by newAccumulators(),
+    which begin() calls. Such a visitor can also be run on shards of the dump
+    in parallel, see mapReduce.runParallel().
+    """
+
+    name = None
+    namespaces = None
+    parsed = True
+    accumulators = ()
+
+    def begin(self, data):
+        pass
+
+    def newAccumulators(self):
+        pass
+
+    def visit(self, entry, word):
+        pass
+
+    def finish(self):
+        pass
+
+    def getName(self):
+        if self.name:
+            return self.name
+        return type(self).__name__
+
+    def __getstate__(self):
+        #visitors are copied to the mapReduce workers without the pywikibot pages they save in finish()
+        return dict((key, value) for key, value in self.__dict__.items() if not isinstance(value, pywikibot.Page))
+
+
+class DeltaVisitor(DumpVisitor):
+    """A visitor that can be updated with the pages changed since the previous dump.
+
+    Instead of accumulating in visit(), a delta visitor returns what a page
+    contributes to its list from pageResult(entry, word) (anything that can be
+    saved as json, None if nothing). The results are kept per page id and saved
+    after the run together with the date of the dump, so in the next run the
+    engine only calls visit() for added and changed pages and remove() for
+    deleted ones. finish() builds the list from results().
+
+    pageResult() must depend only on the page itself - anything fetched from
+    the wiki in begin() (lists of allowed or excluded items etc.) has to be
+    applied in finish(), otherwise results of unchanged pages go stale.
+    """
+
+    delta = True
+    accumulators = ('pages',)
+
+    def newAccumulators(self):
+        self.pages = PageResults()
+
+    def pageResult(self, entry, word):
+        return None
+
+    def visit(self, entry, word):
+        result = self.pageResult(entry, word)
+        if result:
+            self.pages[entry.id] = result
+        else:
+            self.pages.pop(entry.id, None)
+
+    def remove(self, pageId):
+        self.pages.pop(pageId, None)
+
+    def results(self):
+        #(page id, result) in dump order
+        for pageId in sorted(self.pages, key=int):
+            yield pageId, self.pages[pageId]
+
+    def stateFilename(self):
+        return '%s%s.json' % (deltaPath(), self.getName())
+
+    def loadState(self, previous):
+        #returns True if the saved results are those of the previous dump, i.e. the delta can be applied to them
+        self.newAccumulators()
+        if previous is None or not os.path.isfile(self.stateFilename()):
+            return False
+        with open(self.stateFilename(), encoding='utf-8') as f:
+            state = json.load(f)
+        if state['dump'] != previous:
+            return False
+        self.pages.update(state['pages'])
+        return True
+
+    def saveState(self, data):
+        with open(self.stateFilename(), encoding='utf-8', mode='w') as f:
+            json.dump({'dump': data, 'pages': self.pages}, f, ensure_ascii=False)
+
+
+class Checkpoint():
+    """State of a long run, saved so that the run can be resumed after a crash.
+
+    The state is a dict pickled to output/checkpoint/NAME.pickle; every save()
+    replaces the whole file, so a run killed while saving leaves the previous
+    checkpoint. DumpEngine keeps its state under 'engine'; a script made of
+    several steps (see afterDump.py) marks the steps it has done with
+    markStage(). The owner of the checkpoint removes it when the whole run is done.
+
+    Args:
+        name (str): name of the run, with the date of the dump
+    """
+
+    def __init__(self, name):
+        path = '%soutput/checkpoint/' % config.path['scripts']
+        os.makedirs(path, exist_ok=True)
+        self.filename = '%s%s.pickle' % (path, name)
+        self.state = {}
+        if os.path.isfile(self.filename):
+            with open(self.filename, 'rb') as f:
+                self.state = pickle.load(f)
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **fields):
+        self.state.update(fields)
+        with open(self.filename + '.tmp', 'wb') as f:
+            pickle.dump(self.state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(self.filename + '.tmp', self.filename)
+
+    def stageDone(self, stage):
+        return stage in self.state.get('stages', ())
+
+    def markStage(self, stage):
+        self.save(stages=self.state.get('stages', []) + [stage])
+
+    def remove(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+        self.state = {}
+
+
+class DumpEngine():
+    """Scan a dump once and dispatch every page to all registered visitors.
+
+    Args:
+        data (str): date of the dump (YYYYMMDD), as in getListFromXML()
+        multistream (bool): read the multistream dump in a process pool, see getListFromXML()
+        processes (int): number of processes for the multistream reader
+        cache (parseCache.ParseCache): if given, pages whose text has been parsed
+            before are rebuilt from the cache instead of being parsed again
+        previous (str): date of the previous dump. Pages are compared with it by
+            id and revision id, and DeltaVisitors whose saved results are from
+            that dump only get the added, changed and deleted pages
+        checkpoint (Checkpoint): if given, the id of the last page and the
+            accumulators of the visitors are saved in it every checkpointEvery
+            pages, after the scan and after every finish(). A run with the
+            checkpoint of an interrupted one resumes it: visitors saved in it
+            skip the pages they have seen (the others, e.g. IndexVisitor, which
+            keep their results outside of accumulators, get every page again)
+            and visitors that have finished aren't run again
+        checkpointEvery (int): pages between two checkpoints
+    """
+
+    def __init__(self, data, multistream=False, processes=None, cache=None, previous=None, checkpoint=None, checkpointEvery=50000):
+        self.data = data
+        self.cache = cache
+        self.previous = previous
+        self.checkpoint = checkpoint
+        self.checkpointEvery = checkpointEvery
+        self.delta = collections.Counter()
+        self.multistream = multistream
+        self.processes = processes
+        self.visitors = []
+        self.cpuTime = collections.OrderedDict()
+        self.pages = 0
+
+    def register(self, visitor):
+        self.visitors.append(visitor)
+        self.cpuTime[visitor.getName()] = 0.0
+        return visitor
+
+    def parse(self, entry):
+        try:
+            if self.cache is not None:
+                return self.cache.parse(entry)
+            return parsePage(entry)
+        except sectionsNotFound:
+            return None
+        except WrongHeader:
+            return None
+
+    def wantedNamespaces(self):
+        #None means all namespaces
+        namespaces = set()
+        for visitor in self.visitors:
+            if visitor.namespaces is None:
+                return None
+            namespaces.update(visitor.namespaces)
+        return namespaces
+
+    def run(self):
+        if self.cache is not None:
+            self.cache.setDump(self.data)
+        self.cpuTime['parser'] = 0.0
+        revisions = {}
+
+        saved = {}
+        if self.checkpoint is not None and (self.checkpoint.get('engine') or {}).get('dump') == self.data:
+            saved = self.checkpoint.get('engine')
+            print('Resuming the scan of %s after page %s' % (self.data, saved['lastPage']))
+        savedAccumulators = saved.get('accumulators', {})
+        self.finished = list(saved.get('finished', ()))
+
+        # delta visitors with results of the previous dump get only the changes,
+        # the others (and all visitors if there's no previous dump) get every page
+        updated = set()
+        resumed = set()
+        active = []
+        for visitor in self.visitors:
+            start = time.process_time()
+            name = visitor.getName()
+            if name in savedAccumulators and visitor.accumulators:
+                if name not in self.finished:
+                    visitor.begin(self.data)
+                for attribute in visitor.accumulators:
+                    setattr(visitor, attribute, savedAccumulators[name][attribute])
+                resumed.add(visitor)
+                if name in saved['updated']:
+                    updated.add(visitor)
+            elif name not in self.finished:
+                if getattr(visitor, 'delta', False) and visitor.loadState(self.previous):
+                    updated.add(visitor)
+                visitor.begin(self.data)
+            if name not in self.finished:
+                active.append(visitor)
+            self.cpuTime[visitor.getName()] += time.process_time() - start
+
+        # the resumed visitors have seen everything up to saved['lastPage'];
+        # the dump is read again only if some visitor hasn't seen all of it
+        scanned = saved.get('scanned', False)
+        skipping = bool(resumed) and saved['lastPage'] is not None
+        pages = []
+        oldRevisions = {}
+        if not scanned or any(visitor not in resumed for visitor in active):
+            pages = getListFromXML(self.data, multistream=self.multistream, processes=self.processes, namespaces=self.wantedNamespaces())
+            if self.previous is not None:
+                oldRevisions = readManifest(self.previous)
+        entry = None
+        lastPage = None
+        for entry in pages:
+            revisions[entry.id] = (entry.ns, entry.revisionid)
+            old = oldRevisions.get(entry.id)
+            if old is None:
+                self.delta['added'] += 1
+            elif old[1] != entry.revisionid:
+                self.delta['changed'] += 1
+            unchanged = old is not None and old[1] == entry.revisionid
+
+            wanted = [visitor for visitor in active
+                      if (visitor.namespaces is None or int(entry.ns) in visitor.namespaces)
+                      and not (unchanged and visitor in updated)
+                      and not (skipping and visitor in resumed)]
+            self.pages += 1
+            if skipping and entry.id == saved['lastPage']:
+                skipping = False
+            elif not skipping and self.checkpoint is not None and self.pages % self.checkpointEvery == 0:
+                # the checkpoint is written before this page is visited, so lastPage is the one before it
+                self.saveCheckpoint(lastPage, updated, False)
+            lastPage = entry.id
+            if not wanted:
+                continue
+
+            word = None
+            if any(visitor.parsed for visitor in wanted):
+                start = time.process_time()
+                word = self.parse(entry)
+                self.cpuTime['parser'] += time.process_time() - start
+
+            for visitor in wanted:
+                start = time.process_time()
+                visitor.visit(entry, word)
+                self.cpuTime[visitor.getName()] += time.process_time() - start
+
+        if entry is not None:
+            namespaces = self.wantedNamespaces()
+            for pageId in oldRevisions:
+                if pageId not in revisions and (namespaces is None or int(oldRevisions[pageId][0]) in namespaces):
+                    self.delta['deleted'] += 1
+                    for visitor in updated:
+                        if not (scanned and visitor in resumed):
+                            visitor.remove(pageId)
+            writeManifest(self.data, revisions)
+        else:
+            lastPage = saved.get('lastPage')
+        if self.checkpoint is not None:
+            self.saveCheckpoint(lastPage, updated, True)
+
+        for visitor in active:
+            start = time.process_time()
+            visitor.finish()
+            if getattr(visitor, 'delta', False):
+                visitor.saveState(self.data)
+            self.finished.append(visitor.getName())
+            if self.checkpoint is not None:
+                self.saveCheckpoint(lastPage, updated, True)
+            self.cpuTime[visitor.getName()] += time.process_time() - start
+
+        if self.cache is not None:
+            self.cache.flush()
+        self.report()
+        return self.visitors
+
+    def saveCheckpoint(self, lastPage, updated, scanned):
+        #every visitor with accumulators has seen all pages up to lastPage (all pages if scanned)
+        if self.cache is not None:
+            self.cache.flush()
+        self.checkpoint.save(engine={
+            'dump': self.data,
+            'lastPage': lastPage,
+            'scanned': scanned,
+            'finished': list(self.finished),
+            'updated': [visitor.getName() for visitor in updated],
+            'accumulators': accumulatorState(self.visitors),
+        })
+
+    def report(self):
+        print('Dump %s: %d pages scanned' % (self.data, self.pages))
+        if self.previous is not None:
+            print('since %s: %d added, %d changed, %d deleted' % (self.previous, self.delta['added'], self.delta['changed'], self.delta['deleted']))
+        if self.cache is not None:
+            print('parse cache: %d hits, %d misses' % (self.cache.hits, self.cache.misses))
+        for name in self.cpuTime:
+            print('%-40s %10.1f s' % (name, self.cpuTime[name]))
+
+
+def parsePage(entry):
+    #Haslo(entry) with pola() run on every language section
+    word = Haslo(entry)
+    if word.type == 3:
+        for lang in word.listLangs:
+            lang.pola()
+    return word
+
+def deltaPath():
+    path = '%soutput/delta/' % config.path['scripts']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def manifestFilename(date):
+    return '%smanifest-%s.txt' % (deltaPath(), date)
+
+def writeManifest(date, revisions):
+    #page id, namespace and revision id of every page read from the dump
+    with open(manifestFilename(date), encoding='utf-8', mode='w') as f:
+        for pageId in revisions:
+            f.write('%s\t%s\t%s\n' % (pageId, revisions[pageId][0], revisions[pageId][1]))
+
+def readManifest(date):
+    """
+    Returns:
+        dict: page id -> (ns, revision id) of the given dump. The manifest is
+        written by every DumpEngine run; if there's none for this dump (e.g.
+        the first delta run), it is built from the raw dump
+    """
+    if not os.path.isfile(manifestFilename(date)):
+        writeManifest(date, {pageId: (ns, revid) for pageId, ns, revid in dumpReader.pageRevisions(dumpFilename(date))})
+    revisions = {}
+    with open(manifestFilename(date), encoding='utf-8') as f:
+        for line in f:
+            pageId, ns, revid = line.rstrip('\n').split('\t')
+            revisions[pageId] = (ns, revid)
+    return revisions
+
+def accumulatorState(visitors):
+    #visitor name -> {accumulator: value}, for a Checkpoint
+    return dict((visitor.getName(), dict((name, getattr(visitor, name)) for name in visitor.accumulators))
+                for visitor in visitors if visitor.accumulators)
+
+def runVisitors(data, visitors, cache=None, previous=None, processes=None):
+    #shortcut for the scripts run on their own: one dump scan for the given visitors
+    #with processes, the multistream dump is read in that many processes instead, see mapReduce.runParallel()
+    #a scan that was interrupted is resumed from its checkpoint when the script is run again
+    checkpoint = Checkpoint('%s-%s' % (data, '-'.join(visitor.getName() for visitor in visitors)))
+    if processes is not None:
+        import mapReduce
+        mapReduce.runParallel(data, visitors, processes, checkpoint=checkpoint)
+    else:
+        engine = DumpEngine(data, cache=cache, previous=previous, checkpoint=checkpoint)
+        for visitor in visitors:
+            engine.register(visitor)
+        engine.run()
+    checkpoint.remove()
+    return visitors
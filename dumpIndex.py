@@ -0,0 +1,284 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# inverted index of a dump: templates, section markers, languages and word
+# n-grams mapped to page ids. Searches for a handful of templates or phrases
+# become an index lookup plus a fetch of the matching pages instead of a scan
+# of the whole dump.
+#
+# The index is built by IndexVisitor during the afterDump scan, or on its own
+# with buildIndex(date). Usage:
+#
+#   index = DumpIndex('20170101')
+#   for page in index.search(languages=['polski'], phrases=['liczba mnoga od', '{{lm}} od']):
+#       h = Haslo(page)
+
+import array
+import bz2
+import glob
+import os
+import re
+import sqlite3
+import sys
+import config
+import dumpReader
+from klasa import *
+from dumpEngine import DumpVisitor
+
+re_token = re.compile(r'\{\{([^|{}\n]*)|(\w+)')
+re_sectionMarker = re.compile(r'^\{\{([^|{}\n]+)\}\}', re.MULTILINE)
+re_langHeader = re.compile(r'^==.*?\(\{\{([^{}\n]+)\}\}\)\s*==', re.MULTILINE)
+
+def tokenize(text):
+    #templates become '{{name', words are lowercased
+    tokens = []
+    for template, word in re_token.findall(text):
+        if word:
+            tokens.append(word.lower())
+        else:
+            tokens.append('{{' + template.strip())
+    return tokens
+
+def pageTerms(text):
+    """
+    Index terms of a page:
+        't:name' for every template used, 's:name' for every subsection marker
+        ({{name}} at the beginning of a line), 'l:name' for every language
+        section ('polski' for '({{język polski}})'), 'w:token' and
+        'w:token token' for words and pairs of consecutive tokens.
+    Returns:
+        set
+    """
+    tokens = tokenize(text)
+    terms = set()
+    for token in tokens:
+        if token.startswith('{{'):
+            terms.add('t:' + token[2:])
+        else:
+            terms.add('w:' + token)
+    terms.update('w:%s %s' % pair for pair in zip(tokens, tokens[1:]))
+    terms.update('s:' + name for name in re_sectionMarker.findall(text))
+    for lang in re_langHeader.findall(text):
+        if lang.startswith('język '):
+            lang = lang[6:]
+        terms.add('l:' + lang)
+    return terms
+
+def phraseTerms(phrase):
+    #terms that every page containing the phrase must have. Phrases are matched
+    #on whole tokens, so 'rzeczownik' doesn't find 'rzeczownika'
+    tokens = tokenize(phrase)
+    if len(tokens) == 1:
+        if tokens[0].startswith('{{'):
+            return ['t:' + tokens[0][2:]]
+        return ['w:' + tokens[0]]
+    return ['w:%s %s' % pair for pair in zip(tokens, tokens[1:])]
+
+def indexFilename(date):
+    return '%soutput/index/%s.db' % (config.path['scripts'], date)
+
+def multistreamOffsets(filename):
+    #page id -> offset of the bz2 stream it's in
+    offsets = {}
+    with bz2.open(dumpReader.multistreamIndexFilename(filename), mode='rt', encoding='utf-8') as f:
+        for line in f:
+            offset, pageId, title = line.split(':', 2)
+            offsets[int(pageId)] = int(offset)
+    return offsets
+
+
+class DumpIndex():
+    """
+    Args:
+        date (str): date of the dump (YYYYMMDD); DumpIndex.latest() opens the newest index
+        create (bool): start a new index of this dump, to be filled with add()
+
+    Posting lists are written in segments of `batch` pages, so building the
+    index of the whole dump doesn't keep it in memory.
+    """
+
+    version = 1
+    batch = 20000
+
+    def __init__(self, date, create=False):
+        self.date = date
+        filename = indexFilename(date)
+        if create:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            if os.path.isfile(filename):
+                os.remove(filename)
+        elif not os.path.isfile(filename):
+            raise DumpNotFound
+        self.db = sqlite3.connect(filename)
+        if create:
+            self.db.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute('CREATE TABLE pages (id INTEGER PRIMARY KEY, ns INTEGER, title TEXT, revid INTEGER, stream INTEGER)')
+            self.db.execute('CREATE TABLE postings (term TEXT, pages BLOB)')
+            self.db.execute("INSERT INTO meta VALUES ('version', ?)", (str(self.version),))
+            self.streams = {}
+            multistream = dumpFilename(date, multistream=True)
+            if os.path.isfile(dumpReader.multistreamIndexFilename(multistream)):
+                self.streams = multistreamOffsets(multistream)
+            self.postings = {}
+            self.pages = []
+        else:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if int(row[0]) != self.version:
+                raise DumpNotFound
+
+    @classmethod
+    def latest(cls):
+        dates = [os.path.basename(filename)[:-3] for filename in glob.glob(indexFilename('[0-9]*'))]
+        if not dates:
+            raise DumpNotFound
+        return cls(max(dates))
+
+    def add(self, entry):
+        pageId = int(entry.id)
+        self.pages.append((pageId, int(entry.ns), entry.title, int(entry.revisionid), self.streams.get(pageId)))
+        for term in pageTerms(entry.text):
+            try: self.postings[term].append(pageId)
+            except KeyError:
+                self.postings[term] = array.array('I', [pageId])
+        if len(self.pages) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        self.db.executemany('INSERT INTO pages VALUES (?, ?, ?, ?, ?)', self.pages)
+        self.db.executemany('INSERT INTO postings VALUES (?, ?)', ((term, self.postings[term].tobytes()) for term in self.postings))
+        self.db.commit()
+        self.pages = []
+        self.postings = {}
+
+    def close(self):
+        #finishes the index if it was being built
+        if getattr(self, 'pages', None) is not None:
+            self.flush()
+            self.db.execute('CREATE INDEX postings_term ON postings (term)')
+            self.db.commit()
+            self.pages = None
+        self.db.close()
+
+    def term(self, term):
+        #set of ids of pages having the term
+        ids = set()
+        for row in self.db.execute('SELECT pages FROM postings WHERE term = ?', (term,)):
+            ids.update(array.array('I', row[0]))
+        return ids
+
+    def find(self, templates=(), sections=(), languages=(), phrases=(), namespaces=None):
+        """
+        Ids of pages having all the given templates, section markers and
+        languages, and at least one of the phrases (if any are given).
+
+        Phrases are matched on the index terms only, so pages returned for
+        a phrase may not contain it verbatim - search() checks the text.
+
+        Args:
+            templates (list of str): template names, e.g. 'lm'
+            sections (list of str): subsection markers, e.g. 'przykłady'
+            languages (list of str): short language names, e.g. 'polski'
+            phrases (list of str): e.g. '{{lm}} od', 'liczba mnoga od'
+            namespaces (list of int)
+        Returns:
+            list: sorted page ids
+        """
+        terms = ['t:' + name for name in templates] + ['s:' + name for name in sections] + ['l:' + name for name in languages]
+        ids = None
+        for term in sorted(terms, key=self.termSize):
+            found = self.term(term)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return []
+        if phrases:
+            found = set()
+            for phrase in phrases:
+                phraseIds = None
+                for term in sorted(phraseTerms(phrase), key=self.termSize):
+                    termIds = self.term(term)
+                    phraseIds = termIds if phraseIds is None else phraseIds & termIds
+                    if not phraseIds:
+                        break
+                found |= phraseIds or set()
+            ids = found if ids is None else ids & found
+        if ids is None:
+            ids = set(row[0] for row in self.db.execute('SELECT id FROM pages'))
+        if namespaces is not None:
+            allowed = set(int(ns) for ns in namespaces)
+            ids = set(pageId for pageId, ns, stream in self.pageRows(ids) if ns in allowed)
+        return sorted(ids)
+
+    def termSize(self, term):
+        #rough size of the posting list, used to intersect the smallest lists first
+        row = self.db.execute('SELECT sum(length(pages)) FROM postings WHERE term = ?', (term,)).fetchone()
+        return row[0] or 0
+
+    def pageRows(self, ids):
+        #(id, ns, stream) of the given pages, looked up 500 at a time
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            part = ids[start:start+500]
+            for row in self.db.execute('SELECT id, ns, stream FROM pages WHERE id IN (%s)' % ','.join('?'*len(part)), part):
+                yield row
+
+    def fetch(self, ids):
+        """
+        Read the given pages from the dump. With the multistream dump only the
+        streams containing them are decompressed; otherwise the dump is read
+        up to the last of them, parsing only these pages.
+
+        Yields:
+            dumpReader.DumpPage, in dump order
+        """
+        ids = set(int(pageId) for pageId in ids)
+        if not ids:
+            return
+        multistream = dumpFilename(self.date, multistream=True)
+        streams = set(stream for pageId, ns, stream in self.pageRows(ids))
+
+        if None not in streams and os.path.isfile(multistream):
+            offsets = sorted(row[0] for row in self.db.execute('SELECT DISTINCT stream FROM pages WHERE stream IS NOT NULL'))
+            pageFilter = dumpReader.PageFilter(ids=ids)
+            for filename, start, length in dumpReader.streamRanges(multistream, offsets):
+                if start in streams:
+                    for page in dumpReader.readStream((filename, start, length, pageFilter)):
+                        yield page
+            return
+
+        left = set(ids)
+        for page in dumpReader.parseDump(dumpFilename(self.date), dumpReader.PageFilter(ids=ids)):
+            yield page
+            left.discard(int(page.id))
+            if not left:
+                return
+
+    def search(self, templates=(), sections=(), languages=(), phrases=(), namespaces=None):
+        #pages found by find(), containing at least one of the phrases verbatim
+        for page in self.fetch(self.find(templates, sections, languages, phrases, namespaces)):
+            if not phrases or any(phrase in page.text for phrase in phrases):
+                yield page
+
+
+class IndexVisitor(DumpVisitor):
+    #builds the index of the dump in the afterDump scan
+
+    parsed = False
+
+    def begin(self, data):
+        self.index = DumpIndex(data, create=True)
+
+    def visit(self, entry, word):
+        self.index.add(entry)
+
+    def finish(self):
+        self.index.close()
+
+def buildIndex(date):
+    #index a dump without parsing the pages
+    index = DumpIndex(date, create=True)
+    for entry in getListFromXML(date):
+        index.add(entry)
+    index.close()
+
+if __name__ == '__main__':
+    buildIndex(sys.argv[1])
@@ -0,0 +1,358 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# readers for the wikimedia xml dumps, used by klasa.getListFromXML()
+
+import bz2
+import collections
+import itertools
+import multiprocessing
+import os
+import re
+import sqlite3
+from lxml import etree
+
+# a page read from the dump. It has the same attributes as pywikibot's XmlEntry
+# that are used by Haslo() (title, ns, text) and by the dump scripts (id, revisionid).
+# All fields are strings, as in XmlEntry
+DumpPage = collections.namedtuple('DumpPage', ['id', 'ns', 'title', 'revisionid', 'sha1', 'text'])
+
+def multistreamIndexFilename(filename):
+    #plwiktionary-20170101-pages-articles-multistream.xml.bz2 -> plwiktionary-20170101-pages-articles-multistream-index.txt.bz2
+    return filename.replace('-multistream.xml.bz2', '-multistream-index.txt.bz2')
+
+def readMultistreamIndex(indexFilename):
+    """
+    Read stream offsets from a multistream index file.
+
+    Each line of the index is "offset:page_id:title", where offset is the
+    position of the bz2 stream the page is in. A stream holds up to 100 pages.
+
+    Returns:
+        list: sorted offsets of all streams containing pages
+    """
+    offsets = []
+    last = None
+    with bz2.open(indexFilename, mode='rt', encoding='utf-8') as f:
+        for line in f:
+            offset = int(line.split(':', 1)[0])
+            if offset != last:
+                offsets.append(offset)
+                last = offset
+    return offsets
+
+def streamRanges(filename, offsets):
+    #(start, length) of every stream; the last one is read up to the end of the file,
+    #the decompressor stops at the end of the first stream anyway
+    size = os.path.getsize(filename)
+    ends = offsets[1:] + [size]
+    return [(filename, start, end - start) for start, end in zip(offsets, ends)]
+
+class TitleIndex():
+    """
+    Title -> (stream offset, page offset) index over a multistream dump, for
+    reading single pages without decompressing the dump. The page offset is the
+    position of the page in its stream (0 for the first page of the stream).
+
+    Args:
+        filename (str): the multistream dump
+        dbFilename (str): sqlite file the index is kept in; built from the
+            multistream index file if it doesn't exist
+    """
+
+    def __init__(self, filename, dbFilename):
+        self.filename = filename
+        build = not os.path.isfile(dbFilename)
+        self.db = sqlite3.connect(dbFilename)
+        if build:
+            self.build()
+        self.lastStream = (None, None)
+
+    def build(self):
+        self.db.execute('CREATE TABLE titles (title TEXT PRIMARY KEY, id INTEGER, stream INTEGER, page INTEGER)')
+        self.db.execute('CREATE TABLE streams (offset INTEGER PRIMARY KEY, length INTEGER)')
+        def titles():
+            last = None
+            with bz2.open(multistreamIndexFilename(self.filename), mode='rt', encoding='utf-8') as f:
+                for line in f:
+                    offset, pageId, title = line.rstrip('\n').split(':', 2)
+                    offset = int(offset)
+                    position = position + 1 if offset == last else 0
+                    last = offset
+                    yield title, int(pageId), offset, position
+        self.db.executemany('INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?)', titles())
+        offsets = [row[0] for row in self.db.execute('SELECT DISTINCT stream FROM titles ORDER BY stream')]
+        self.db.executemany('INSERT INTO streams VALUES (?, ?)', ((start, length) for filename, start, length in streamRanges(self.filename, offsets)))
+        self.db.commit()
+
+    def find(self, title):
+        #(stream offset, page offset), None if the title isn't in the dump
+        row = self.db.execute('SELECT stream, page FROM titles WHERE title = ?', (title,)).fetchone()
+        if row is None:
+            return None
+        return row
+
+    def stream(self, offset):
+        #decompressed stream; the last one is kept, pages are often read in dump order
+        if self.lastStream[0] != offset:
+            length = self.db.execute('SELECT length FROM streams WHERE offset = ?', (offset,)).fetchone()[0]
+            with open(self.filename, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+            self.lastStream = (offset, bz2.BZ2Decompressor().decompress(data))
+        return self.lastStream[1]
+
+    def readPage(self, title):
+        """
+        Returns:
+            DumpPage: the page from the dump, None if there's no such title in it
+        """
+        found = self.find(title)
+        if found is None:
+            return None
+        offset, position = found
+        xml = self.stream(offset)
+        begin = -1
+        for i in range(position + 1):
+            begin = xml.find(b'<page>', begin + 1)
+        end = xml.find(b'</page>', begin) + 7
+        return pageFromElement(etree.fromstring(xml[begin:end]))
+
+def pageFromElement(page, ns=''):
+    #ns is the xml namespace prefix of the dump, e.g. '{http://www.mediawiki.org/xml/export-0.10/}'
+    #children are looked up by tag in a dict - much cheaper than find()/findtext() with namespaced tags
+    children = {child.tag: child for child in page}
+    revision = {child.tag: child.text for child in children[ns + 'revision']}
+    return DumpPage(children[ns + 'id'].text, children[ns + 'ns'].text, children[ns + 'title'].text,
+                    revision[ns + 'id'], revision.get(ns + 'sha1') or '', revision.get(ns + 'text') or '')
+
+class PageFilter():
+    """
+    Cheap filters run on the raw bytes of a <page> element, before it is
+    decoded and turned into a DumpPage.
+
+    Args:
+        namespaces (iterable of int): keep only pages from these namespaces
+        prefilter (str, bytes, compiled regex or a list of them): keep only pages
+            matching at least one of them. Literals are xml-escaped the way the
+            dump escapes page text, so '{{lm}} <ref' finds '{{lm}} &lt;ref'.
+            Regexes are run on the escaped utf-8 bytes as they are, so they
+            shouldn't rely on <, >, & or " in the text; str patterns are
+            encoded to utf-8 (keep character classes ascii-only).
+        ids (iterable of int): keep only pages with these ids
+
+    A prefilter may let through pages that match in the title or in other
+    fields, so the consumer should still check page.text itself.
+    """
+
+    def __init__(self, namespaces=None, prefilter=None, ids=None):
+        if ids is None:
+            self.ids = None
+        else:
+            self.ids = set(int(pageId) for pageId in ids)
+        if namespaces is None:
+            self.namespaces = None
+        else:
+            self.namespaces = set(int(ns) for ns in namespaces)
+
+        self.literals = []
+        self.regexes = []
+        self.textLiterals = [] # the same filters for page text that isn't xml-escaped, see matchText()
+        self.textRegexes = []
+        if prefilter is None:
+            prefilter = []
+        elif isinstance(prefilter, (str, bytes)) or hasattr(prefilter, 'pattern'):
+            prefilter = [prefilter]
+        for elem in prefilter:
+            if isinstance(elem, str):
+                self.literals.append(xmlEscape(elem).encode('utf-8'))
+                self.textLiterals.append(elem.encode('utf-8'))
+            elif isinstance(elem, bytes):
+                self.literals.append(elem)
+                self.textLiterals.append(elem)
+            elif isinstance(elem.pattern, str):
+                self.regexes.append(re.compile(elem.pattern.encode('utf-8'), elem.flags & ~re.UNICODE))
+                self.textRegexes.append(self.regexes[-1])
+            else:
+                self.regexes.append(elem)
+                self.textRegexes.append(elem)
+
+    def __bool__(self):
+        return self.ids is not None or self.namespaces is not None or bool(self.literals or self.regexes)
+
+    def match(self, raw):
+        if self.ids is not None and int(re_id.search(raw).group(1)) not in self.ids:
+            return False
+        if self.namespaces is not None:
+            start = raw.find(b'<ns>') + 4
+            if int(raw[start:raw.find(b'</ns>', start)]) not in self.namespaces:
+                return False
+        if self.literals or self.regexes:
+            return any(literal in raw for literal in self.literals) or any(regex.search(raw) for regex in self.regexes)
+        return True
+
+    def matchText(self, pageId, ns, text):
+        #the same checks for a page already split into fields; text is the utf-8 encoded page text
+        if self.ids is not None and int(pageId) not in self.ids:
+            return False
+        if self.namespaces is not None and int(ns) not in self.namespaces:
+            return False
+        if self.textLiterals or self.textRegexes:
+            return any(literal in text for literal in self.textLiterals) or any(regex.search(text) for regex in self.textRegexes)
+        return True
+
+def xmlEscape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def splitPages(chunks):
+    """
+    Cut a stream of decompressed bytes into raw '<page>...</page>' byte strings.
+
+    Page text is xml-escaped in the dump, so '<page>' and '</page>' can only
+    appear as tags.
+
+    Args:
+        chunks (iterable of bytes): the dump, in pieces of any size
+    Yields:
+        bytes
+    """
+    buf = b''
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        while True:
+            begin = buf.find(b'<page>', pos)
+            if begin == -1:
+                pos = max(pos, len(buf) - 5) # '<page' may be cut between two chunks
+                break
+            end = buf.find(b'</page>', begin)
+            if end == -1:
+                pos = begin
+                break
+            end += 7
+            yield buf[begin:end]
+            pos = end
+        buf = buf[pos:]
+
+def filterPages(chunks, pageFilter):
+    #raw pages that pass pageFilter, parsed into DumpPage objects
+    for raw in splitPages(chunks):
+        if pageFilter.match(raw):
+            yield pageFromElement(etree.fromstring(raw))
+
+def readChunks(f, size=1<<20):
+    while True:
+        chunk = f.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+re_id = re.compile(rb'<id>(\d+)</id>')
+re_ns = re.compile(rb'<ns>(-?\d+)</ns>')
+
+def pageRevisions(filename):
+    """
+    Page id, namespace and revision id of every page of a dump, read from the
+    raw bytes without parsing the xml. Used to compare two dumps.
+
+    Yields:
+        tuple: (id, ns, revisionid), as strings
+    """
+    if filename.endswith('.bz2'):
+        f = bz2.open(filename, 'rb')
+    else:
+        f = open(filename, 'rb')
+    with f:
+        for raw in splitPages(readChunks(f)):
+            pageId = re_id.search(raw).group(1)
+            ns = re_ns.search(raw).group(1)
+            revid = re_id.search(raw, raw.find(b'<revision>')).group(1)
+            yield pageId.decode(), ns.decode(), revid.decode()
+
+def parseDump(filename, pageFilter=None):
+    """
+    Stream pages from a pages-articles dump with lxml's iterparse.
+
+    Only the fields we use are extracted (see DumpPage) and every <page>
+    element is cleared and detached from the tree as soon as it has been read,
+    so memory use doesn't grow over the dump.
+
+    With a PageFilter, the decompressed dump is cut into raw pages instead
+    and only those passing the filter are parsed at all.
+
+    Args:
+        filename (str): path to the dump, .xml or .xml.bz2
+        pageFilter (PageFilter): optional raw-byte filter
+    Yields:
+        DumpPage
+    """
+    if filename.endswith('.bz2'):
+        f = bz2.open(filename, 'rb')
+    else:
+        f = open(filename, 'rb')
+    with f:
+        if pageFilter:
+            for page in filterPages(readChunks(f), pageFilter):
+                yield page
+            return
+        for event, page in etree.iterparse(f, events=('end',), tag='{*}page'):
+            yield pageFromElement(page, page.tag[:-4])
+            page.clear()
+            while page.getprevious() is not None:
+                del page.getparent()[0]
+
+def readStream(args):
+    """
+    Decompress and parse a single bz2 stream of a multistream dump. This is
+    run in the worker processes, so it returns a list (pickled back to the parent).
+
+    Args:
+        args (tuple): (filename, offset, length, pageFilter), see streamRanges()
+    Returns:
+        list: DumpPage objects in the order they appear in the stream
+    """
+    filename, offset, length, pageFilter = args
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    xml = bz2.BZ2Decompressor().decompress(data)
+    if pageFilter:
+        return list(filterPages([xml], pageFilter))
+    root = etree.fromstring(b'<mediawiki>' + xml + b'</mediawiki>')
+    return [pageFromElement(page) for page in root.iter('page')]
+
+def parseMultistream(filename, processes=None, window=4, pageFilter=None):
+    """
+    Parse a multistream dump in a process pool.
+
+    The streams are decompressed and parsed in parallel, but the pages are
+    yielded in dump order. At most processes*window streams are in flight,
+    so a slow consumer doesn't make the parsed dump pile up in memory.
+
+    Args:
+        filename (str): path to pages-articles-multistream.xml.bz2; the index
+            is expected next to it
+        processes (int): number of worker processes, defaults to os.cpu_count()
+        window (int): streams queued per worker
+        pageFilter (PageFilter): optional raw-byte filter, run in the workers
+    Yields:
+        DumpPage
+    """
+    offsets = readMultistreamIndex(multistreamIndexFilename(filename))
+    ranges = [args + (pageFilter,) for args in streamRanges(filename, offsets)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        todo = iter(ranges)
+        pending = collections.deque(pool.apply_async(readStream, (args,)) for args in itertools.islice(todo, processes*window))
+        while pending:
+            pages = pending.popleft().get()
+            args = next(todo, None)
+            if args is not None:
+                pending.append(pool.apply_async(readStream, (args,)))
+            for page in pages:
+                yield page
+    finally:
+        pool.terminate()
@@ -1,24 +1,24 @@
 # -*- coding: utf-8 -*-
 
 from klasa import *
+from dumpIndex import DumpIndex
 import re
 
 def empty_section(section='przykłady'):
 
-    re_numbers = re.compile(r'\: \(([0-9]\.[0-9])\)\s*(.*)')
-
     empty_content = ['']
     if section == 'przykłady':
         empty_content += ['\n: (1.1)', '\n: (1.1) ']
 
     excluded_pos = ['rzeczownik', '{{forma']
 
-    wordlist = getListFromXML('xx', findLatest=True)
+    # Polish pages with the section, from the index of the latest dump
+    wordlist = DumpIndex.latest().search(sections=[section], languages=['polski'], namespaces=[0])
 
     i = 0
     with open('output/empty_sectionsxx.txt', 'w') as f:
         for word in wordlist:
-            try: h = Haslo(word)
+            try: h = Haslo(word, languages=('polski',))
             except sectionsNotFound:
                 pass
             except WrongHeader:
@@ -28,15 +28,14 @@ def empty_section(section='przykłady'):
                     for lang_section in h.listLangs:
                         if lang_section.lang == 'polski':
                             lang_section.pola()
-                            if any(lang_section.subSections['przykłady'].text == empty for empty in empty_content): \
+                            if any(lang_section.subSections['przykłady'].text == empty for empty in empty_content) \
                                and not any(pos in lang_section.subSections['znaczenia'].text for pos in excluded_pos):
-                               i += 1
-                               break
-                                defs_found = re.findall(re_numbers, lang_section.subSections['znaczenia'].text)
-                                for defn in defs_found:
-                                    if 'dokonany od' not in defn[1] or '{{zob' not in defn[1]:
+                                i += 1
+                                for defn in lang_section.meanings:
+                                    if 'dokonany od' not in defn.text or '{{zob' not in defn.text:
                                         f.write(h.title + '\n')
                                         break
+                                break
 
     print(i)
 
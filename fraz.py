@@ -8,71 +8,76 @@ from pywikibot import xmlreader
 import datetime
 import collections
 from klasa import *
+from dumpEngine import DeltaVisitor, runVisitors
+from mapReduce import ListDict
 
-def fraz(data):
-
-    data_slownie = data[6:8] + '.' + data[4:6] + '.' + data[0:4]
+class FrazVisitor(DeltaVisitor):
 
-    lista_stron = getListFromXML(data)
-    site = pywikibot.Site('pl', 'wiktionary')
-    outputPage = pywikibot.Page(site, 'Wikipedysta:AlkamidBot/listy/związki_frazeologiczne')
+    namespaces = (0,)
     logfile = 'log/fraz.txt'
 
-    tempLangs = []
-
-    notFound = []
-    text = 'Hasła, które określone zostały jako związek frazeologiczny, lecz nie widnieją w indeksie związków frazeologicznych odpowiednim dla danego języka. Ostatnia aktualizacja: %s\n' % (data_slownie)
-    phraseList = {}
-    notFoundList = collections.defaultdict(list)
-
-    LangsMediaWiki = getAllLanguages()
-
-    # prepare a dictionary of phrase indexes. If an index page doesn't exist
-    # assign a blank page to it
-
-    for a in LangsMediaWiki:
-        #print a.shortName
-        indexPageName = 'Indeks:{0}_-_Związki_frazeologiczne'.format(a.upperName)
-        
-        try: phraseList[a.shortName] = pywikibot.Page(site, indexPageName).get()
-        except pywikibot.NoPage:
-            phraseList['%s' % a.shortName] = ''
-        except pywikibot.IsRedirectPage:
-            print('redirect')
-
-
-    for a in lista_stron:
-        try: word = Haslo(a)
-        except notFromMainNamespace:
-            continue
-        except sectionsNotFound:
-            continue
-        except WrongHeader:
-            continue
-        else:
-            if word.type == 3:
-                for lang in word.listLangs:
-                    if lang.type != 2:
-                        lang.pola()
-                    try: lang.subSections['znaczenia'].text
-                    except AttributeError:
-                        pass
-                    except KeyError:
-                        with open(logfile, 'a+', encoding='utf-8') as lf:
-                            lf.write('\n"znaczenia" not found; word: {0}; lang: {1}'.format(word.title, lang.lang))
-                    else:
-                        if lang.type != 2 and 'związek frazeologiczny' in lang.subSections['znaczenia'].text and '[[{0}]]'.format(word.title) not in phraseList[lang.lang]:
-                            notFoundList['%s' % lang.lang].append(word.title)
-
-    for a in LangsMediaWiki:
-        if notFoundList['%s' % a.shortName]:
-            text += '== [[Indeks:%s_-_Związki_frazeologiczne|%s]] ==' % (a.upperName, a.longName)
-            for b in notFoundList['%s' % a.shortName]:
-                text += '\n*[[%s]] <nowiki>| *[[%s]]</nowiki> →' % (b, b)
-            text += '\n'
-
-    with open('output/fraz.txt', encoding='utf-8', mode='w') as f:
-        f.write(text)
-
-    outputPage.text = text
-    outputPage.save(comment="Aktualizacja listy", botflag=False)
+    def begin(self, data):
+        self.data_slownie = data[6:8] + '.' + data[4:6] + '.' + data[0:4]
+
+        site = pywikibot.Site('pl', 'wiktionary')
+        self.outputPage = pywikibot.Page(site, 'Wikipedysta:AlkamidBot/listy/związki_frazeologiczne')
+
+        self.phraseList = {}
+
+        self.LangsMediaWiki = getAllLanguages()
+
+        # prepare a dictionary of phrase indexes. If an index page doesn't exist
+        # assign a blank page to it
+
+        for a in self.LangsMediaWiki:
+            #print a.shortName
+            indexPageName = 'Indeks:{0}_-_Związki_frazeologiczne'.format(a.upperName)
+
+            try: self.phraseList[a.shortName] = pywikibot.Page(site, indexPageName).get()
+            except pywikibot.NoPage:
+                self.phraseList['%s' % a.shortName] = ''
+            except pywikibot.IsRedirectPage:
+                print('redirect')
+
+    def pageResult(self, entry, word):
+        #[title, languages in which the word is a phrase]; whether it's already in the index is checked in finish()
+        if word is None or word.type != 3:
+            return None
+        langs = []
+        for lang in word.listLangs:
+            try: lang.subSections['znaczenia'].text
+            except AttributeError:
+                pass
+            except KeyError:
+                with open(self.logfile, 'a+', encoding='utf-8') as lf:
+                    lf.write('\n"znaczenia" not found; word: {0}; lang: {1}'.format(word.title, lang.lang))
+            else:
+                if lang.type != 2 and 'związek frazeologiczny' in lang.subSections['znaczenia'].text:
+                    langs.append(lang.lang)
+        if langs:
+            return [word.title, langs]
+
+    def finish(self):
+        self.notFoundList = ListDict()
+        for pageId, (title, langs) in self.results():
+            for lang in langs:
+                if '[[{0}]]'.format(title) not in self.phraseList.get(lang, ''):
+                    self.notFoundList[lang].append(title)
+
+        text = 'Hasła, które określone zostały jako związek frazeologiczny, lecz nie widnieją w indeksie związków frazeologicznych odpowiednim dla danego języka. Ostatnia aktualizacja: %s\n' % (self.data_slownie)
+
+        for a in self.LangsMediaWiki:
+            if self.notFoundList['%s' % a.shortName]:
+                text += '== [[Indeks:%s_-_Związki_frazeologiczne|%s]] ==' % (a.upperName, a.longName)
+                for b in self.notFoundList['%s' % a.shortName]:
+                    text += '\n*[[%s]] <nowiki>| *[[%s]]</nowiki> →' % (b, b)
+                text += '\n'
+
+        with open('output/fraz.txt', encoding='utf-8', mode='w') as f:
+            f.write(text)
+
+        self.outputPage.text = text
+        self.outputPage.save(comment="Aktualizacja listy", botflag=False)
+
+def fraz(data):
+    runVisitors(data, [FrazVisitor()])
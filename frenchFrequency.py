@@ -29,44 +29,41 @@ def main():
 
     startPoint = 310 #all the words < 300 already exist, no point checking there
 
-    for word in wordList[startPoint:]:
-
-        if word not in excludedList and len(word)>1:
-            try:
-                haslo = Haslo(word)
-            except urllib.error.HTTPError:
-                pass
-            except sectionsNotFound:
-                pass
-            except WrongHeader:
-                text += '*[[' + word + ']] - problem z nagłówkiem' + '\n'
+    # the pages are fetched 50 at a time
+    words = [word for word in wordList[startPoint:] if word not in excludedList and len(word)>1]
+    for haslo in Haslo.fromTitles(words):
+        word = haslo.title
+        if haslo.type == 4:
+            pass
+        elif haslo.type == 6:
+            text += '*[[' + word + ']] - problem z nagłówkiem' + '\n'
+        else:
+            if haslo.type == 0:
+                text += '*[[' + word + ']] - przekierowanie' + '\n'
+            elif haslo.type == 1:
+                text += '*[[' + word + ']]' + '\n'
+                counter += 1
+            elif haslo.type == 2:
+                print('*--------* nieznany błąd (haslo.type=2) *----------------*')
             else:
-                if haslo.type == 0:
-                    text += '*[[' + word + ']] - przekierowanie' + '\n'
-                elif haslo.type == 1:
-                    text += '*[[' + word + ']]' + '\n'
-                    counter += 1
-                elif haslo.type == 2:
-                    print('*--------* nieznany błąd (haslo.type=2) *----------------*')
+                found = 0
+                try: haslo.listLangs
+                except AttributeError:
+                    pass
                 else:
-                    found = 0
-                    try: haslo.listLangs
-                    except AttributeError:
-                        pass
-                    else:
-                        for section in haslo.listLangs:
-                            if section.lang == 'francuski':
-                                found = 1
-                        if not found:
-                            text += '*[[' + word + ']]' + '\n'
-                            counter += 1
+                    for section in haslo.listLangs:
+                        if section.lang == 'francuski':
+                            found = 1
+                    if not found:
+                        text += '*[[' + word + ']]' + '\n'
+                        counter += 1
 
-            if counter == 100:
-                stary_s = re.search(re_stary, outputPage.get())
-                if (stary_s.group(1) != text):
-                    final = '{{język linków|francuski}}\nOto lista około stu najczęściej występujących haseł w języku francuskim, których nie ma jeszcze na Wikisłowniku. Jeśli możesz - dodaj je. Lista ta jest wyborem słów z zestawienia stworzonego przez [http://corpus.leeds.ac.uk/list.html korpus University of Leeds].\nOstatnia aktualizacja: %s\n%s[[Kategoria:Listy frekwencyjne|francuski]]' % (date, text)
-                    outputPage.put(final, comment='Aktualizacja listy')
-                return 0
+        if counter == 100:
+            stary_s = re.search(re_stary, outputPage.get())
+            if (stary_s.group(1) != text):
+                final = '{{język linków|francuski}}\nOto lista około stu najczęściej występujących haseł w języku francuskim, których nie ma jeszcze na Wikisłowniku. Jeśli możesz - dodaj je. Lista ta jest wyborem słów z zestawienia stworzonego przez [http://corpus.leeds.ac.uk/list.html korpus University of Leeds].\nOstatnia aktualizacja: %s\n%s[[Kategoria:Listy frekwencyjne|francuski]]' % (date, text)
+                outputPage.put(final, comment='Aktualizacja listy')
+            return 0
 
 
 if __name__ == '__main__':
@@ -5,6 +5,8 @@ import codecs
 import pywikibot as pwb
 import re
 from klasa import *
+from dumpEngine import DumpVisitor, runVisitors
+from mapReduce import CountDict, MergeSet
 import config
 
 
@@ -19,64 +21,66 @@ def getDeletedList():
             deleted.add(lineList[1].strip(']'))
     return deleted
 
-def frequencyList(date):
+class FrequencyListVisitor(DumpVisitor):
 
-    site = pwb.Site()
-    lista_stron2 = getListFromXML(date)
-    ranking = {}
     re_example_translation = re.compile('→(.*?)(?=\<ref|\n|$)')
     re_colloc_translation = re.compile('→(.*?)(?=\<ref|\n|•|;|$)')
     re_link = re.compile('\[\[([^\:]*?)(?=\]\]|\||#pl)')
-    alltitles = set()
-
-    deleted = getDeletedList()
-
-    i = 1
-    for a in lista_stron2:
-        alltitles.add(a.title)
-        if 'Wikipedysta:AlkamidBot' not in a.title:
-            try: h = Haslo(a)
-            except sectionsNotFound:
-                pass
-            except WrongHeader:
-                pass
-            else:
-                if h.type == 3:
-                    to_search = ''
-                    for sekcja in h.listLangs:
-                        sekcja.pola()
-                        if sekcja.type not in (2,4,5,7,11):
-                            if sekcja.lang == 'polski' or sekcja.lang == 'termin obcy w języku polskim':
-                                for elem in ('dodatki', 'znaczenia', 'przykłady', 'składnia', 'kolokacje', 'synonimy', 'antonimy', 'pokrewne', 'frazeologia', 'etymologia', 'uwagi'):
-                                    to_search += sekcja.subSections[elem].text
-
-                            else:
-                                s_example_translation = None
-                                s_colloc_translation = None
-
-                                if '→' in sekcja.subSections['przykłady'].text:
-                                    s_example_translation = re.findall(re_example_translation, sekcja.subSections['przykłady'].text)
-                                if s_example_translation:
-                                    for a in s_example_translation:
-                                        to_search += a
-                                if '→' in sekcja.subSections['kolokacje'].text:
-                                    s_colloc_translation = re.findall(re_colloc_translation, sekcja.subSections['kolokacje'].text)
-                                if s_colloc_translation:
-                                    for a in s_colloc_translation:
-                                        to_search += a
-
-                                to_search = to_search + sekcja.subSections['znaczenia'].text
-
-                    s_link = re.findall(re_link, to_search)
-                    for link in s_link:
-                        if '#' not in link and link not in deleted: #if there is a hash in the link, it is not '#pl' (excluded in regex), therefore not a Polish link; also, exlude words from deleted list
-                            try: ranking[link]
-                            except KeyError:
-                                ranking[link] = 1
-                            else:
-                                ranking[link] += 1
 
+    accumulators = ('ranking', 'alltitles')
+
+    def begin(self, data):
+        self.newAccumulators()
+        self.deleted = getDeletedList()
+
+    def newAccumulators(self):
+        self.ranking = CountDict()
+        self.alltitles = MergeSet()
+
+    def visit(self, entry, h):
+        self.alltitles.add(entry.title)
+        if 'Wikipedysta:AlkamidBot' in entry.title or h is None or h.type != 3:
+            return
+
+        ranking = self.ranking
+        to_search = ''
+        for sekcja in h.listLangs:
+            if sekcja.type not in (2,4,5,7,11):
+                if sekcja.lang == 'polski' or sekcja.lang == 'termin obcy w języku polskim':
+                    for elem in ('dodatki', 'znaczenia', 'przykłady', 'składnia', 'kolokacje', 'synonimy', 'antonimy', 'pokrewne', 'frazeologia', 'etymologia', 'uwagi'):
+                        to_search += sekcja.subSections[elem].text
+
+                else:
+                    s_example_translation = None
+                    s_colloc_translation = None
+
+                    if '→' in sekcja.subSections['przykłady'].text:
+                        s_example_translation = re.findall(self.re_example_translation, sekcja.subSections['przykłady'].text)
+                    if s_example_translation:
+                        for a in s_example_translation:
+                            to_search += a
+                    if '→' in sekcja.subSections['kolokacje'].text:
+                        s_colloc_translation = re.findall(self.re_colloc_translation, sekcja.subSections['kolokacje'].text)
+                    if s_colloc_translation:
+                        for a in s_colloc_translation:
+                            to_search += a
 
+                    to_search = to_search + sekcja.subSections['znaczenia'].text
+
+        s_link = re.findall(self.re_link, to_search)
+        for link in s_link:
+            if '#' not in link and link not in self.deleted: #if there is a hash in the link, it is not '#pl' (excluded in regex), therefore not a Polish link; also, exlude words from deleted list
+                ranking.add(link)
+
+    def finish(self):
+        writeFrequencyList(self.ranking, self.alltitles)
+
+def frequencyList(date, processes=None):
+    runVisitors(date, [FrequencyListVisitor()], processes=processes)
+
+def writeFrequencyList(ranking, alltitles):
+
+    site = pwb.Site()
     dictlist = []
     for key, value in ranking.items():
         temp = [key,value]
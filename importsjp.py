@@ -76,7 +76,7 @@ class HasloSJP():
         self.problems = {'osoba': 0, 'kilka_znaczen' : 0, 'kilka_form_odmiany' : 0, 'synonimy' : 0, 'obcy' : 0, 'ndm' : 0, 'rodzaj' : 0, 'brak_znaczenia' : 0, 'przymiotnik_od' : 0}
 
         if not noWiki and not grabExisting:
-            try: ifExists = Haslo(a)
+            try: ifExists = Haslo.fromDump(a, checkRevision=True)
             except sectionsNotFound:
                 pass
             else:
@@ -5,14 +5,21 @@ import pywikibot
 import re
 import codecs
 import collections
+import heapq
+import json
 import locale
 import time
 import datetime
 import os
 import config
 from pywikibot import xmlreader
+import dumpReader
+import dumpCatalog
 import bz2
+import bisect
 import sys
+import itertools
+import threading
 from pywikibot.data.api import Request
 from os import environ
 #import mwparserfromhell
@@ -41,8 +48,30 @@ locale.setlocale(locale.LC_COLLATE,"pl_PL.UTF-8")
 class Haslo():
     regex = {}
     regex['langs-wstepna'] = re.compile(r'(.*?)==', re.DOTALL)
+    # the definition of a language section; Haslo.langs() finds the same sections with languageSectionSpans()
     regex['langs-lang'] = re.compile(r'(== .*?\(\{\{.*?\}\}\) ==.*?)(?=$|[^{{]==)', re.DOTALL)
-    def __init__(self, title, text='faoweoucmo3u4210987acskjdh', new=False):
+    regex['redirect'] = re.compile(r'\s*#(PATRZ|PRZEKIERUJ|TAM|REDIRECT)', re.IGNORECASE)
+
+    # the parse objects are created for every page of a dump, so they have no per-instance __dict__
+    __slots__ = ('site', 'type', 'title', 'wstepna', 'content', 'languages', 'lazy', 'sectionIndex', 'sections', '_listLangs',
+                 'page', 'baseRevision', 'baseTimestamp')
+
+    def __init__(self, title, text='faoweoucmo3u4210987acskjdh', new=False, languages=None, lazy=False, memo=None):
+        """
+        Args:
+        title (str, dumpReader.DumpPage): title of the page to fetch from the wiki or an entry from the dump
+        new (bool): a new page, with no sections yet
+        languages (iterable of str): only the sections of these languages (LanguageSection.lang, e.g. 'polski') are
+            built, the others are skipped (their headers aren't even checked). push() writes them back unchanged
+        lazy (bool): language headers are only indexed here; LanguageSections are built on the first access to
+            listLangs or section(), which is also where WrongHeader is raised
+        memo (bool): take the parse from parseMemo if the same text has been parsed before (see ParseMemo). By
+            default only pages fetched by title are, dump entries are not
+        """
+        self.setFilter(languages, lazy)
+        self.setBase()
+        if memo is None:
+            memo = type(title) is str
         if new == True:
             self.site = pywikibot.Site('pl', 'wiktionary')
             self.type = 3
@@ -53,88 +82,524 @@ class Haslo():
 
         elif type(title) is str:
             self.site = pywikibot.Site('pl', 'wiktionary')
-            self.type = 1
             self.title = title
-            self.wstepna = ''
-            page = pywikibot.Page(self.site, self.title)
-
-            try:
-                self.content = page.get()
-            except pywikibot.IsRedirectPage:
-                self.type = 0
-            except pywikibot.NoPage:
-                self.type = 1
-            except pywikibot.Error:
-                self.type = 2
-            else:
-                self.type = 3
-                if int(page.namespace()) != 0 and 'Wikipedysta:AlkamidBot/sjp/' not in self.title:
-                    self.type = 5
-
-                if self.type == 3:
-                    self.langs()
+            self.fromPage(pywikibot.Page(self.site, self.title), memo)
 
         else:
             self.title = title.title
             self.content = title.text
             self.type = 3
+            if getattr(title, 'revisionid', None):
+                self.setBase(revision=int(title.revisionid))
             #checking the namespace
             if title.ns != '0':
                 self.type = 5
+                parseStats.countPage(self.type)
 
             if self.type == 3:
-                self.langs()
+                self.parse(memo)
+
+    def fromPage(self, page, memo=True):
+        #type and sections of a pywikibot.Page; its text is fetched here unless it has been preloaded
+        self.type = 1
+        self.wstepna = ''
+        self.content = ''
+        self.setBase(page)
+        try:
+            self.content = page.get()
+        except pywikibot.IsRedirectPage:
+            self.type = 0
+        except pywikibot.NoPage:
+            self.type = 1
+        except pywikibot.Error:
+            self.type = 2
+        else:
+            # the revision that was read, so that push() doesn't have to fetch the page again to detect conflicts
+            self.setBase(page, page.latest_revision_id, page.latest_revision.timestamp)
+            self.type = 3
+            if int(page.namespace()) != 0 and 'Wikipedysta:AlkamidBot/sjp/' not in self.title:
+                self.type = 5
+
+            if self.type == 3:
+                self.parse(memo)
+                return
+        parseStats.countPage(self.type)
+
+    @classmethod
+    def fromTitles(cls, titles, batch=50, languages=None, lazy=False, memo=True):
+        """
+        Haslo(title) for every title, in the same order, with the texts of batch pages fetched in one API query
+        (prop=revisions with many titles) instead of one query per page.
+
+        Args:
+            titles (iterable of str)
+            batch (int): number of pages fetched at a time (at most 50 for most accounts, 500 for bots)
+            languages, lazy, memo: as in Haslo()
+        Yields:
+            Haslo, with the types Haslo(title) gives: 0 - redirect, 1 - the page doesn't exist, 2 - the page
+            couldn't be fetched (or the title is invalid), 3 - ok, 5 - not the main namespace. A generator can't
+            raise for one page and go on with the next ones, so the pages Haslo() raises an exception for are
+            yielded too: 4 - sectionsNotFound, 6 - WrongHeader
+        """
+        site = pywikibot.Site('pl', 'wiktionary')
+        titles = iter(titles)
+        while True:
+            titleList = list(itertools.islice(titles, batch))
+            if not titleList:
+                break
+            # a title repeated in the batch gets the same page
+            pages = {}
+            for title in titleList:
+                if title not in pages:
+                    try: pages[title] = pywikibot.Page(site, title)
+                    except pywikibot.Error:
+                        pages[title] = None
+            # preloadpages() fills in the texts, so page.get() below doesn't query the wiki again
+            for page in site.preloadpages([page for page in pages.values() if page is not None], groupsize=batch):
+                pass
+            for title in titleList:
+                page = pages[title]
+                haslo = cls.__new__(cls)
+                haslo.setFilter(languages, lazy)
+                haslo.setBase()
+                haslo.site = site
+                haslo.title = title
+                if page is None:
+                    haslo.type = 2
+                    haslo.wstepna = ''
+                    yield haslo
+                    continue
+                try: haslo.fromPage(page, memo)
+                except sectionsNotFound:
+                    haslo.type = 4
+                except WrongHeader:
+                    haslo.type = 6
+                yield haslo
+
+    def parse(self, memo=True):
+        #parseText(), with its result counted in parseStats
+        try: self.parseText(memo)
+        except sectionsNotFound:
+            parseStats.countPage(4)
+            raise
+        except WrongHeader:
+            parseStats.countPage(6)
+            raise
+        parseStats.countPage(self.type)
+
+    def parseText(self, memo=True):
+        #langs(), or the sections of the same text parsed before, from parseMemo
+        if not memo or not parseMemo.size:
+            self.langs()
+            return
+        # the text is a part of the key: the dict finds it by its hash (which Python keeps for a str) and compares
+        # the texts only when the hashes are the same
+        key = (self.title, self.content, frozenset(self.languages) if self.languages is not None else None, self.lazy)
+        record = parseMemo.get(key)
+        if record is not None:
+            start = parseStats.start()
+            try: self.fromMemo(record)
+            finally:
+                parseStats.stop('memo', start, self.title)
+            return
+        try: self.langs()
+        except sectionsNotFound:
+            parseMemo.put(key, {'error': 'sectionsNotFound'})
+            raise
+        except WrongHeader:
+            parseMemo.put(key, {'error': 'WrongHeader'})
+            raise
+        parseMemo.put(key, {'wstepna': textSpan(self.content, self.wstepna, 0), 'sectionIndex': tuple(self.sectionIndex),
+                            'sections': [(i, self.sections[i].toCache(self.content, self.sectionIndex[i][1])) for i in self.sections]})
+
+    def fromMemo(self, record):
+        #the state langs() leaves, rebuilt from a parseMemo record with new LanguageSections
+        if 'error' in record:
+            if record['error'] == 'sectionsNotFound':
+                self.type = 4
+            raise {'sectionsNotFound': sectionsNotFound, 'WrongHeader': WrongHeader}[record['error']]
+        self.wstepna = textFromSpan(self.content, record['wstepna'])
+        self.sectionIndex = record['sectionIndex']
+        self.sections = {}
+        for i, sectionRecord in record['sections']:
+            self.sections[i] = LanguageSection.fromCache(sectionRecord, self.title, self.content)
+        self._listLangs = None
+        if not self.lazy:
+            self.listLangs
 
     def langs(self):
-        self.listLangs = []
-        s_wstepna = re.search(Haslo.regex['langs-wstepna'], self.content)
-        if s_wstepna:
-            self.wstepna = s_wstepna.group(1)
+        self.listLangs = None
+        # the text before the first '==', as matched by Haslo.regex['langs-wstepna']
+        wstepnaEnd = self.content.find('==')
+        if wstepnaEnd != -1:
+            self.wstepna = self.content[:wstepnaEnd]
         else:
             self.wstepna = ''
 
-        s_lang = re.findall(Haslo.regex['langs-lang'], self.content)
-        if s_lang:
-            for b in s_lang:
-                self.listLangs.append(LanguageSection(b, self.title))
-        else:
+        # (language, start, end) of every section; the language is read from the header only
+        self.sectionIndex = []
+        self.sections = {}
+        clock = parseStats.start()
+        for start, end in languageSectionSpans(self.content):
+            self.sectionIndex.append((sectionLanguage(self.content, start, end), start, end))
+        parseStats.stop('sections', clock, self.title)
+        if not self.sectionIndex:
             self.type = 4
             raise sectionsNotFound
-
-    def push(self, offline=False, myComment = '', new=False):
-
+        if not self.lazy:
+            self.listLangs # builds the sections now
+
+    def setFilter(self, languages=None, lazy=False):
+        self.languages = set(languages) if languages is not None else None
+        self.lazy = lazy
+        self.sectionIndex = ()
+        self.sections = {}
+        self._listLangs = None
+
+    def setBase(self, page=None, revision=None, timestamp=None):
+        """
+        The revision the text of this Haslo comes from. push() saves with it as the base revision, so that the wiki
+        refuses the edit if the page has been changed since.
+
+        Args:
+            page (pywikibot.Page): the page the text was read from, saved again by push()
+            revision (int): revision id; None if the page didn't exist
+            timestamp (pywikibot.Timestamp): timestamp of the revision, if known
+        """
+        self.page = page
+        self.baseRevision = revision
+        self.baseTimestamp = timestamp
+
+    def wanted(self, lang):
+        return self.languages is None or lang in self.languages
+
+    def sectionAt(self, i):
+        #the LanguageSection of self.sectionIndex[i], built on the first call
+        try: return self.sections[i]
+        except KeyError:
+            lang, start, end = self.sectionIndex[i]
+            section = self.sections[i] = LanguageSection.fromSpan(self.content, start, end, self.title)
+            return section
+
+    @property
+    def listLangs(self):
+        if self._listLangs is None:
+            self._listLangs = [self.sectionAt(i) for i, (lang, start, end) in enumerate(self.sectionIndex) if self.wanted(lang)]
+        return self._listLangs
+
+    @listLangs.setter
+    def listLangs(self, value):
+        self._listLangs = value
+
+    def section(self, lang):
+        """The first section of the given language, or None
+
+        In lazy mode only this section is built, unless listLangs has already been.
+        """
+        if self._listLangs is not None:
+            for section in self._listLangs:
+                if section.lang == lang:
+                    return section
+            return None
+        for i, (sectionLang, start, end) in enumerate(self.sectionIndex):
+            if sectionLang == lang and self.wanted(lang):
+                return self.sectionAt(i)
+        return None
+
+    def toCache(self):
+        """
+        Parse results of the page as a json-serialisable record for the parse
+        cache (see parseCache.py). Substrings are stored as [start, end] spans of
+        self.content, so the record is small and the text has to be supplied
+        again by fromCache().
+        """
+        record = {'wstepna': textSpan(self.content, self.wstepna, 0), 'langs': []}
+        pos = 0
+        for lang in self.listLangs:
+            langRecord = lang.toCache(self.content, pos)
+            if isinstance(langRecord['content'], list):
+                pos = langRecord['content'][1]
+            record['langs'].append(langRecord)
+        return record
+
+    @classmethod
+    def fromCache(cls, entry, record):
+        """
+        Rebuild a Haslo from a dump entry and its cached record without running
+        the parser regexes. Raises the exception the parser raised for this text.
+        """
+        if 'error' in record:
+            parseStats.countPage({'sectionsNotFound': 4, 'WrongHeader': 6}[record['error']])
+            raise {'sectionsNotFound': sectionsNotFound, 'WrongHeader': WrongHeader}[record['error']]
+        start = parseStats.start()
+        haslo = cls.__new__(cls)
+        haslo.setFilter()
+        haslo.setBase(revision=int(entry.revisionid) if getattr(entry, 'revisionid', None) else None)
+        haslo.title = entry.title
+        haslo.content = entry.text
+        haslo.type = 3
+        haslo.wstepna = textFromSpan(haslo.content, record['wstepna'])
+        haslo.listLangs = [LanguageSection.fromCache(langRecord, haslo.title, haslo.content) for langRecord in record['langs']]
+        parseStats.stop('cache', start, haslo.title)
+        parseStats.countPage(haslo.type)
+        # the cached sections have been through pola() already
+        for section in haslo.listLangs:
+            parseStats.countSection(section)
+        return haslo
+
+    @classmethod
+    def fromDump(cls, title, date=None, checkRevision=False, languages=None, lazy=False):
+        """
+        Haslo(title), read from the local multistream dump instead of the wiki.
+
+        Args:
+            title (str)
+            date (str): date of the dump, the latest one by default
+            checkRevision (bool): compare the revision in the dump with the
+                live one and fetch the page from the wiki if it has been edited since
+            languages, lazy: as in Haslo()
+        Pages that are not in the dump (new or nonexistent) are fetched from the wiki.
+        """
+        if date is None:
+            date = dumpCatalog.getCatalog().latest('multistream')
+        page = None
+        if date is not None and os.path.isfile(dumpFilename(date, multistream=True)):
+            page = getTitleIndex(date).readPage(title)
+        if page is None:
+            return cls(title, languages=languages, lazy=lazy)
+
+        site = pywikibot.Site('pl', 'wiktionary')
+        if checkRevision:
+            livePage = pywikibot.Page(site, title)
+            if not livePage.exists() or livePage.latest_revision_id != int(page.revisionid):
+                return cls(title, languages=languages, lazy=lazy)
+
+        if re.match(Haslo.regex['redirect'], page.text):
+            haslo = cls.__new__(cls)
+            haslo.setFilter()
+            haslo.setBase(revision=int(page.revisionid))
+            haslo.title = page.title
+            haslo.content = page.text
+            haslo.wstepna = ''
+            haslo.listLangs = []
+            haslo.type = 0
+        else:
+            haslo = cls(page, languages=languages, lazy=lazy, memo=True)
+        haslo.site = site
+        if checkRevision:
+            # the revision has been read already, push() can save livePage without fetching it again
+            haslo.setBase(livePage, int(page.revisionid), livePage.latest_revision.timestamp)
+        return haslo
+
+    def allSections(self):
+        #listLangs and the sections skipped by the language filter, which push() writes back as they were
+        langs = self.listLangs
+        if self.languages is not None:
+            langs = langs + [self.sectionAt(i) for i, (lang, start, end) in enumerate(self.sectionIndex) if not self.wanted(lang)]
+        return langs
+
+    def inPageOrder(self, langs):
+        #True if langs are the sections read from the page, in its order: none of them has been added, removed or moved
+        pos = -1
+        for a in langs:
+            span = a.pageSpan()
+            if span is None or span[0] is not self.content or span[1] <= pos:
+                return False
+            pos = span[1]
+        return not self.sectionIndex or len(langs) == len(self.sectionIndex)
+
+    def changed(self):
+        """
+        True if push() has something to save: a section has been changed, added, removed or moved, or the text
+        before the first section has been changed. Otherwise push() doesn't build the text of the page at all.
+        """
+        try: langs = self.allSections()
+        except WrongHeader:
+            return True
+        wstepnaEnd = self.content.find('==')
+        if self.wstepna != (self.content[:wstepnaEnd] if wstepnaEnd != -1 else ''):
+            return True
+        if not self.inPageOrder(langs):
+            return True
+        return any(a.changed() for a in langs)
+
+    def pushText(self):
+        #the text push() saves; None if a section is wrong and the page shouldn't be saved
         toPush = self.wstepna
         sthWrong = 0
-        if not ':' in self.title:
+        # sections skipped by the language filter go back as they were; the page isn't saved if one of them
+        # has a wrong header (Haslo() without the filter would have raised WrongHeader)
+        try: langs = self.allSections()
+        except WrongHeader:
+            langs = self.listLangs
+            sthWrong = 1
+        # the sections are only sorted if some have been added, removed or moved; otherwise they stay in the order
+        # of the page, and only the changed ones are written again
+        if not ':' in self.title and not self.inPageOrder(langs):
             self.listLangs = sortSections(self.listLangs)
-        for a in self.listLangs:
+            langs = sortSections(langs)
+        # sections that haven't been changed are copied from the page as they are, with what was between them if
+        # they were next to each other, so that saving a page doesn't change its whitespace
+        previous = None
+        for a in langs:
             if a.type in (2,3,7):
                 sthWrong = 1
-            toPush += a.header + '\n' + a.content.strip() + '\n\n'
-        toPush = toPush.strip()
-        if not sthWrong:
-            if offline:
-                print(toPush)
+            span = a.sourceSpan()
+            if span is None:
+                if previous is not None:
+                    toPush = toPush.rstrip() + '\n\n'
+                toPush += a.header + '\n' + a.content.strip() + '\n\n'
             else:
-                page = pywikibot.Page(self.site, self.title)
-                try: content = page.get()
-                except pywikibot.IsRedirectPage:
-                    print('%s - konflikt edycji' % self.title)
-                except pywikibot.NoPage:
-                    if new:
-                        page.text = toPush
-                        page.save(comment=myComment)
-                except pywikibot.Error:
-                    print('%s - konflikt edycji' % self.title)
-                else:
-                    if content == self.content and content != toPush:
-                        page.text = toPush
-                        page.save(comment=myComment)
-                    elif content != self.content:
-                        print('%s - konflikt edycji' % self.title)
+                source, start, end = span
+                if previous is not None and previous[0] is source and 0 <= start - previous[2] <= 1:
+                    toPush += source[previous[2]:start]
+                elif previous is not None:
+                    toPush = toPush.rstrip() + '\n\n'
+                toPush += source[start:end]
+            previous = span
+        if sthWrong:
+            return None
+        return toPush.strip()
+
+    def pageToSave(self, toPush, new=False):
+        """
+        The pywikibot.Page with the new text set and the arguments for its save(), or (None, None) if there is
+        nothing to save: the text hasn't changed, or the page didn't exist and new is False.
+
+        Edit conflicts are detected by the wiki: the edit is made on top of self.baseRevision, and the wiki refuses
+        it (pywikibot.EditConflict) if the page has been edited, deleted or turned into a redirect since (pywikibot
+        itself may raise NoPage for a deleted one). A page that didn't exist is only created if it still doesn't.
+        """
+        if toPush == self.content:
+            return None, None
+        if self.baseRevision is None:
+            if not new:
+                return None, None
+            args = {'createonly': True}
+        else:
+            args = {'baserevid': self.baseRevision, 'recreate': False}
+            if self.baseTimestamp is not None:
+                args['basetimestamp'] = self.baseTimestamp
+        page = self.page if self.page is not None else pywikibot.Page(self.site, self.title)
+        page.text = toPush
+        return page, args
+
+    def push(self, offline=False, myComment = '', new=False):
+
+        if not self.changed():
+            return
+        toPush = self.pushText()
+        if toPush is None:
+            return
+        if offline:
+            print(toPush)
+            return
+        page, args = self.pageToSave(toPush, new)
+        if page is not None:
+            try: page.save(comment=myComment, **args)
+            except (pywikibot.EditConflict, pywikibot.NoPage):
+                print('%s - konflikt edycji' % self.title)
+
+    @staticmethod
+    def pushAll(words, myComment='', new=False):
+        """
+        push() for many pages. The saves are queued to pywikibot's put thread, which makes them one after another
+        with the edit throttle from the pywikibot config (put_throttle), while the next pages are being prepared.
+        Returns when all of them are done.
+
+        Args:
+            words (iterable of Haslo)
+            myComment, new: as in push()
+        Returns:
+            list of str: titles of the pages that weren't saved because of edit conflicts (or other save errors,
+                which are printed)
+        """
+        conflicts = []
+        queued = 0
+        done = threading.Semaphore(0)
+
+        def saved(page, error):
+            if error is not None:
+                if not isinstance(error, (pywikibot.EditConflict, pywikibot.NoPage)):
+                    print('%s - %s' % (page.title(), error))
+                conflicts.append(page.title())
+            done.release()
+
+        for word in words:
+            if not word.changed():
+                continue
+            toPush = word.pushText()
+            if toPush is None:
+                continue
+            page, args = word.pageToSave(toPush, new)
+            if page is None:
+                continue
+            page.save(comment=myComment, asynchronous=True, callback=saved, **args)
+            queued += 1
+        for i in range(queued):
+            done.acquire()
+        for title in conflicts:
+            print('%s - konflikt edycji' % title)
+        return conflicts
+
     def addSection(self, section):
         self.listLangs.append(section)
 
+def languageSectionSpans(content):
+    """Find the language sections of a page with str.find, without the backtracking of Haslo.regex['langs-lang']
+
+    The sections are the same as the matches of the regex: a section starts at '== ' followed by '({{' and then
+    '}}) ==' (the header), and ends before the first character other than '{' that is followed by '==', or at the end
+    of the page (before its final newline, if there is one). The next section is looked for from there.
+
+    Returns:
+    (list of tuples): (start, end) of every section in content
+    """
+    spans = []
+    length = len(content)
+    finalNewline = content.endswith('\n')
+    pos = 0
+    while True:
+        start = content.find('== ', pos)
+        if start == -1:
+            break
+        brace = content.find('({{', start + 3)
+        if brace == -1:
+            break
+        headerEnd = content.find('}}) ==', brace + 3)
+        if headerEnd == -1:
+            break
+        headerEnd += 6
+        end = length - 1 if finalNewline and length - 1 >= headerEnd else length
+        nextHeader = content.find('==', headerEnd + 1)
+        while nextHeader != -1 and nextHeader - 1 < end:
+            if content[nextHeader-1] != '{':
+                end = nextHeader - 1
+                break
+            nextHeader = content.find('==', nextHeader + 1)
+        spans.append((start, end))
+        pos = end
+    return spans
+
+def headerLineEnd(text, start=0, end=None):
+    #end of the first line of text[start:end] that isn't blank; the header regexes can't match across lines
+    if end is None:
+        end = len(text)
+    first = start
+    while first < end and text[first].isspace():
+        first += 1
+    lineEnd = text.find('\n', first, end)
+    return end if lineEnd == -1 else lineEnd
+
+def sectionLanguage(content, start, end):
+    #LanguageSection.lang of the section content[start:end], from its header; None if the header is wrong
+    s_lang = LanguageSection.regex['init-lang'].search(content, start, headerLineEnd(content, start, end))
+    if s_lang is None:
+        s_lang = LanguageSection.regex['init-lang'].search(content, start, end)
+    if s_lang:
+        return s_lang.group(3)
+    return None
+
 def sortSections(sectionList):
     """ sorting sections. The proper order is:
     1. "użycie międzynarodowe"
@@ -158,6 +623,194 @@ def sortSections(sectionList):
 
     return sectionList
 
+def textSpan(text, part, pos):
+    #[start, end] of part in text, searched from pos; part itself if it can't be found
+    start = text.find(part, pos)
+    if start == -1:
+        return part
+    return [start, start + len(part)]
+
+def textFromSpan(text, span):
+    if isinstance(span, str):
+        return span
+    return text[span[0]:span[1]]
+
+class ParseMemo():
+    """In-memory LRU memo of Haslo parses, for scripts that parse the same pages many times in one run
+
+    Keys are (title, text, language filter, lazy), values are records like Haslo.toCache() gives (spans of the
+    text), so every Haslo gets its own LanguageSections and changing them doesn't change the memo. Haslo() uses the
+    module-wide parseMemo; parseMemo.resize() sets its size.
+
+    Args:
+    size (int): number of parses kept, the least recently used one is dropped first; 0 turns the memo off
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.records = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try: record = self.records[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.records.move_to_end(key)
+        self.hits += 1
+        return record
+
+    def put(self, key, record):
+        self.records[key] = record
+        self.records.move_to_end(key)
+        while len(self.records) > self.size:
+            self.records.popitem(last=False)
+
+    def resize(self, size):
+        self.size = size
+        while len(self.records) > self.size:
+            self.records.popitem(last=False)
+
+    def clear(self):
+        self.records.clear()
+        self.hits = 0
+        self.misses = 0
+
+parseMemo = ParseMemo()
+
+class ParseStats():
+    """Opt-in instrumentation of the parser, for telling where the time of a dump run goes and what the pages turn out to be
+
+    It is off by default; parseStats.enable() turns on the module-wide instance. While it is on, the time of every
+    stage of the parser is added up:
+        sections - finding the language sections of a page and their languages (Haslo.langs())
+        headers - the header regexes of every section (LanguageSection.parseHeader())
+        memo, cache - rebuilding a page from parseMemo or from the parse cache instead of parsing it
+        pola - splitting sections into subsections (LanguageSection.splitSubSections())
+        znaczeniaDetail - the znaczeniaDetail regex and the numbering check in pola()
+    and Haslo types (4 - sectionsNotFound, 6 - WrongHeader, as in Haslo.fromTitles()), the types of sections after
+    pola() (2 - wrong header) and their languages are counted. The time of a page is the sum of its stages, pola()
+    of its sections included; the slowest pages are kept with the time of each stage.
+
+    Every getListFromXML() run exports the numbers as JSON when its pages have all been read (or the loop over them
+    has been left) and starts again from zero. Pages parsed in the worker processes of mapReduce.runParallel()
+    aren't counted.
+
+    Args:
+    slowest (int): number of the slowest pages kept
+    """
+
+    stageNames = ('sections', 'headers', 'memo', 'cache', 'pola', 'znaczeniaDetail')
+
+    def __init__(self, slowest=10):
+        self.enabled = False
+        self.slowestSize = slowest
+        self.filename = None
+        self.clear()
+
+    def enable(self, slowest=10, filename=None):
+        """
+        Args:
+        slowest (int): number of the slowest pages kept
+        filename (str): where export() writes, with '%s' for the date of the dump; by default
+            output/parseStats-<date>.json
+        """
+        self.enabled = True
+        self.slowestSize = slowest
+        self.filename = filename
+        self.clear()
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.stages = collections.OrderedDict((name, [0.0, 0]) for name in ParseStats.stageNames)
+        self.pageTypes = collections.Counter()
+        self.sectionTypes = collections.Counter()
+        self.languages = collections.Counter()
+        self.slowest = []
+        self.currentTitle = None
+        self.currentTime = 0.0
+        self.currentStages = {}
+
+    def start(self):
+        #the start of a stage for stop(); None when off, so that stop() doesn't do anything
+        if self.enabled:
+            return time.perf_counter()
+        return None
+
+    def stop(self, stage, start, title):
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        total = self.stages[stage]
+        total[0] += elapsed
+        total[1] += 1
+        # stages of the same page come one after another
+        if title != self.currentTitle:
+            self.finishPage()
+            self.currentTitle = title
+        self.currentTime += elapsed
+        self.currentStages[stage] = self.currentStages.get(stage, 0.0) + elapsed
+
+    def finishPage(self):
+        if self.currentTitle is not None:
+            page = (self.currentTime, self.currentTitle, tuple(sorted(self.currentStages.items())))
+            if len(self.slowest) < self.slowestSize:
+                heapq.heappush(self.slowest, page)
+            elif self.slowestSize:
+                heapq.heappushpop(self.slowest, page)
+        self.currentTitle = None
+        self.currentTime = 0.0
+        self.currentStages = {}
+
+    def countPage(self, type):
+        if self.enabled:
+            self.pageTypes[type] += 1
+
+    def countSection(self, section):
+        if self.enabled:
+            self.sectionTypes[section.type] += 1
+            if section.type != 2:
+                self.languages[section.lang] += 1
+
+    def report(self):
+        #the numbers as a json-serialisable dict
+        self.finishPage()
+        return collections.OrderedDict((
+            ('pages', sum(self.pageTypes.values())),
+            ('stages', collections.OrderedDict((name, {'time': round(total[0], 6), 'calls': total[1]}) for name, total in self.stages.items())),
+            ('pageTypes', collections.OrderedDict((str(type), count) for type, count in sorted(self.pageTypes.items()))),
+            ('sectionTypes', collections.OrderedDict((str(type), count) for type, count in sorted(self.sectionTypes.items()))),
+            ('languages', collections.OrderedDict(self.languages.most_common())),
+            ('slowest', [collections.OrderedDict((('title', title), ('time', round(total, 6)),
+                                                  ('stages', collections.OrderedDict((name, round(t, 6)) for name, t in stages))))
+                         for total, title, stages in sorted(self.slowest, reverse=True)]),
+        ))
+
+    def export(self, date):
+        #writes report() and starts from zero; returns the name of the file
+        if self.filename is not None:
+            filename = self.filename % date if '%s' in self.filename else self.filename
+        else:
+            os.makedirs('%soutput' % config.path['scripts'], exist_ok=True)
+            filename = '%soutput/parseStats-%s.json' % (config.path['scripts'], date)
+        with open(filename, encoding='utf-8', mode='w') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        self.clear()
+        return filename
+
+    def watch(self, pages, date):
+        #the pages of a getListFromXML() run, exported when the run ends
+        try:
+            for entry in pages:
+                yield entry
+        finally:
+            self.export(date)
+
+parseStats = ParseStats()
+
 class notFromMainNamespace(Exception):
     def __init__(self):
         self.value = 'not from main namespace!'
@@ -190,6 +843,7 @@ class NotExampleField(Exception):
 
 
 def generateRegexp(order):
+    #one regex per subsection, the definition of how pola() splits a section (see benchmark_pola.py)
     for i, sect in enumerate(order):
         if i == len(order) - 1:
             order[i].regex = re.compile(r'%s(.*)' % (order[i].template), re.DOTALL)
@@ -212,6 +866,8 @@ def generateRegexp(order):
 #TODO: numerek dla każdego z typów
 
 class subSection():
+    __slots__ = ('name', 'template', 'optional', 'regex')
+
     def __init__(self, template, optional=False, name=None, regex=None):
         if name:
             self.name = name
@@ -224,15 +880,122 @@ class subSection():
         self.optional = optional
         self.regex = regex
 
+NumberedEntry = collections.namedtuple('NumberedEntry', ('number', 'text', 'whole'))
+
+class NumberedList():
+    """Numbered entries of a field (znaczenia, przykłady, synonimy...): every line starting with ': (1.1)' and the
+    lines after it, up to the next numbered line
+
+    Attributes:
+    entries (list of NumberedEntry): in the order of the text; number is '1.1', text is what follows the number, whole
+        is the entry with the number
+    byNumber (dict): NumberedEntry for every number (the first one, if a number repeats)
+    prefix (str): the text before the first numbered line
+    source (str): the text the entries were found in
+    """
+    __slots__ = ('entries', 'byNumber', 'prefix', 'source')
+
+    numberedLine = re.compile(r'[ \t]*:[ \t]*\(([0-9]+(?:\.[0-9]+)+)\)\s?')
+
+    def __init__(self, text):
+        self.source = text
+        self.entries = []
+        self.byNumber = {}
+        starts = []
+        pos = 0
+        length = len(text)
+        while pos < length:
+            lineEnd = text.find('\n', pos)
+            if lineEnd == -1:
+                lineEnd = length
+            s = NumberedList.numberedLine.match(text, pos, lineEnd)
+            if s:
+                starts.append((pos, s.end(), s.group(1)))
+            pos = lineEnd + 1
+        # an entry ends before the newline of the next numbered line, the last one before the final newline
+        end = length - 1 if text.endswith('\n') else length
+        for start, textStart, number in reversed(starts):
+            entry = NumberedEntry(number, text[textStart:max(end, textStart)], text[start:max(end, textStart)])
+            self.entries.append(entry)
+            end = start - 1
+        self.entries.reverse()
+        for entry in self.entries:
+            self.byNumber.setdefault(entry.number, entry)
+        self.prefix = text[:starts[0][0]] if starts else text
+
+    def get(self, number, default=None):
+        return self.byNumber.get(number, default)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+class MeaningIndex():
+    """The meanings of a language section: its part of speech blocks and the numbered definitions in each of them
+
+    Attributes:
+    blocks (list of tuples): (part of speech, NumberedList of its definitions), as in LanguageSection.znaczeniaDetail
+    byNumber (dict): NumberedEntry of every meaning number in the section
+    """
+    __slots__ = ('blocks', 'byNumber')
+
+    def __init__(self, blocks):
+        self.blocks = [(partOfSpeech, NumberedList(text)) for partOfSpeech, text in blocks]
+        self.byNumber = {}
+        for partOfSpeech, numbered in self.blocks:
+            for entry in numbered.entries:
+                self.byNumber.setdefault(entry.number, entry)
+
+    @classmethod
+    def fromText(cls, text):
+        #index of a {{znaczenia}} text that wasn't parsed by pola(); the lines starting with '' or {{ begin blocks
+        blocks = []
+        partOfSpeech = ''
+        blockStart = 0
+        pos = 0
+        length = len(text)
+        while pos < length:
+            lineEnd = text.find('\n', pos)
+            if lineEnd == -1:
+                lineEnd = length
+            if text.startswith("''", pos) or text.startswith('{{', pos):
+                if pos > blockStart or partOfSpeech:
+                    blocks.append((partOfSpeech, text[blockStart:pos]))
+                partOfSpeech = text[pos:lineEnd]
+                blockStart = lineEnd
+            pos = lineEnd + 1
+        blocks.append((partOfSpeech, text[blockStart:]))
+        return cls(blocks)
+
+    def get(self, number, default=None):
+        return self.byNumber.get(number, default)
+
+    def __iter__(self):
+        for partOfSpeech, numbered in self.blocks:
+            for entry in numbered.entries:
+                yield entry
+
+    def __len__(self):
+        return sum(len(numbered) for partOfSpeech, numbered in self.blocks)
+
 class LanguageSection():
+    # the content is a span of the page text (_source[_contentStart:_contentEnd]) until it is assigned (_content);
+    # _znaczeniaRead is znaczeniaDetail as it has been read, as tuples, to tell whether it has been changed
+    __slots__ = ('subSections', 'inflectedOnly', 'title', 'titleHeader', 'headerArg', 'header', 'lang', 'langUpper',
+                 'langLong', 'type', 'znaczeniaDetail', '_znaczeniaRead', '_meanings', '_content', '_source',
+                 '_sectionStart', '_contentStart', '_contentEnd')
     regex = {}
     regex['init-lang'] = re.compile(r'== (.*?) \(\{\{(język |)(.*?)(?=\|(.*?)\}\}\) ==|\}\}\) ==)')
     regex['init-langLong'] = re.compile(r'== (.*?) \(\{\{(.*?)(\|.*?\}\}\) ==|\}\}\) ==)')
     regex['init-headerAndContent'] = re.compile(r'\s*(== .*? \({{.*?}}\) ==)[ ]*\n(.*)', re.DOTALL)
+    # init-headerAndContent with the header on the first line, where it is on all proper pages
+    regex['init-headerLine'] = re.compile(r'\s*(== .*? \({{.*?}}\) ==)[ ]*\n')
 
     regex['pola-znaczeniaDetail'] = re.compile(r'\n\s*?(\'\'.*?|{{forma rzeczownika.*?|{{forma przymiotnika.*?|{{forma czasownika.*?|{{przysłowie .*?|{{morfem\|.*?)\s*?(\n\s*?\: \([0-9]\.[0-9]\.*[0-9]*\).*?)(?=\n\'\'|\n{{forma rzeczownika|\n{{forma przymiotnika|\n{{forma czasownika|\n{{przysłowie|\n{{morfem\||$)', re.DOTALL)
 
-    regex['pola-nr'] = re.compile(r'\(([0-9]\.[0-9]\.*[0-9]*)\)')
+    regex['pola-marker'] = re.compile(r'{{[^{}\n]*}}')
 
     # define subsection order for different languages. Could be fetched from pl.wikt if we had it written somewhere
 
@@ -286,15 +1049,24 @@ class LanguageSection():
     for order in sectionOrder:
         generateRegexp(sectionOrder[order])
 
+    # all subsection templates ({{wymowa}}, {{znaczenia}}...), the markers subSectionMarkers() looks for
+    markers = set()
+    for order in sectionOrder:
+        markers.update(sect.template for sect in sectionOrder[order] if sect.template)
+
 
     def __init__(self, text='afeof5imad3sfa5', title = '2o3iremdas', type=666, lang='bumbum'):
 
         self.subSections = collections.OrderedDict()
         self.inflectedOnly = False # denotes entries with inflected words only
+        self._meanings = None
+        self._znaczeniaRead = None
+        self._content = None
+        self._source = None
         if text == 'afeof5imad3sfa5' and title != '2o3iremdas' and type != 666 and lang != 'bumbum':
             self.title = title
-            self.langLong = lang
-            self.lang = lang.replace('język ', '')
+            self.langLong = sys.intern(lang)
+            self.lang = sys.intern(lang.replace('język ', ''))
             self.type = type
             self.header = '== %s ({{%s}}) ==' % (title, lang)
             self.znaczeniaDetail = []
@@ -306,26 +1078,172 @@ class LanguageSection():
                     self.subSections[order[elem]] = Pole('')
 
         elif text != 'afeof5imad3sfa5' and type == 666 and lang == 'bumbum':
-
-            s_lang = re.search(LanguageSection.regex['init-lang'], text)
-            s_langLong = re.search(LanguageSection.regex['init-langLong'], text)
-            s_headerAndContent = re.search(LanguageSection.regex['init-headerAndContent'], text)
-            if s_lang and s_langLong and s_headerAndContent:
-                self.title = title
-                self.titleHeader = s_lang.group(1)
-                if s_lang.group(4):
-                    self.headerArg = s_lang.group(4)
+            self.parseHeader(text, 0, len(text), title)
+
+    @classmethod
+    def fromSpan(cls, source, start, end, title):
+        #LanguageSection(source[start:end], title) that keeps spans of source instead of copies of the text
+        section = cls.__new__(cls)
+        section.subSections = collections.OrderedDict()
+        section.inflectedOnly = False
+        section._meanings = None
+        section._znaczeniaRead = None
+        section._content = None
+        section._source = None
+        section.parseHeader(source, start, end, title)
+        return section
+
+    def parseHeader(self, source, start, end, title):
+        # the header regexes are tried on the header line first (a match there is the same as in the whole
+        # text), so that they don't run over the whole section
+        clock = parseStats.start()
+        lineEnd = headerLineEnd(source, start, end)
+        s_lang = LanguageSection.regex['init-lang'].search(source, start, lineEnd) or LanguageSection.regex['init-lang'].search(source, start, end)
+        s_langLong = LanguageSection.regex['init-langLong'].search(source, start, lineEnd) or LanguageSection.regex['init-langLong'].search(source, start, end)
+        s_headerAndContent = LanguageSection.regex['init-headerLine'].match(source, start, end)
+        if s_headerAndContent:
+            headerGroup = s_headerAndContent.group(1)
+            contentStart = s_headerAndContent.end()
+        else:
+            s_headerAndContent = LanguageSection.regex['init-headerAndContent'].search(source, start, end)
+            if s_headerAndContent:
+                headerGroup = s_headerAndContent.group(1)
+                contentStart = s_headerAndContent.start(2)
+        if s_lang and s_langLong and s_headerAndContent:
+            self.title = title
+            self.titleHeader = s_lang.group(1)
+            if s_lang.group(4):
+                self.headerArg = s_lang.group(4)
+            else:
+                self.headerArg = ''
+            self.header = headerGroup.strip()
+            # language names repeat on every page, interned they are kept once
+            self.lang = sys.intern(s_lang.group(3))
+            self.langUpper = sys.intern(self.lang[0].upper() + self.lang[1:])
+            self.langLong = sys.intern(s_langLong.group(2))
+            self._source = source
+            self._sectionStart = start
+            self._contentStart = contentStart
+            self._contentEnd = end
+            self.type = 1
+            parseStats.stop('headers', clock, title)
+        else:
+            self.type = 2
+            parseStats.stop('headers', clock, title)
+            parseStats.countSection(self)
+            raise WrongHeader
+
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        if self._source is None:
+            raise AttributeError('content')
+        return self._source[self._contentStart:self._contentEnd]
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    def contentLocation(self):
+        #(string, start, end) of the content, for searching it without a copy
+        if self._content is not None:
+            return self._content, 0, len(self._content)
+        if self._source is None:
+            raise AttributeError('content')
+        return self._source, self._contentStart, self._contentEnd
+
+    def sourceSpan(self):
+        #(page text, start, end) of the whole section as it is on the page; None if its header or content has been changed
+        if self._content is not None or self._source is None:
+            return None
+        if self._source[self._sectionStart:self._contentStart].strip() != self.header:
+            return None
+        return self._source, self._sectionStart, self._contentEnd
+
+    def toCache(self, pageContent, pos=0):
+        #see Haslo.toCache(); subsection and znaczeniaDetail spans are relative to self.content
+        record = {'type': self.type, 'titleHeader': self.titleHeader, 'headerArg': self.headerArg,
+                  'header': self.header, 'lang': self.lang, 'langLong': self.langLong,
+                  'inflectedOnly': self.inflectedOnly}
+        if self._content is None and self._source is pageContent:
+            record['content'] = [self._contentStart, self._contentEnd]
+            record['start'] = self._sectionStart
+        else:
+            record['content'] = textSpan(pageContent, self.content, pos)
+        string, contentStart, contentEnd = self.contentLocation()
+        subSections = []
+        pos = 0
+        for name in self.subSections:
+            pole = self.subSections[name]
+            if pole.spanOf(string):
+                source, start, end = pole.location()
+                subSections.append([name, [start - contentStart, end - contentStart]])
+                continue
+            text = pole.text
+            marker = '' if name == 'dodatki' else '{{%s}}' % name
+            span = textSpan(self.content, marker + text, pos)
+            if isinstance(span, list):
+                span[0] += len(marker)
+                pos = span[1]
+            else:
+                span = text
+            subSections.append([name, span])
+        record['subSections'] = subSections
+
+        if hasattr(self, 'znaczeniaDetail'):
+            details = []
+            znaczenia = self.subSections['znaczenia'].text if 'znaczenia' in self.subSections else ''
+            pos = 0
+            for d in self.znaczeniaDetail:
+                start = znaczenia.find(d[0] + d[1], pos)
+                if start == -1:
+                    details.append(list(d))
                 else:
-                    self.headerArg = ''
-                self.header = s_headerAndContent.group(1).strip()
-                self.lang = s_lang.group(3)
-                self.langUpper = self.lang[0].upper() + self.lang[1:]
-                self.langLong = s_langLong.group(2)
-                self.content = s_headerAndContent.group(2)
-                self.type = 1
+                    pos = start + len(d[0]) + len(d[1])
+                    details.append([start, start + len(d[0]), pos])
+            record['znaczeniaDetail'] = details
+        return record
+
+    @classmethod
+    def fromCache(cls, record, title, pageContent):
+        section = cls.__new__(cls)
+        section.title = title
+        section.type = record['type']
+        section.titleHeader = record['titleHeader']
+        section.headerArg = record['headerArg']
+        section.header = record['header']
+        section.lang = sys.intern(record['lang'])
+        section.langUpper = sys.intern(section.lang[0].upper() + section.lang[1:])
+        section.langLong = sys.intern(record['langLong'])
+        section.inflectedOnly = record['inflectedOnly']
+        section._meanings = None
+        section._znaczeniaRead = None
+        if isinstance(record['content'], str):
+            section._content = record['content']
+            section._source = None
+        else:
+            section._content = None
+            section._source = pageContent
+            section._contentStart, section._contentEnd = record['content']
+            section._sectionStart = record['start']
+        string, contentStart, contentEnd = section.contentLocation()
+        section.subSections = collections.OrderedDict()
+        for name, span in record['subSections']:
+            if isinstance(span, str):
+                section.subSections[name] = Pole(span)
             else:
-                self.type = 2
-                raise WrongHeader
+                section.subSections[name] = Pole.fromSpan(string, contentStart + span[0], contentStart + span[1])
+        if 'znaczeniaDetail' in record:
+            znaczenia = section.subSections['znaczenia'].text if 'znaczenia' in section.subSections else ''
+            section.znaczeniaDetail = []
+            for d in record['znaczeniaDetail']:
+                if isinstance(d[0], str):
+                    section.znaczeniaDetail.append(list(d))
+                else:
+                    section.znaczeniaDetail.append([znaczenia[d[0]:d[1]], znaczenia[d[1]:d[2]]])
+            section._znaczeniaRead = [tuple(d) for d in section.znaczeniaDetail]
+        return section
 
     def updateHeader(self):
 
@@ -335,22 +1253,145 @@ class LanguageSection():
         self.header += '}}) =='
 
     def saveChanges(self):
-        try: self.subSections['znaczenia']
+        try: znaczenia = self.subSections['znaczenia']
         except AttributeError:
             pass
         else:
-            znaczeniaWhole = ''
-            for a in self.znaczeniaDetail: # łączy sekcję "znaczenia" (jest wcześniej rozbijana na "część mowy" i znaczenie)
-                znaczeniaWhole += '\n' + a[0] + a[1]
-            self.subSections['znaczenia'] = Pole(znaczeniaWhole)
-
-
-        self.content = ''
-        for elem in self.subSections:
-            if elem == 'dodatki':
-                self.content += self.subSections[elem].text
+            # rebuilt only if znaczeniaDetail has been changed; otherwise the text stays as it was, with its whitespace
+            read = self._znaczeniaRead
+            if read is None:
+                read = LanguageSection.regex['pola-znaczeniaDetail'].findall(*znaczenia.location())
+            if [tuple(a) for a in self.znaczeniaDetail] != read:
+                znaczeniaWhole = ''
+                for a in self.znaczeniaDetail: # łączy sekcję "znaczenia" (jest wcześniej rozbijana na "część mowy" i znaczenie)
+                    znaczeniaWhole += '\n' + a[0] + a[1]
+                znaczenia.text = znaczeniaWhole
+                self._znaczeniaRead = [tuple(a) for a in self.znaczeniaDetail]
+
+        spans = self.changedSpans()
+        if spans is None:
+            content = ''
+            for elem in self.subSections:
+                if elem == 'dodatki':
+                    content += self.subSections[elem].text
+                else:
+                    content += '\n{{%s}}%s' % (elem, self.subSections[elem].text)
+        elif not spans and self._content is None:
+            # nothing has been changed: the content stays a span of the page
+            return
+        else:
+            # only the changed subsections are written again, in place of their spans of the content as it was read
+            pieces = []
+            pos = self._contentStart
+            for start, end, pole in spans:
+                pieces.append(self._source[pos:start])
+                pieces.append(pole.text)
+                pos = end
+            pieces.append(self._source[pos:self._contentEnd])
+            content = ''.join(pieces)
+        # a section that hasn't changed keeps its span of the page, so push() writes it back as it was (push()
+        # strips the content of the others, so the whitespace around it doesn't count as a change)
+        if self.sourceSpan() is None or content.strip() != self.content.strip():
+            self.content = content
+
+    def changedSpans(self):
+        """
+        The subsections that have been changed since they were read from the page, for saveChanges()
+
+        Returns:
+        (list of tuples): (start, end, Pole) of every changed subsection, where start and end are its original span
+            of the page text, ascending; empty if none has been changed. None if a subsection hasn't been read from
+            the content as it is on the page, or has been added to it, or the subsections aren't in the order of
+            their spans; then saveChanges() builds the content from all of them.
+        """
+        if self._source is None:
+            return None
+        source = self._source
+        spans = []
+        end = self._contentStart
+        for pole in self.subSections.values():
+            if pole._source is source:
+                # not changed, the common case
+                if pole._start < end:
+                    return None
+                end = pole._end
+                continue
+            origin = pole.origin()
+            if origin is None:
+                # an optional subsection missing from the page stays out of it as long as it is empty
+                if pole.text == '':
+                    continue
+                return None
+            if origin[0] is not source or origin[1] < end:
+                return None
+            end = origin[2]
+            spans.append(origin[1:] + (pole,))
+        return spans
+
+    def changed(self):
+        #True if the section isn't written back as it is on the page (see sourceSpan())
+        return self.sourceSpan() is None
+
+    def pageSpan(self):
+        #(page text, start, end) of the section as it has been read, even if it has been changed since; None if it hasn't been read from a text
+        if self._source is None:
+            return None
+        return self._source, self._sectionStart, self._contentEnd
+
+    def subSectionMarkers(self):
+        """Find all subsection templates in the section in one pass
+
+        Returns:
+        (dict): template -> position of its first occurrence in self.content
+        (dict): template -> positions of its occurrences at the beginning of a line, ascending
+        """
+        first = {}
+        lineStarts = collections.defaultdict(list)
+        string, contentStart, contentEnd = self.contentLocation()
+        markers = LanguageSection.markers
+        for s in LanguageSection.regex['pola-marker'].finditer(string, contentStart, contentEnd):
+            template = s.group(0)
+            if template in markers:
+                pos = s.start() - contentStart
+                if template not in first:
+                    first[template] = pos
+                if pos and string[contentStart+pos-1] == '\n':
+                    lineStarts[template].append(pos)
+        return first, lineStarts
+
+    def splitSubSections(self, order):
+        """Fill self.subSections with the subsections from `order`
+
+        The split is the same as with the regexes from generateRegexp(): a subsection starts after the first occurrence
+        of its template ('dodatki', with no template, at the beginning) and ends before the first occurrence of the
+        next template that follows it at the beginning of a line (the last one runs to the end). All templates are
+        found in one pass over the content, so it doesn't depend on the number of subsections.
+
+        Returns:
+        (bool): False if a subsection that isn't optional is missing; the subsections before it are filled
+        """
+        first, lineStarts = self.subSectionMarkers()
+        string, contentStart, contentEnd = self.contentLocation()
+        for i, sect in enumerate(order):
+            end = None
+            start = first.get(sect.template) if sect.template else 0
+            if start is not None:
+                start += len(sect.template)
+                if i == len(order) - 1:
+                    end = contentEnd - contentStart
+                else:
+                    nextStarts = lineStarts.get(order[i+1].template, ())
+                    k = bisect.bisect_right(nextStarts, start)
+                    if k < len(nextStarts):
+                        end = nextStarts[k]-1
+            if end is not None:
+                # a subsection is a span of the same string as the content
+                self.subSections[sect.name] = Pole.fromSpan(string, contentStart + start, contentStart + end)
+            elif sect.optional:
+                self.subSections[sect.name] = Pole('')
             else:
-                self.content += '\n{{%s}}%s' % (elem, self.subSections[elem].text)
+                return False
+        return True
 
     def pola(self):
 
@@ -358,31 +1399,43 @@ class LanguageSection():
             try: order = LanguageSection.sectionOrder[self.lang] # look for subsection order templates for specific languages
             except KeyError:
                 order = LanguageSection.sectionOrder['default']
-            for sect in order:
-                s = re.search(sect.regex, self.content)
-                if s:
-                    self.subSections[sect.name] = Pole(s.group(1))
-                elif sect.optional:
-                    self.subSections[sect.name] = Pole('')
-                else:
-                    self.type = 7
-                    return 7
-
-
-            s_znaczeniaDetail = re.findall(LanguageSection.regex['pola-znaczeniaDetail'], self.subSections['znaczenia'].text)
+            clock = parseStats.start()
+            split = self.splitSubSections(order)
+            parseStats.stop('pola', clock, self.title)
+            if not split:
+                self.type = 7
+                parseStats.countSection(self)
+                return 7
+
+            clock = parseStats.start()
+            self._meanings = None
+            s_znaczeniaDetail = LanguageSection.regex['pola-znaczeniaDetail'].findall(*self.subSections['znaczenia'].location())
+            self._znaczeniaRead = s_znaczeniaDetail
             if s_znaczeniaDetail:
                 self.znaczeniaDetail = [list(tup) for tup in s_znaczeniaDetail]
 
                 self.checkForInflectedForms(self.znaczeniaDetail)
-                # checking if the last number [(1.1), (2.1) etc.] matches the length of self.znaczeniaDetail - if it doesn't, it means that the numbering is invalid
-                s_numer = re.search(LanguageSection.regex['pola-nr'], self.znaczeniaDetail[-1][1])
-                if int(s_numer.group(1)[0]) != len(self.znaczeniaDetail):
+                # checking if the number of the last part of speech [(1.1), (2.1) etc.] matches the length of self.znaczeniaDetail - if it doesn't, it means that the numbering is invalid
+                lastBlock = self.meanings.blocks[-1][1].entries
+                if not lastBlock or int(lastBlock[0].number.split('.')[0]) != len(self.znaczeniaDetail):
                     self.type = 14
             else:
                 if self.lang == 'znak chiński':
                     self.znaczeniaDetail = []
                 else:
                     self.type = 5
+            parseStats.stop('znaczeniaDetail', clock, self.title)
+            parseStats.countSection(self)
+
+    @property
+    def meanings(self):
+        #MeaningIndex of self.znaczeniaDetail, built when it is first needed
+        if self._meanings is None:
+            try: blocks = self.znaczeniaDetail
+            except AttributeError: # pola() hasn't found any meanings
+                blocks = []
+            self._meanings = MeaningIndex(blocks)
+        return self._meanings
 
     def checkForInflectedForms(self, meanings):
         allFlexForms = True
@@ -402,14 +1455,20 @@ class Pole():
     regex['init-obrazek'] = re.compile(r'{{zch-obrazek\|([a-z]*?)\|(.*?)}}')
     regex['init-kodySlowniki-details'] = re.compile(r'([a-z]*?)=(.*?)(?=\||$)')
     regex['init-kolejnosc'] = re.compile(r'({{zch-komiks|{{zch-animacja|{{zch-cienie)[\|]*(.*?)}}')
-    regex['numer-nr-whole'] = re.compile(r'(\:\s*?\([1-9].*?\))(.*?)(?=\n\:|$)', re.DOTALL)
+
+    # most fields never use list or dict, so they are only created when accessed; the text of a field made by
+    # fromSpan() is _source[_start:_end] until it is assigned (_text), and then the span is kept in _origin
+    __slots__ = ('type', '_text', '_source', '_start', '_end', '_origin', '_list', '_dict', '_numbered')
 
     def __init__(self, text, type='auto'):
 
         self.type = type
-        self.text = text
-        self.list = []
-        self.dict = {}
+        self._text = text
+        self._source = None
+        self._origin = None
+        self._list = None
+        self._dict = None
+        self._numbered = None
         if type == 'warianty':
             warianty = re.findall(Pole.regex['init-warianty-details'], self.text)
             for b in warianty:
@@ -432,15 +1491,89 @@ class Pole():
             for b in kody:
                 self.dict[b[0]] = b[1]
 
+    @classmethod
+    def fromSpan(cls, source, start, end):
+        #Pole(source[start:end]) without the copy; the text is sliced when it is read
+        pole = cls.__new__(cls)
+        pole.type = 'auto'
+        pole._text = None
+        pole._source = source
+        pole._start = start
+        pole._end = end
+        pole._origin = None
+        pole._list = None
+        pole._dict = None
+        pole._numbered = None
+        return pole
+
+    @property
+    def text(self):
+        if self._source is not None:
+            return self._source[self._start:self._end]
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if self._source is not None:
+            self._origin = (self._source, self._start, self._end)
+            self._source = None
+        self._text = value
+        self._numbered = None
+
+    def changed(self):
+        #True if the text isn't the one read from the page: it has been assigned, or the field has been made with Pole()
+        return self._source is None
+
+    def origin(self):
+        #(string, start, end) of the span the field has been read from, even if its text has been assigned since; None if it hasn't been read from one
+        if self._source is not None:
+            return self._source, self._start, self._end
+        return self._origin
+
+    def location(self):
+        #(string, start, end) of the text, for searching it without a copy
+        if self._source is not None:
+            return self._source, self._start, self._end
+        return self._text, 0, len(self._text)
+
+    def spanOf(self, string):
+        #True if the text is still a span of string
+        return self._source is not None and self._source is string
+
+    @property
+    def list(self):
+        if self._list is None:
+            self._list = []
+        return self._list
+
+    @list.setter
+    def list(self, value):
+        self._list = value
+
+    @property
+    def dict(self):
+        if self._dict is None:
+            self._dict = {}
+        return self._dict
+
+    @dict.setter
+    def dict(self, value):
+        self._dict = value
+
+    @property
+    def numbered(self):
+        #NumberedList of the field, found again only if self.text has been changed
+        if self._numbered is None:
+            self._numbered = NumberedList(self.text)
+        return self._numbered
+
     def add_example(self, num, example_text):
         #TODO: make it universal so it works for any subsection
         if self.type != 'auto':
             raise NotExampleField
 
-        #https://regex101.com/r/xP6eR5/4
         #find all existing examples
-        re_example = re.compile(r'(\: \(([0-9]\.[0-9]{1,2})\)\s{0,1}.*?)(?=\n\: \([0-9]\.[0-9]{1,2}\)|$)', re.DOTALL)
-        s_examples = re.findall(re_example, self.text)
+        s_examples = [(entry.whole, entry.number) for entry in self.numbered]
 
         re_refs = re.compile(r'(<ref.*?(?:/>|</ref>))')
         newtext_without_refs = re.sub(re_refs, '', example_text)
@@ -552,14 +1685,11 @@ class Pole():
             self.text = text
             return text
     def numer(self):
-        s_nr_whole = re.findall(Pole.regex['numer-nr-whole'], self.text)
-        testString = ''
-        if s_nr_whole:
-            self.list = [list(tup) for tup in s_nr_whole]
-            for elem in self.list:
-                for e in elem:
-                    testString += e
-            if testString.strip().replace('\n', '') != self.text.strip().replace('\n', ''):
+        #type 1 - no numbered entries, 2 - only numbered entries, 3 - there is some text before the first one
+        numbered = self.numbered
+        if numbered.entries:
+            self.list = [[entry.whole[:len(entry.whole) - len(entry.text)], entry.text] for entry in numbered]
+            if numbered.prefix.strip():
                 self.type = 3
             else:
                 self.type = 2
@@ -651,9 +1781,24 @@ class Language():
         self.code = code
 
 class SectionFr():
+    """A language section of an fr.wiktionary page in the layout with '{{-xxx-}}' markers
+
+    pola() splits it into fields at the markers in one pass (str.find() of '{{-', then a precompiled regex at each
+    of them): a field runs from the end of its marker (and the newline after it) to the next '{{-' or the end of
+    the section; a marker repeated in the section counts the first time, as re.search() found it.
+    """
+
+    regex = {}
+    regex['init-lang'] = re.compile(r'==(| )?{{=(.*?)=}}')
+    regex['pola-marker'] = re.compile(r'{{-([^{}|\n]*?)-(?:\|[^{}\n]*?)?}}\n?')
+
+    # marker -> attribute of the field, for the fields pola() has always set
+    fields = collections.OrderedDict((('étym', 'etymology'), ('var-ortho', 'variants'), ('syn', 'synonyms'),
+                                      ('ant', 'antonyms'), ('drv', 'derives'), ('exp', 'expressions'),
+                                      ('trad', 'translations'), ('pron', 'pronunciation'), ('nom', 'noun')))
+
     def __init__(self, b, a):
-        re_lang = re.compile('==(| )?{{=(.*?)=}}')
-        s_lang = re.search(re_lang, b)
+        s_lang = SectionFr.regex['init-lang'].search(b)
         if s_lang:
             self.title = a
             self.lang = s_lang.group(2)
@@ -662,87 +1807,44 @@ class SectionFr():
         else:
             self.type = 2
 
+    def splitFields(self):
+        """
+        Returns:
+        (OrderedDict): marker name (e.g. 'étym', 'nom' for '{{-nom-|fr}}') -> Pole of its field, in the order of the
+            section
+        """
+        fields = collections.OrderedDict()
+        content = self.content
+        pos = content.find('{{-')
+        while pos != -1:
+            nextPos = content.find('{{-', pos + 3)
+            s = SectionFr.regex['pola-marker'].match(content, pos)
+            if s and s.group(1) not in fields:
+                fields[s.group(1)] = Pole.fromSpan(content, s.end(), nextPos if nextPos != -1 else len(content))
+            pos = nextPos
+        return fields
+
     def pola(self):
         if self.type == 1:
-            re_etymology = re.compile('{{-étym-}}\n(.*?){{-|$', re.DOTALL)
-            re_variants = re.compile('{{-var-ortho-}}\n(.*?){{-|$', re.DOTALL)
-            re_synonyms = re.compile('{{-syn-}}\n(.*?){{-|$', re.DOTALL)
-            re_antonyms = re.compile('{{-ant-}}\n(.*?){{-|$', re.DOTALL)
-            re_derives = re.compile('{{-drv-}}\n(.*?){{-|$', re.DOTALL)
-            re_expressions = re.compile('{{-exp-}}\n(.*?){{-|$', re.DOTALL)
-            re_translations = re.compile('{{-trad-}}\n(.*?){{-|$', re.DOTALL)
-            re_pronunciation = re.compile('{{-pron-}}\n(.*?){{-|$', re.DOTALL)
-            re_noun = re.compile('{{-nom-\|(.*?){{-|$', re.DOTALL)
-
-            s_etymology = re.search(re_etymology, self.content)
-            s_variants = re.search(re_variants, self.content)
-            s_synonyms = re.search(re_synonyms, self.content)
-            s_antonyms = re.search(re_antonyms, self.content)
-            s_derives = re.search(re_derives, self.content)
-            s_expressions = re.search(re_expressions, self.content)
-            s_translations = re.search(re_translations, self.content)
-            s_pronunciation = re.search(re_pronunciation, self.content)
-            s_noun = re.search(re_noun, self.content)
-
-
-            if s_synonyms.group(1):
-                self.synonyms = Pole(s_synonyms.group(1))
-            else:
-                self.synonyms = Pole(None)
-
-            if s_etymology.group(1):
-                self.etymology = Pole(s_etymology.group(1))
-            else:
-                self.etymology = Pole(None)
-
-            if s_variants.group(1):
-                self.variants = Pole(s_variants.group(1))
-            else:
-                self.variants = Pole(None)
-
-            if s_antonyms.group(1):
-                self.antonyms = Pole(s_antonyms.group(1))
-            else:
-                self.antonyms = Pole(None)
-
-            if s_derives.group(1):
-                self.derives = Pole(s_derives.group(1))
-            else:
-                self.derives = Pole(None)
-
-            if s_expressions.group(1):
-                self.expressions = Pole(s_expressions.group(1))
-            else:
-                self.expressions = Pole(None)
-
-            if s_translations.group(1):
-                self.translations = Pole(s_translations.group(1))
-            else:
-                self.translations = Pole(None)
-
-            if s_pronunciation.group(1):
-                self.pronunciation = Pole(s_pronunciation.group(1))
-            else:
-                self.pronunciation = Pole(None)
-
-            if s_noun.group(1):
-                self.noun = Pole(s_noun.group(1))
-                self.genre()
-            else:
-                self.noun = Pole(None)
-
-    def genre(self):
-
-        if '{{m}}' in self.noun.tresc:
-            self.genre = 'm'
-        elif '{{f}}' in self.noun.tresc:
-            self.genre = 'f'
-        elif '{{mf}}' in self.noun.tresc:
-            self.genre = 'mf'
-        elif '{{mf?}}' in self.noun.tresc:
-            self.genre = 'mf?'
+            self.subSections = self.splitFields()
+            for marker, name in SectionFr.fields.items():
+                pole = self.subSections.get(marker)
+                setattr(self, name, pole if pole is not None and pole.text else Pole(None))
+            if self.noun.text:
+                self.genre = self.nounGenre()
+
+    def nounGenre(self):
+
+        if '{{m}}' in self.noun.text:
+            return 'm'
+        elif '{{f}}' in self.noun.text:
+            return 'f'
+        elif '{{mf}}' in self.noun.text:
+            return 'mf'
+        elif '{{mf?}}' in self.noun.text:
+            return 'mf?'
         else:
-            self.genre = 'unknown'
+            return 'unknown'
 
 def pageCounter(language):
     #returns number of entries for a language
@@ -803,55 +1905,78 @@ def checkForNewDumps(lastUpdate):
     #lastUpdate is a date of the previous dump
     #returns new dump's date if found, if not returns 1
 
-    year = int(lastUpdate[:4])
-    month = int(lastUpdate[4:6])
-    day = int(lastUpdate[6:8])
-
-    lastDumpDate = datetime.datetime(year,month,day)
-    now = datetime.datetime.now() #there is no point searching in the future, so limit the loops to today's date
+    newDump = dumpCatalog.getCatalog().next(lastUpdate)
+    if newDump is None:
+        return 1
+    return newDump
 
-    checked = lastDumpDate + datetime.timedelta(days=1)
+def dumpFilename(date, multistream=False, wiki='plwiktionary'):
+    if multistream:
+        return config.path['dumps'] + '{0}/{1}-{0}-pages-articles-multistream.xml.bz2'.format(date, wiki)
+    return config.path['dumps'] + '{0}/{1}-{0}-pages-articles.xml.bz2'.format(date, wiki)
 
-    while checked <= now:
-        tempDate = checked.strftime('%Y%m%d')
-        filename = config.path['dumps'] + tempDate
+titleIndexes = {}
 
-        checked = checked + datetime.timedelta(days=1) #checking day by day
-        if os.path.isdir(filename):
-            return tempDate
-    return 1
+def getTitleIndex(date):
+    #dumpReader.TitleIndex of the multistream dump from `date`, built on first use
+    if date not in titleIndexes:
+        os.makedirs('%soutput/index' % config.path['scripts'], exist_ok=True)
+        titleIndexes[date] = dumpReader.TitleIndex(dumpFilename(date, multistream=True), '%soutput/index/titles-%s.db' % (config.path['scripts'], date))
+    return titleIndexes[date]
 
-def getListFromXML(date, findLatest=False):
+def getListFromXML(date, findLatest=False, multistream=False, processes=None, reader='lxml', namespaces=None, prefilter=None):
     #converts a wikimedia dump to a python generator of xml entries
-    #if findLatest True, it will search for the newest dump in dumps folder
+    #if findLatest True, the newest dump in dumps folder is used instead (see dumpCatalog)
+    #reader='lxml' streams minimal dumpReader.DumpPage records (id, ns, title, revisionid, sha1, text),
+    #reader='pywikibot' gives full pywikibot XmlEntry objects (contributor, comment, timestamp...)
+    #namespaces (e.g. [0]) and prefilter (literal or regex, or a list of them) are checked on the raw
+    #bytes of each page before it is decoded, see dumpReader.PageFilter; they need the lxml or multistream reader
+    #if there is a page store of the dump (see pageStore.py), the lxml reader reads from it instead of the bz2 file
+    #if multistream True, pages-articles-multistream dump and its index are used instead and
+    #the bz2 streams are decompressed and parsed in a pool of processes (os.cpu_count() by default);
+    #pages are still yielded in dump order, as dumpReader.DumpPage objects
+    #with parseStats on (parseStats.enable()), the parser numbers of the run are exported as JSON when it ends
 
-    filename = config.path['dumps'] + '{0}/plwiktionary-{0}-pages-articles.xml.bz2'.format(date)
-    
     if findLatest:
-        now = datetime.datetime.now()
-        checked = now
-        found = 0
-
-        while checked > (now - datetime.timedelta(days=90)):
-
-            tempDate = checked.strftime('%Y%m%d')
-            tempFilename = config.path['dumps'] + '{0}/plwiktionary-{0}-pages-articles.xml.bz2'.format(tempDate)
+        latest = dumpCatalog.getCatalog().latest('multistream' if multistream else 'articles')
+        if latest is not None:
+            date = latest
+
+    filename = dumpFilename(date, multistream)
+
+    pageFilter = dumpReader.PageFilter(namespaces, prefilter)
+    if pageFilter and reader != 'lxml' and not multistream:
+        raise ValueError('namespace and prefilter arguments need the lxml reader')
+
+    import pageStore
+    if reader == 'lxml' and not multistream and pageStore.storeExists(date):
+        pages = pageStore.readStore(date, pageFilter)
+    elif os.path.isfile(filename):
+        if multistream:
+            pages = dumpReader.parseMultistream(filename, processes, pageFilter=pageFilter)
+        elif reader == 'lxml':
+            pages = dumpReader.parseDump(filename, pageFilter)
+        else:
+            pages = xmlreader.XmlDump.parse(xmlreader.XmlDump(filename))
+    else:
+        print(filename)
+        raise DumpNotFound
 
-            if os.path.isfile(tempFilename):
-                found = 1
-                break
+    if parseStats.enabled:
+        return parseStats.watch(pages, date)
+    return pages
 
-            checked -= datetime.timedelta(days=1) #checking day by day
-                
-        if found:
-            filename = tempFilename
-    
-    if os.path.isfile(filename):
-        generator = xmlreader.XmlDump.parse(xmlreader.XmlDump(filename))
-        return generator
-    else:
+def getListFromFrXML(date, multistream=False, processes=None, namespaces=(0,), prefilter=None):
+    #the pages of a local fr.wiktionary dump (dumps/<date>/frwiktionary-<date>-pages-articles.xml.bz2), for HasloFrXML;
+    #the arguments are as in getListFromXML()
+    filename = dumpFilename(date, multistream, wiki='frwiktionary')
+    if not os.path.isfile(filename):
         print(filename)
         raise DumpNotFound
+    pageFilter = dumpReader.PageFilter(namespaces, prefilter)
+    if multistream:
+        return dumpReader.parseMultistream(filename, processes, pageFilter=pageFilter)
+    return dumpReader.parseDump(filename, pageFilter)
 
 
 def log(text, filename='log_all', test_mode=0):
@@ -864,6 +1989,9 @@ def log(text, filename='log_all', test_mode=0):
             file.close
 
 class HasloFr():
+    regex = {}
+    regex['langs-header'] = re.compile(r'^==\s*?{{=.*?=}}\s*?==', re.MULTILINE)
+
     def __init__(self, a):
         site = pywikibot.Site('fr', 'wiktionary')
 
@@ -883,37 +2011,26 @@ class HasloFr():
             self.type = 3
 
     def langs(self):
+        #a section runs from its '== {{=xx=}} ==' header to the next one; type 4 if there are none
         self.list_lang = []
-        re_lang = re.compile('(==\s*?{{=.*?=}}\s*?==\n.*?)$|==', re.DOTALL)
-        s_lang = re.findall(re_lang, self.content)
-        for b in s_lang:
-            self.list_lang.append(SectionFr(b, self.title))
-
-class HasloFrXML():
-    def __init__(self, a):
-        self.type = 1
-        self.title = a
-        self.page = pywikibot.Page(site, self.title)
+        starts = [s.start() for s in HasloFr.regex['langs-header'].finditer(self.content)]
+        for start, end in zip(starts, starts[1:] + [len(self.content)]):
+            self.list_lang.append(SectionFr(self.content[start:end], self.title))
+        if not self.list_lang:
+            self.type = 4
 
-        try:
-            self.content = self.page.get()
-        except pywikibot.IsRedirectPage:
-            self.type = 0
-        except pywikibot.NoPage:
-            self.type = 1
-        except pywikibot.Error:
-            self.type = 2
-        else:
-            self.type = 3
+class HasloFrXML(HasloFr):
+    """HasloFr of a page from a local fr.wiktionary dump (see getListFromFrXML()), without any queries to the wiki
 
-    def langs(self):
-        self.list_lang = []
-        re_lang = re.compile('(==\s*?{{=.*?=}}\s*?==\n.*?)$|==', re.DOTALL)
-        s_lang = re.findall(re_lang, self.content)
-        for b in s_lang:
-            self.list_lang.append(SectionFr(b, self.title))
-        else:
-            self.type = 4
+    Args:
+    entry (dumpReader.DumpPage): the page; type 5 if it isn't from the main namespace
+    """
+    def __init__(self, entry):
+        self.title = entry.title
+        self.content = entry.text
+        self.type = 3
+        if entry.ns != '0':
+            self.type = 5
 
 def dewikify(input_text):
     """
@@ -0,0 +1,191 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# map-reduce over the multistream dump: the bz2 streams are split into shards,
+# every shard is decompressed, parsed and visited in a worker process, and the
+# results of the shards are merged in dump order. Any DumpVisitor whose results
+# are kept in mergeable accumulators (listed in its `accumulators` attribute,
+# see DumpVisitor) can be run this way with the same output as in DumpEngine:
+#
+#   runParallel('20170101', [FrequencyListVisitor(), LiczJezykiVisitor()], processes=8)
+
+import collections
+import multiprocessing
+import os
+import time
+import dumpReader
+from klasa import dumpFilename
+
+
+class CountDict(dict):
+    #key -> number, e.g. the frequency ranking
+
+    def add(self, key, count=1):
+        try: self[key] += count
+        except KeyError:
+            self[key] = count
+
+    def merge(self, other):
+        for key in other:
+            self.add(key, other[key])
+        return self
+
+
+class ListDict(collections.defaultdict):
+    #key -> list, e.g. language -> titles; lists of later shards go after the earlier ones
+
+    def __init__(self, *args):
+        super(ListDict, self).__init__(list)
+
+    def merge(self, other):
+        for key in other:
+            self[key].extend(other[key])
+        return self
+
+
+class MergeSet(set):
+
+    def merge(self, other):
+        self.update(other)
+        return self
+
+
+class SampleTable(collections.OrderedDict):
+    """
+    key -> {'samples': [...], 'langs': [...]}, both without repetitions and in
+    the order they were first seen (czescimowy's table of wrong parts of speech).
+    """
+
+    def add(self, key, sample, lang):
+        if key not in self:
+            self[key] = {'samples': [], 'langs': []}
+        if sample not in self[key]['samples']:
+            self[key]['samples'].append(sample)
+        if lang not in self[key]['langs']:
+            self[key]['langs'].append(lang)
+
+    def merge(self, other):
+        for key in other:
+            if key not in self:
+                self[key] = {'samples': [], 'langs': []}
+            for field in ('samples', 'langs'):
+                self[key][field].extend(elem for elem in other[key][field] if elem not in self[key][field])
+        return self
+
+
+class PageResults(dict):
+    #page id -> result of a DeltaVisitor; shards have different pages
+
+    def merge(self, other):
+        self.update(other)
+        return self
+
+
+workerVisitors = None
+
+def initWorker(visitors):
+    global workerVisitors
+    workerVisitors = visitors
+
+def mapShard(args):
+    """
+    Parse and visit the pages of a few consecutive streams in a worker.
+
+    Returns:
+        list: for every visitor, a dict of its accumulators for this shard
+    """
+    from dumpEngine import parsePage
+    from klasa import sectionsNotFound, WrongHeader
+    ranges, pageFilter = args
+    for visitor in workerVisitors:
+        visitor.newAccumulators()
+    for streamRange in ranges:
+        for entry in dumpReader.readStream(streamRange + (pageFilter,)):
+            wanted = [visitor for visitor in workerVisitors if visitor.namespaces is None or int(entry.ns) in visitor.namespaces]
+            word = None
+            if any(visitor.parsed for visitor in wanted):
+                try: word = parsePage(entry)
+                except sectionsNotFound:
+                    pass
+                except WrongHeader:
+                    pass
+            for visitor in wanted:
+                visitor.visit(entry, word)
+    return [dict((name, getattr(visitor, name)) for name in visitor.accumulators) for visitor in workerVisitors]
+
+def runParallel(data, visitors, processes=None, streamsPerShard=10, checkpoint=None, checkpointShards=50):
+    """
+    Run the visitors over the multistream dump from `data` in a process pool.
+
+    begin() and finish() are called in this process, as in DumpEngine; the
+    visitors (with whatever begin() fetched) are copied to the workers and
+    every shard starts from empty accumulators (newAccumulators()). DeltaVisitors
+    get all pages and their results are saved for the next delta run.
+
+    Args:
+        data (str): date of the dump
+        visitors (list of DumpVisitor): visitors with `accumulators`
+        processes (int): size of the pool, os.cpu_count() by default
+        streamsPerShard (int): bz2 streams (100 pages each) handled by a worker at once
+        checkpoint (dumpEngine.Checkpoint): the merged accumulators and the
+            number of streams done are saved in it every checkpointShards
+            shards and after every finish(); a run with the checkpoint of an
+            interrupted one continues from there
+    Returns:
+        list: the visitors
+    """
+    from dumpEngine import accumulatorState
+    start = time.time()
+    filename = dumpFilename(data, multistream=True)
+    offsets = dumpReader.readMultistreamIndex(dumpReader.multistreamIndexFilename(filename))
+    ranges = dumpReader.streamRanges(filename, offsets)
+
+    namespaces = set()
+    for visitor in visitors:
+        if visitor.namespaces is None:
+            namespaces = None
+            break
+        namespaces.update(visitor.namespaces)
+    pageFilter = dumpReader.PageFilter(namespaces)
+
+    saved = {}
+    if checkpoint is not None and (checkpoint.get('parallel') or {}).get('dump') == data:
+        saved = checkpoint.get('parallel')
+        print('Resuming the scan of %s after %d streams' % (data, saved['streams']))
+    finished = list(saved.get('finished', ()))
+
+    def save(streams):
+        checkpoint.save(parallel={'dump': data, 'streams': streams, 'finished': list(finished), 'accumulators': accumulatorState(visitors)})
+
+    for visitor in visitors:
+        if visitor.getName() not in finished:
+            visitor.begin(data)
+        visitor.newAccumulators()
+        for name in saved.get('accumulators', {}).get(visitor.getName(), ()):
+            setattr(visitor, name, saved['accumulators'][visitor.getName()][name])
+
+    done = saved.get('streams', 0)
+    shards = [(ranges[i:i+streamsPerShard], pageFilter) for i in range(done, len(ranges), streamsPerShard)]
+    pool = multiprocessing.Pool(processes or os.cpu_count() or 1, initWorker, (visitors,))
+    try:
+        # imap keeps the shards in order, so lists are merged in dump order
+        for number, results in enumerate(pool.imap(mapShard, shards), 1):
+            for visitor, accumulators in zip(visitors, results):
+                for name in visitor.accumulators:
+                    getattr(visitor, name).merge(accumulators[name])
+            if checkpoint is not None and number % checkpointShards == 0:
+                save(min(done + number*streamsPerShard, len(ranges)))
+    finally:
+        pool.terminate()
+
+    for visitor in visitors:
+        if visitor.getName() in finished:
+            continue
+        visitor.finish()
+        if getattr(visitor, 'delta', False):
+            visitor.saveState(data)
+        finished.append(visitor.getName())
+        if checkpoint is not None:
+            save(len(ranges))
+    print('Dump %s: %d shards in %.1f s' % (data, len(shards), time.time() - start))
+    return visitors
@@ -3,30 +3,35 @@
 
 import pywikibot as pwb
 from klasa import *
+from dumpEngine import DeltaVisitor, runVisitors
 import config
 
 # the script looks for newly added languages (the languages for which the templates do not exist)
-def missingLangs(date):
+class MissingLangsVisitor(DeltaVisitor):
+
+    namespaces = (0,)
+    # saved results of older runs kept only the languages missing at the time; a new name makes the next run
+    # read every page instead of applying the delta to them
+    name = 'missingLangs'
 
-    pageList = getListFromXML(date)
-    wikt = pwb.Site('pl', 'wiktionary')
+    def begin(self, data):
+        LangsMediaWiki = getAllLanguages()
+        self.existing = set(a.shortName for a in LangsMediaWiki)
 
-    LangsMediaWiki = getAllLanguages()
-    existing = set(a.shortName for a in LangsMediaWiki)
+    def pageResult(self, entry, word):
+        #[title, languages of the page]; the ones with a template are left out in finish(), as the list of
+        #templates can change between two dumps
+        if word is not None and word.type == 3:
+            langs = [lang.lang for lang in word.listLangs if lang.type != 2]
+            if langs:
+                return [word.title, langs]
 
-    with open('{0}output/missingLangs.txt'.format(config.path['scripts']), encoding='utf-8', mode='w') as f:
-        for a in pageList:
+    def finish(self):
+        with open('{0}output/missingLangs.txt'.format(config.path['scripts']), encoding='utf-8', mode='w') as f:
+            for pageId, (title, langs) in self.results():
+                for lang in langs:
+                    if lang not in self.existing:
+                        f.write('{0} - {1}\n'.format(lang, title))
 
-            try: word = Haslo(a)
-            except notFromMainNamespace:
-                pass
-            except sectionsNotFound:
-                pass
-            except WrongHeader:
-                pass
-            else:
-                if word.type == 3:
-                    for lang in word.listLangs:
-                        if lang.type != 2:
-                            if lang.lang not in existing:
-                                f.write('{0} - {1}\n'.format(lang.lang, word.title))
+def missingLangs(date):
+    runVisitors(date, [MissingLangsVisitor()])
@@ -21,7 +21,7 @@ def main():
     notFoundList = collections.defaultdict(list)
 
     for a in lista_stron:
-        try: word = Haslo(a.title, a.text)
+        try: word = Haslo(a.title, a.text, languages=('arabski',))
         except notFromMainNamespace:
             pass
         except sectionsNotFound:
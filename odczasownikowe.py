@@ -10,7 +10,7 @@ from main import *
 
 def addOdczas(title):
     re_tabelkaAttr = re.compile(r'\|\s*?(z|)robienie\s*?=(.*?)(?=}}|\n)')
-    word = Haslo(title)
+    word = Haslo.fromDump(title)
 
     log = ''
     if word.type == 3 and word.listLangs:
@@ -27,7 +27,7 @@ def addOdczas(title):
                         if odczasownikowy:
                             enieaniestop = 0
                             czasownik = sekcja.title
-                            nowe = Haslo(odczasownikowy)
+                            nowe = Haslo.fromDump(odczasownikowy)
                             if nowe.type == 0:
                                 log += '*[[%s]] - redirect' % (odczasownikowy)
                             elif nowe.type == 1 and ' ' not in odczasownikowy:
@@ -46,7 +46,7 @@ def addOdczas(title):
                                     except pywikibot.NoPage:
                                         page.put(nowaSekcja.content, comment='dodanie hasła o rzeczowniku odczasownikowym na podstawie [[%s]]' % czasownik)
                             nieodczasownikowy = 'nie' + odczasownikowy
-                            nowe = Haslo(nieodczasownikowy)
+                            nowe = Haslo.fromDump(nieodczasownikowy)
                             if nowe.type == 0:
                                 log += '*[[%s]] - redirect' % (nieodczasownikowy)
                             elif nowe.type == 1 and ' ' not in nieodczasownikowy:
@@ -291,11 +291,9 @@ def get_definitions(word):
                 for checking for edit conflicts
     """
 
-    # https://regex101.com/r/sX1yF7/1
-    re_numbers = re.compile(r'\: \(([0-9]\.[0-9]{1,2})\)\s*.*')
     re_refs = re.compile(r'(<ref.*?(?:/>|</ref>))')
 
-    try: wikipage = Haslo(word)
+    try: wikipage = Haslo.fromDump(word, checkRevision=True, languages=('polski',))
     except sectionsNotFound:
         pass
     else:
@@ -303,7 +301,6 @@ def get_definitions(word):
             for langsection in wikipage.listLangs:
                 if langsection.lang == 'polski':
                     langsection.pola()
-                    nums = re.findall(re_numbers, langsection.subSections['znaczenia'].text)
 
                     return (re.sub(re_refs, '', langsection.subSections['znaczenia'].text), pwb.Page(pwb.Site(), word).editTime())
 
@@ -321,10 +318,7 @@ def log_verification(verified_entry, example_index, error=''):
 
     #format: title##bool(good_example)##verificator##example##correct_def##orphan##authors##a_title##pub_title##pub_date##channel##domain##error
 
-    #https://regex101.com/r/nN1bN2/2
-
     this_example = verified_entry['examples'][example_index]
-    re_correct_def = re.compile(r'(?:\: \(' + re.escape(this_example['correct_num']) + r'\)\s{0,1}(.*?))(?=\n\: \([0-9]\.[0-9]{1,2}\)|\n\'\'|\n\{\{|$)', re.DOTALL)
     
     todays_date = (datetime.today()).strftime('%Y%m%d')
 
@@ -337,9 +331,9 @@ def log_verification(verified_entry, example_index, error=''):
         for field in ['verificator', 'example']:
             log_line += '##' + this_example[field]
 
-        s_correct_def = re.search(re_correct_def, verified_entry['definitions'])
-        if s_correct_def:
-            log_line += '##' + s_correct_def.group(1)
+        correct_def = MeaningIndex.fromText(verified_entry['definitions']).get(this_example['correct_num'])
+        if correct_def:
+            log_line += '##' + correct_def.text
         elif this_example['bad_example'] == True:
             log_line += '##none'
         else:
@@ -412,7 +406,7 @@ def check_edit_conflicts(verified_entry, page_section):
 
 def add_example_to_page(verified_entry, revid):
         
-    try: page = Haslo(verified_entry['title'])
+    try: page = Haslo(verified_entry['title'], languages=('polski',))
     except (sectionsNotFound, WrongHeader) as e:
         pass
     else:
@@ -680,7 +674,7 @@ def write_edit_conflicts():
         not_in_page = 0
         already_added = 0
 
-        try: page = Haslo(a[0])
+        try: page = Haslo(a[0], languages=('polski',))
         except sectionsNotFound:
             pass
         else:
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# compact local copy of a pages-articles dump. bz2 decompression and xml
+# tokenizing are most of the time of a dump scan, so a dump that is going to
+# be read many times is converted once: page texts are compressed in blocks
+# with zstd (or lz4, or zlib if neither is installed) and id, ns, revision id,
+# sha1 and title are kept in separate columns. getListFromXML() reads from
+# the store when there is one for the given dump.
+
+import array
+import json
+import os
+import zlib
+import config
+import dumpReader
+from klasa import dumpFilename
+from dumpEngine import DumpVisitor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+def defaultCodec():
+    if zstandard is not None:
+        return 'zstd'
+    if lz4 is not None:
+        return 'lz4'
+    return 'zlib'
+
+def compressor(codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress
+    if codec == 'lz4':
+        return lz4.frame.compress
+    return zlib.compress
+
+def decompressor(codec):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress
+    if codec == 'lz4':
+        return lz4.frame.decompress
+    return zlib.decompress
+
+def storePath(date):
+    return config.path['dumps'] + '{0}/plwiktionary-{0}-pages-articles.store/'.format(date)
+
+def storeExists(date):
+    return os.path.isfile(storePath(date) + 'meta.json')
+
+
+class PageStoreWriter():
+    """
+    Write a page store, page by page in dump order.
+
+    Args:
+        date (str): date of the dump
+        codec (str): 'zstd', 'lz4' or 'zlib', the best available by default
+        blockSize (int): page texts are compressed together up to this many bytes
+    """
+
+    intColumns = (('ids', 'I'), ('ns', 'i'), ('revids', 'I'), ('textOffsets', 'Q'), ('blockOffsets', 'Q'), ('blockFirst', 'I'), ('titleOffsets', 'Q'))
+
+    def __init__(self, date, codec=None, blockSize=1<<20):
+        self.path = storePath(date)
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.isfile(self.path + 'meta.json'):
+            os.remove(self.path + 'meta.json')
+        self.codec = codec or defaultCodec()
+        self.compress = compressor(self.codec)
+        self.blockSize = blockSize
+        self.columns = dict((name, array.array(typecode)) for name, typecode in self.intColumns)
+        self.columns['titleOffsets'].append(0)
+        self.columns['blockOffsets'].append(0)
+        self.sha1 = []
+        self.titles = []
+        self.titleLength = 0
+        self.block = []
+        self.blockLength = 0
+        self.textFile = open(self.path + 'text.bin', 'wb')
+
+    def add(self, entry):
+        columns = self.columns
+        columns['ids'].append(int(entry.id))
+        columns['ns'].append(int(entry.ns))
+        columns['revids'].append(int(entry.revisionid))
+        self.sha1.append((getattr(entry, 'sha1', '') or '').ljust(40)[:40])
+        title = entry.title.encode('utf-8')
+        self.titles.append(title)
+        self.titleLength += len(title)
+        columns['titleOffsets'].append(self.titleLength)
+
+        if not self.block:
+            columns['blockFirst'].append(len(columns['ids']) - 1)
+        text = entry.text.encode('utf-8')
+        # offset of the page text in its (decompressed) block
+        columns['textOffsets'].append(self.blockLength)
+        self.block.append(text)
+        self.blockLength += len(text)
+        if self.blockLength >= self.blockSize:
+            self.flushBlock()
+
+    def flushBlock(self):
+        if self.block:
+            data = self.compress(b''.join(self.block))
+            self.textFile.write(data)
+            self.columns['blockOffsets'].append(self.columns['blockOffsets'][-1] + len(data))
+            # the end of the last text of the block
+            self.columns['textOffsets'].append(self.blockLength)
+            self.block = []
+            self.blockLength = 0
+
+    def close(self):
+        self.flushBlock()
+        self.textFile.close()
+        for name, typecode in self.intColumns:
+            with open(self.path + name + '.bin', 'wb') as f:
+                self.columns[name].tofile(f)
+        with open(self.path + 'sha1.txt', 'w', encoding='ascii') as f:
+            f.write(''.join(self.sha1))
+        with open(self.path + 'titles.bin', 'wb') as f:
+            f.write(b''.join(self.titles))
+        # written last, a store without it is not used
+        with open(self.path + 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump({'codec': self.codec, 'pages': len(self.columns['ids']), 'blocks': len(self.columns['blockFirst'])}, f)
+
+
+class PageStore():
+    """
+    Read a page store written by PageStoreWriter.
+
+    The text of page i of block b starts at textOffsets[i + b] in the
+    decompressed block: every block has one extra offset, the end of its last text.
+    """
+
+    def __init__(self, date):
+        self.path = storePath(date)
+        with open(self.path + 'meta.json', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.decompress = decompressor(self.meta['codec'])
+        for name, typecode in PageStoreWriter.intColumns:
+            column = array.array(typecode)
+            with open(self.path + name + '.bin', 'rb') as f:
+                column.frombytes(f.read())
+            setattr(self, name, column)
+        with open(self.path + 'sha1.txt', encoding='ascii') as f:
+            self.sha1 = f.read()
+        with open(self.path + 'titles.bin', 'rb') as f:
+            self.titles = f.read()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def title(self, i):
+        return self.titles[self.titleOffsets[i]:self.titleOffsets[i+1]].decode('utf-8')
+
+    def pages(self, pageFilter=None):
+        """
+        Yields:
+            dumpReader.DumpPage, in dump order. With a dumpReader.PageFilter, blocks
+            without a page from the wanted namespaces or ids aren't decompressed and
+            the prefilter is run on the raw text, before a page is decoded
+        """
+        blocks = len(self.blockFirst)
+        with open(self.path + 'text.bin', 'rb') as f:
+            for b in range(blocks):
+                first = self.blockFirst[b]
+                last = self.blockFirst[b+1] if b + 1 < blocks else len(self.ids)
+                if pageFilter is not None and not self.blockWanted(pageFilter, first, last):
+                    continue
+                f.seek(self.blockOffsets[b])
+                data = self.decompress(f.read(self.blockOffsets[b+1] - self.blockOffsets[b]))
+                for i in range(first, last):
+                    text = data[self.textOffsets[i+b]:self.textOffsets[i+b+1]]
+                    if pageFilter is not None and not pageFilter.matchText(self.ids[i], self.ns[i], text):
+                        continue
+                    yield dumpReader.DumpPage(str(self.ids[i]), str(self.ns[i]), self.title(i), str(self.revids[i]),
+                                              self.sha1[40*i:40*i+40].rstrip(), text.decode('utf-8'))
+
+    def blockWanted(self, pageFilter, first, last):
+        for i in range(first, last):
+            if (pageFilter.ids is None or self.ids[i] in pageFilter.ids) and (pageFilter.namespaces is None or self.ns[i] in pageFilter.namespaces):
+                return True
+        return False
+
+
+def readStore(date, pageFilter=None):
+    #getListFromXML()-compatible iterator over the store of the dump from `date`
+    return PageStore(date).pages(pageFilter or None)
+
+def convertDump(date, codec=None):
+    #convert the pages-articles dump from `date` to a page store
+    writer = PageStoreWriter(date, codec)
+    for entry in dumpReader.parseDump(dumpFilename(date)):
+        writer.add(entry)
+    writer.close()
+
+
+class PageStoreVisitor(DumpVisitor):
+    #writes the store in the afterDump scan, so that the scripts run later read it instead of the bz2 dump
+
+    parsed = False
+
+    def begin(self, data):
+        self.writer = PageStoreWriter(data)
+
+    def visit(self, entry, word):
+        self.writer.add(entry)
+
+    def finish(self):
+        self.writer.close()
+
+if __name__ == '__main__':
+    import sys
+    convertDump(sys.argv[1])
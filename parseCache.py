@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# on-disk cache of Haslo parse results, keyed by the sha1 of the page text.
+# Most pages don't change between two dumps, so a page that has already been
+# parsed (in this run or in the previous one) is rebuilt with Haslo.fromCache()
+# instead of running the parser regexes again
+
+import json
+import sqlite3
+import config
+from klasa import *
+from dumpEngine import parsePage
+
+class ParseCache():
+    """
+    Args:
+        filename (str): sqlite database, created if it doesn't exist
+        dump (str): date of the dump being read (YYYYMMDD); every record keeps
+            the date of the newest dump that used it, so that prune() can drop
+            records of old dumps
+
+    Records are dropped when `version` changes, i.e. whenever the parser in
+    klasa.py changes in a way that gives different results.
+    """
+
+    version = 2
+
+    def __init__(self, filename=None, dump=''):
+        if filename is None:
+            filename = '%soutput/parse_cache.db' % config.path['scripts']
+        self.db = sqlite3.connect(filename)
+        self.dump = dump
+        self.hits = 0
+        self.misses = 0
+        self.touched = []
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS pages (sha1 TEXT PRIMARY KEY, dump TEXT, record TEXT)')
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != self.version:
+            self.db.execute('DELETE FROM pages')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.version),))
+        self.db.commit()
+
+    def setDump(self, dump):
+        self.flush()
+        self.dump = dump
+
+    def get(self, sha1):
+        row = self.db.execute('SELECT record FROM pages WHERE sha1 = ?', (sha1,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched.append((self.dump, sha1, self.dump))
+        if len(self.touched) >= 10000:
+            self.flush()
+        return json.loads(row[0])
+
+    def put(self, sha1, record):
+        self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', (sha1, self.dump, json.dumps(record, ensure_ascii=False, separators=(',', ':'))))
+
+    def flush(self):
+        self.db.executemany('UPDATE pages SET dump = ? WHERE sha1 = ? AND dump < ?', self.touched)
+        self.touched = []
+        self.db.commit()
+
+    def prune(self, since):
+        #delete records not used by the dump from `since` or any later one
+        self.flush()
+        self.db.execute('DELETE FROM pages WHERE dump < ?', (since,))
+        self.db.commit()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def parse(self, entry):
+        """
+        Haslo(entry), from the cache if a page with the same text has been
+        parsed before. Every section goes through pola(), as in DumpEngine.
+        Raises sectionsNotFound and WrongHeader like Haslo() does.
+        """
+        sha1 = getattr(entry, 'sha1', None)
+        if not sha1 or entry.ns != '0':
+            return parsePage(entry)
+
+        record = self.get(sha1)
+        if record is not None:
+            return Haslo.fromCache(entry, record)
+
+        try: word = parsePage(entry)
+        except sectionsNotFound:
+            self.put(sha1, {'error': 'sectionsNotFound'})
+            raise
+        except WrongHeader:
+            self.put(sha1, {'error': 'WrongHeader'})
+            raise
+        self.put(sha1, word.toCache())
+        return word
+
@@ -0,0 +1,258 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# columnar store of the revision history from a stub-meta-history dump.
+# The dump is read once and every revision is kept as a row of
+# (page, rev, timestamp, user, comment), each column in its own file, so
+# questions about the history (how many reverts in 2015, who edited most
+# in a given month...) don't need another pass over the xml. Usage:
+#
+#   store = RevisionStore('20151226')
+#   for rev in store.searchComments(['nulowanie', 'ycofano'], start='2015-01-01', stop='2016-01-01'):
+#       print(rev.comment)
+
+import array
+import bisect
+import calendar
+import collections
+import datetime
+import gzip
+import bz2
+import json
+import os
+from lxml import etree
+import config
+
+# a row of the store; timestamp is in seconds since the epoch (UTC)
+Revision = collections.namedtuple('Revision', ['page', 'rev', 'timestamp', 'user', 'comment'])
+
+dayStart = {}
+
+def parseTimestamp(timestamp):
+    """
+    Parse a dump timestamp ('2015-12-26T14:03:01Z') into seconds since the epoch.
+
+    The format is fixed, so the fields are sliced out directly. The start of
+    the day is computed once per day, so most calls are just a dict lookup
+    and a few int() calls.
+    """
+    day = timestamp[:10]
+    try: start = dayStart[day]
+    except KeyError:
+        start = dayStart[day] = calendar.timegm((int(day[:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0))
+    return start + int(timestamp[11:13])*3600 + int(timestamp[14:16])*60 + int(timestamp[17:19])
+
+def toSeconds(moment):
+    #datetime (naive ones are taken as UTC), 'YYYY-MM-DD[THH:MM:SSZ]' or seconds since the epoch
+    if moment is None or isinstance(moment, int):
+        return moment
+    if isinstance(moment, datetime.datetime):
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(datetime.timezone.utc)
+        return calendar.timegm(moment.timetuple())
+    if len(moment) == 10:
+        moment += 'T00:00:00Z'
+    return parseTimestamp(moment)
+
+def historyFilename(date):
+    return config.path['dumps'] + '{0}/plwiktionary-{0}-stub-meta-history.xml.gz'.format(date)
+
+def storePath(date):
+    return '%soutput/revisions/%s/' % (config.path['scripts'], date)
+
+def readHistory(filename):
+    """
+    Stream revisions from a stub-meta-history dump.
+
+    Yields:
+        tuple: (page id, [(rev id, timestamp, user, comment), ...]) for every
+        page; timestamp is parsed with parseTimestamp(), deleted users and
+        comments are ''
+    """
+    if filename.endswith('.gz'):
+        f = gzip.open(filename, 'rb')
+    elif filename.endswith('.bz2'):
+        f = bz2.open(filename, 'rb')
+    else:
+        f = open(filename, 'rb')
+    with f:
+        for event, page in etree.iterparse(f, events=('end',), tag='{*}page'):
+            ns = page.tag[:-4]
+            pageId = int(page.findtext(ns + 'id'))
+            revisions = []
+            for revision in page.iterchildren(ns + 'revision'):
+                children = {child.tag: child for child in revision}
+                user = ''
+                contributor = children.get(ns + 'contributor')
+                if contributor is not None:
+                    user = contributor.findtext(ns + 'username') or contributor.findtext(ns + 'ip') or ''
+                comment = children.get(ns + 'comment')
+                revisions.append((int(children[ns + 'id'].text), parseTimestamp(children[ns + 'timestamp'].text),
+                                  user, comment.text or '' if comment is not None else ''))
+            yield pageId, revisions
+            page.clear()
+            while page.getprevious() is not None:
+                del page.getparent()[0]
+
+
+class RevisionStore():
+    """
+    Args:
+        date (str): date of the stub-meta-history dump; the store is built
+            from it (see historyFilename()) the first time it's opened
+        filename (str): the dump to build the store from, if it's somewhere else
+
+    Columns (one row per revision, in dump order):
+        pages: page id; revs: revision id; times: timestamp (seconds);
+        users: number of the user in self.userNames; comments: offsets into
+        the utf-8 comments file (row i is commentData[offsets[i]:offsets[i+1]]).
+    Per page: pageIds, pageFirst (first row), pageMin/pageMax (time range of
+    its revisions), so that a time range query skips whole pages.
+    """
+
+    version = 1
+    intColumns = ['pages', 'revs', 'times', 'users', 'pageIds', 'pageFirst', 'pageMin', 'pageMax']
+
+    def __init__(self, date, filename=None):
+        self.path = storePath(date)
+        if not os.path.isfile(self.path + 'meta.json'):
+            self.build(filename or historyFilename(date))
+        with open(self.path + 'meta.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != self.version:
+            self.build(filename or historyFilename(date))
+        self.load()
+
+    def build(self, filename):
+        os.makedirs(self.path, exist_ok=True)
+        columns = dict((name, array.array('I')) for name in self.intColumns)
+        offsets = array.array('Q', [0])
+        userNumbers = {}
+        with open(self.path + 'comments.bin', 'wb') as commentFile:
+            for pageId, revisions in readHistory(filename):
+                if not revisions:
+                    continue
+                columns['pageIds'].append(pageId)
+                columns['pageFirst'].append(len(columns['revs']))
+                columns['pageMin'].append(min(rev[1] for rev in revisions))
+                columns['pageMax'].append(max(rev[1] for rev in revisions))
+                for revid, timestamp, user, comment in revisions:
+                    columns['pages'].append(pageId)
+                    columns['revs'].append(revid)
+                    columns['times'].append(timestamp)
+                    try: columns['users'].append(userNumbers[user])
+                    except KeyError:
+                        userNumbers[user] = len(userNumbers)
+                        columns['users'].append(userNumbers[user])
+                    data = comment.encode('utf-8')
+                    commentFile.write(data)
+                    offsets.append(offsets[-1] + len(data))
+
+        for name in self.intColumns:
+            with open(self.path + name + '.bin', 'wb') as f:
+                columns[name].tofile(f)
+        with open(self.path + 'offsets.bin', 'wb') as f:
+            offsets.tofile(f)
+        with open(self.path + 'users.txt', encoding='utf-8', mode='w') as f:
+            for user in sorted(userNumbers, key=userNumbers.get):
+                f.write(user + '\n')
+        # written last: a store without it is incomplete and is built again
+        with open(self.path + 'meta.json', encoding='utf-8', mode='w') as f:
+            json.dump({'version': self.version, 'dump': filename, 'revisions': len(columns['revs']), 'pages': len(columns['pageIds'])}, f)
+
+    def load(self):
+        for name in self.intColumns:
+            column = array.array('I')
+            with open(self.path + name + '.bin', 'rb') as f:
+                column.frombytes(f.read())
+            setattr(self, name, column)
+        self.offsets = array.array('Q')
+        with open(self.path + 'offsets.bin', 'rb') as f:
+            self.offsets.frombytes(f.read())
+        with open(self.path + 'comments.bin', 'rb') as f:
+            self.commentData = f.read()
+        with open(self.path + 'users.txt', encoding='utf-8') as f:
+            self.userNames = f.read().split('\n')[:-1]
+
+    def __len__(self):
+        return len(self.revs)
+
+    def row(self, i):
+        return Revision(self.pages[i], self.revs[i], self.times[i], self.userNames[self.users[i]], self.comment(i))
+
+    def comment(self, i):
+        return self.commentData[self.offsets[i]:self.offsets[i+1]].decode('utf-8')
+
+    def rows(self, start=None, stop=None):
+        """
+        Numbers of rows with start <= timestamp < stop (either can be None).
+        Pages whose revisions are all outside the range are skipped without
+        looking at their rows.
+        """
+        start = toSeconds(start)
+        stop = toSeconds(stop)
+        lastRow = len(self.revs)
+        for p in range(len(self.pageIds)):
+            if (start is not None and self.pageMax[p] < start) or (stop is not None and self.pageMin[p] >= stop):
+                continue
+            first = self.pageFirst[p]
+            end = self.pageFirst[p+1] if p + 1 < len(self.pageFirst) else lastRow
+            if (start is None or self.pageMin[p] >= start) and (stop is None or self.pageMax[p] < stop):
+                yield from range(first, end)
+            else:
+                for i in range(first, end):
+                    if (start is None or self.times[i] >= start) and (stop is None or self.times[i] < stop):
+                        yield i
+
+    def searchComments(self, words, start=None, stop=None):
+        """
+        Revisions whose comment contains any of the words, with start <= timestamp < stop.
+
+        The words are searched for in the whole comments file at once and the
+        matches are mapped back to rows, so comments without them are never decoded.
+
+        Yields:
+            Revision, in dump order
+        """
+        start = toSeconds(start)
+        stop = toSeconds(stop)
+        found = set()
+        for word in words:
+            needle = word.encode('utf-8')
+            pos = self.commentData.find(needle)
+            while pos != -1:
+                i = bisect.bisect_right(self.offsets, pos) - 1
+                # a match running over the end of the comment belongs to two comments, not to this one
+                if pos + len(needle) <= self.offsets[i+1]:
+                    found.add(i)
+                pos = self.commentData.find(needle, pos + 1)
+        for i in sorted(found):
+            if (start is None or self.times[i] >= start) and (stop is None or self.times[i] < stop):
+                yield self.row(i)
+
+    def countByUser(self, start=None, stop=None):
+        #collections.Counter: user -> number of revisions
+        counts = collections.Counter(self.users[i] for i in self.rows(start, stop))
+        return collections.Counter(dict((self.userNames[user], counts[user]) for user in counts))
+
+    def countByPeriod(self, start=None, stop=None, period='month', user=None):
+        """
+        Returns:
+            collections.Counter: period ('2015', '2015-03' or '2015-03-14' for
+            period 'year', 'month' or 'day') -> number of revisions, optionally
+            only of the given user
+        """
+        length = {'year': 4, 'month': 7, 'day': 10}[period]
+        userNumber = None
+        if user is not None:
+            try: userNumber = self.userNames.index(user)
+            except ValueError:
+                return collections.Counter()
+        days = collections.Counter()
+        for i in self.rows(start, stop):
+            if userNumber is None or self.users[i] == userNumber:
+                days[self.times[i] // 86400] += 1
+        counts = collections.Counter()
+        for day in days:
+            counts[datetime.datetime.utcfromtimestamp(day*86400).strftime('%Y-%m-%d')[:length]] += days[day]
+        return counts
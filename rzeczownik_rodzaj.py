@@ -7,96 +7,110 @@ import re
 from pywikibot import xmlreader
 import collections
 from klasa import *
+from dumpEngine import DeltaVisitor, runVisitors
+from mapReduce import ListDict
+
+class RzeczownikRodzajVisitor(DeltaVisitor):
+
+    namespaces = (0,)
+
+    def begin(self, data):
+        self.data_slownie = data[6] + data[7] + '.' + data[4] + data[5] + '.' + data[0] + data[1] + data[2] + data[3]
+        wikt = pywikibot.Site('pl', 'wiktionary')
+        self.outputPage1 = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/1')
+        self.outputPage2 = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/2')
+        noGenderPage = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone')
+
+        forbidden = noGenderPage.get()
+        self.forbiddenList = forbidden.split('\n')
+        del self.forbiddenList[0]
+        self.forbiddenList.remove('')
+        for a in self.forbiddenList:
+            a = a.strip()
+
+        self.LangsMediaWiki = getAllLanguages()
+        gwary = ['{{poznań}}', '{{białystok}}', '{{częstochowa}}', 'gwara więzienna', '{{gwara}}', '{{góry}}', '{{kielce}}', '{{kraków}}', '{{kresy}}', '{{kujawy}}', '{{lwów}}', '{{mazowsze}}', '{{reg', '{{regionalizm', '{{warmia}}', '{{warszawa}}', '{{łódź}}', '{{śląsk}}']
+
+    def pageResult(self, entry, word):
+        #[title, [[language, number of nouns, number of nouns without gender], ...]]
+        #the excluded languages are skipped in finish(), the list can change between dumps
+        if word is None or word.type != 3:
+            return None
+        nouns = []
+        for lang in word.listLangs:
+            if lang.type == 1:
+                count = 0
+                missing = 0
+                for d in lang.znaczeniaDetail:
+                    if 'rzeczownik' in d[0] and '{{forma rzeczownika' not in d[0]:
+                        count += 1
+                        if 'rodzaj' not in d[0]:
+                            #gwara = 0
+                            #for gw in gwary:
+                            #       if gw in d[1]:
+                            #               gwara = 1
+                            #if not gwara and word.title[-1] != u'a' and word.title[-3:] != u'cki' and word.title[-3:] != u'ski':
+                            missing += 1
+                if count:
+                    nouns.append([lang.lang, count, missing])
+        if nouns:
+            return [word.title, nouns]
+
+    def finish(self):
+        notFoundList = ListDict()
+        allNounsCount = {}
+        for a in self.LangsMediaWiki:
+            allNounsCount[a.shortName] = 0
+        for pageId, (title, nouns) in self.results():
+            for lang, count, missing in nouns:
+                if lang in self.forbiddenList:
+                    continue
+                if lang in allNounsCount:
+                    allNounsCount[lang] += count
+                notFoundList[lang].extend([title]*missing)
+
+        forbiddenList = self.forbiddenList
+        lenTest = ''
+        text = 'Lista słów (część pierwsza), w których w sekcji "znaczenia" występuje "rzeczownik", lecz nie ma rodzaju. Dane z %s. Jeśli znajduje się tu język, w którym rzeczowniki nie mają rodzaju, dodaj go [[Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone|tutaj]].\n[[Wikipedysta:AlkamidBot/listy/rodzaj/2|Część druga]].\n' % (self.data_slownie)
+        text2 = 'Lista słów (część druga), w których w sekcji "znaczenia" występuje "rzeczownik", lecz nie ma rodzaju. Dane z %s. Jeśli znajduje się tu język, w którym rzeczowniki nie mają rodzaju, dodaj go [[Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone|tutaj]].\n[[Wikipedysta:AlkamidBot/listy/rodzaj/1|Część pierwsza]]\n' % (self.data_slownie)
+
+        for a in self.LangsMediaWiki:
+            if notFoundList['%s' % a.shortName] and a.shortName not in forbiddenList[0]:
+                lenTest += '== %s ==' % (a.longName)
+                for b in notFoundList['%s' % a.shortName]:
+                    lenTest += '\n*[[%s]]' % (b)
+                lenTest += '\n'
 
-def rzeczownikRodzaj(data):
+        lenHalf = len(lenTest)/2
 
-    data_slownie = data[6] + data[7] + '.' + data[4] + data[5] + '.' + data[0] + data[1] + data[2] + data[3]
-    lista_stron = getListFromXML(data)
-    wikt = pywikibot.Site('pl', 'wiktionary')
-    outputPage1 = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/1')
-    outputPage2 = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/2')
-    noGenderPage = pywikibot.Page(wikt, 'Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone')
-
-    forbidden = noGenderPage.get()
-    forbiddenList = forbidden.split('\n')
-    del forbiddenList[0]
-    forbiddenList.remove('')
-    for a in forbiddenList:
-        a = a.strip()
-
-    tempLangs = []
-
-    notFound = []
-    lenTest = ''
-    text = 'Lista słów (część pierwsza), w których w sekcji "znaczenia" występuje "rzeczownik", lecz nie ma rodzaju. Dane z %s. Jeśli znajduje się tu język, w którym rzeczowniki nie mają rodzaju, dodaj go [[Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone|tutaj]].\n[[Wikipedysta:AlkamidBot/listy/rodzaj/2|Część druga]].\n' % (data_slownie)
-    text2 = 'Lista słów (część druga), w których w sekcji "znaczenia" występuje "rzeczownik", lecz nie ma rodzaju. Dane z %s. Jeśli znajduje się tu język, w którym rzeczowniki nie mają rodzaju, dodaj go [[Wikipedysta:AlkamidBot/listy/rodzaj/wykluczone|tutaj]].\n[[Wikipedysta:AlkamidBot/listy/rodzaj/1|Część pierwsza]]\n' % (data_slownie)
-    notFoundList = collections.defaultdict(list)
-
-    LangsMediaWiki = getAllLanguages()
-    gwary = ['{{poznań}}', '{{białystok}}', '{{częstochowa}}', 'gwara więzienna', '{{gwara}}', '{{góry}}', '{{kielce}}', '{{kraków}}', '{{kresy}}', '{{kujawy}}', '{{lwów}}', '{{mazowsze}}', '{{reg', '{{regionalizm', '{{warmia}}', '{{warszawa}}', '{{łódź}}', '{{śląsk}}']
-    allNounsCount= {}
-    for a in LangsMediaWiki:
-        allNounsCount[a.shortName] = 0
-
-    for a in lista_stron:
-        try: word = Haslo(a)
-        except sectionsNotFound:
-            pass
-        except WrongHeader:
-            pass
-        else:
-            if word.type == 3:
-                for lang in word.listLangs:
-                    if lang.type != 2 and lang.lang not in forbiddenList:
-                        lang.pola()
-                        if lang.type == 1:
-                            for d in lang.znaczeniaDetail:
-                                if 'rzeczownik' in d[0] and '{{forma rzeczownika' not in d[0]:
-                                    try: allNounsCount['%s' % lang.lang] += 1
-                                    except KeyError:
-                                        pass
-                                    if 'rodzaj' not in d[0]:
-                                        #gwara = 0
-                                        #for gw in gwary:
-                                        #       if gw in d[1]:
-                                        #               gwara = 1
-                                        #if not gwara and word.title[-1] != u'a' and word.title[-3:] != u'cki' and word.title[-3:] != u'ski':
-                                        notFoundList['%s' % lang.lang].append(word.title)
-
-    for a in LangsMediaWiki:
-        if notFoundList['%s' % a.shortName] and a.shortName not in forbiddenList[0]:
-            lenTest += '== %s ==' % (a.longName)
-            for b in notFoundList['%s' % a.shortName]:
-                lenTest += '\n*[[%s]]' % (b)
-            lenTest += '\n'
-
-    lenHalf = len(lenTest)/2
-
-    for a in LangsMediaWiki:
-        if notFoundList['%s' % a.shortName] and a.shortName not in forbiddenList[0]:
-            if len(text) < lenHalf:
-                text += '== %s ==' % (a.longName)
-                text += '\nRodzaju nie posiada \'\'\'%.1f%%\'\'\' rzeczowników' % (float(len(notFoundList[a.shortName]))/float(allNounsCount[a.shortName])*100.0)
+        for a in self.LangsMediaWiki:
+            if notFoundList['%s' % a.shortName] and a.shortName not in forbiddenList[0]:
+                if len(text) < lenHalf:
+                    text += '== %s ==' % (a.longName)
+                    text += '\nRodzaju nie posiada \'\'\'%.1f%%\'\'\' rzeczowników' % (float(len(notFoundList[a.shortName]))/float(allNounsCount[a.shortName])*100.0)
 
-                for b in notFoundList['%s' % a.shortName]:
-                    text += '\n*[[%s]]' % (b)
-                text += '\n'
-            else:
-                text2 += '== %s ==' % (a.longName)
-                text2 += '\nRodzaju nie posiada \'\'\'%.1f%%\'\'\' rzeczowników' % (float(len(notFoundList[a.shortName]))/float(allNounsCount[a.shortName])*100.0)
-                for b in notFoundList['%s' % a.shortName]:
-                    text2 += '\n*[[%s]]' % (b)
-                text2 += '\n'
+                    for b in notFoundList['%s' % a.shortName]:
+                        text += '\n*[[%s]]' % (b)
+                    text += '\n'
+                else:
+                    text2 += '== %s ==' % (a.longName)
+                    text2 += '\nRodzaju nie posiada \'\'\'%.1f%%\'\'\' rzeczowników' % (float(len(notFoundList[a.shortName]))/float(allNounsCount[a.shortName])*100.0)
+                    for b in notFoundList['%s' % a.shortName]:
+                        text2 += '\n*[[%s]]' % (b)
+                    text2 += '\n'
+
+                    
+        with open('output/bez_rodzaju_1.txt', encoding='utf-8', mode='w') as f:
+            f.write(text)
 
-                
-    with open('output/bez_rodzaju_1.txt', encoding='utf-8', mode='w') as f:
-        f.write(text)
+        with open('output/bez_rodzaju_2.txt', encoding='utf-8', mode='w') as f:
+            f.write(text2)
 
-    with open('output/bez_rodzaju_2.txt', encoding='utf-8', mode='w') as f:
-        f.write(text2)
+        self.outputPage1.text = text
+        self.outputPage2.text = text2
 
-    outputPage1.text = text
-    outputPage2.text = text2
+        self.outputPage1.save(comment="Aktualizacja listy", botflag=False)
+        self.outputPage2.save(comment="Aktualizacja listy", botflag=False)
 
-    outputPage1.save(comment="Aktualizacja listy", botflag=False)
-    outputPage2.save(comment="Aktualizacja listy", botflag=False)
+def rzeczownikRodzaj(data):
+    runVisitors(data, [RzeczownikRodzajVisitor()])
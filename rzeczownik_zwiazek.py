@@ -10,20 +10,17 @@ from pywikibot import pagegenerators
 import re
 from pywikibot import xmlreader
 from klasa import *
+from dumpIndex import DumpIndex
 
 def main():
 
-    data = '20110310'
-
-    site = pywikibot.getSite()
-    cat = Category(site,'Kategoria:francuski (indeks)')
-    lista = pagegenerators.CategorizedPageGenerator(cat)
-    #lista_stron1 = xmlreader.XmlDump('plwiktionary-%s-pages-articles.xml' % data)
-
-    #lista = xmlreader.XmlDump.parse(lista_stron1)
+    #site = pywikibot.getSite()
+    #cat = Category(site,'Kategoria:francuski (indeks)')
+    #lista = pagegenerators.CategorizedPageGenerator(cat)
+    lista = DumpIndex.latest().search(languages=['hiszpański'], phrases=['rzeczownik'], namespaces=[0])
 
     for a in lista:
-        h = Haslo(a.title())
+        h = Haslo(a)
         #h = HasloXML(a.title, a.text)
         if h.type != 4 and ' ' in h.title:
             h.langs()
@@ -10,13 +10,16 @@ from pywikibot import pagegenerators
 import re
 from pywikibot import xmlreader
 from klasa import *
+from dumpIndex import DumpIndex
 
 def main():
 
     data = '20111102'
 
-    lista_stron1 = xmlreader.XmlDump('/mnt/user-store/dumps/plwiktionary/plwiktionary-%s-pages-articles.xml' % data)
-    lista_stron2 = xmlreader.XmlDump.parse(lista_stron1)
+    phrases = ['{{lm}} od', 'liczba mnoga od', 'zwykle w {{lm}}', 'zwykle w liczbie mnogiej', 'w {{lm}}', 'w liczbie mnogiej', 'l.m.']
+
+    # only the pages containing one of the phrases are read from the dump
+    lista_stron2 = DumpIndex(data).search(phrases=phrases, namespaces=[0])
     text = ''
 
     tempLangs = []
@@ -27,7 +30,7 @@ def main():
     LangsMediaWiki = getAllLanguages()
 
     for a in lista_stron2:
-        try: word = Haslo(a.title, a.text)
+        try: word = Haslo(a)
         except sectionsNotFound:
             pass
         else:
@@ -37,7 +40,7 @@ def main():
                         lang.pola()
                         if lang.type == 1 and lang.znaczeniaDetail:
                             for d in lang.znaczeniaDetail:
-                                if '{{lm}} od' in d[1] or 'liczba mnoga od' in d[1] or 'zwykle w {{lm}}' in d[1] or 'zwykle w liczbie mnogiej' in d[1] or 'w {{lm}}' in d[1] or 'w liczbie mnogiej' in d[1] or 'l.m.' in d[1]:
+                                if any(phrase in d[1] for phrase in phrases):
                                     notFoundList['%s' % lang.lang].append(word.title)
 
     for a in LangsMediaWiki:
@@ -3,20 +3,19 @@
 keywords in comments. I used it to determine how many reverts we had
 on pl.wikt in 2015"""
 
-from pywikibot import xmlreader
-import dateutil.parser as dparser
 from datetime import datetime, timezone
+from revisionStore import RevisionStore
 
-pages = xmlreader.XmlDump.parse(xmlreader.XmlDump('plwiktionary-20151226-stub-meta-history.xml.gz', allrevisions=True))
+# built from plwiktionary-20151226-stub-meta-history.xml.gz on the first run
+store = RevisionStore('20151226')
 
 i = 0
 
 start = datetime(2015, 1, 1, tzinfo=timezone.utc)
 stop = datetime(2016, 1, 1, tzinfo=timezone.utc)
 
-for a in pages:
-    if dparser.parse(a.timestamp) > start and dparser.parse(a.timestamp) < stop and a.comment and any(word in a.comment for word in ['nulowanie', 'ycofano']):
-        print(a.comment)
-        i += 1
+for a in store.searchComments(['nulowanie', 'ycofano'], start, stop):
+    print(a.comment)
+    i += 1
 
 print(i)
@@ -14,7 +14,7 @@ def checkIfExists(page):
 	
     initial_length = len(page.listLangs)
     def determine(section):
-        try: check = Haslo(section.titleHeader)
+        try: check = Haslo.fromDump(section.titleHeader, checkRevision=True, languages=('polski',))
         except sectionsNotFound:
             pass
         except WrongHeader:
@@ -11,6 +11,7 @@ from pywikibot import xmlreader
 import math
 import collections
 from klasa import *
+from dumpEngine import DumpVisitor, runVisitors
 import mwparserfromhell as mwp
 
 def countRanks(langStats):
@@ -102,6 +103,29 @@ class LangStats():
         if self.countWords:
             self.percRef = self.countRef/self.countWords*100
 
+    def merge(self, other):
+        #add up the counts of the same language from another part of the dump
+        for field in ('countWords', 'countMeans', 'countLen', 'countAudio', 'countGraph', 'countAudioAll', 'countGraphAll', 'countRef'):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+
+class LangStatsDict(dict):
+    #long language name -> LangStats, mergeable (see mapReduce.py)
+
+    def __init__(self, langs=()):
+        super(LangStatsDict, self).__init__()
+        for longName, shortName in langs:
+            self[longName] = LangStats(longName, shortName)
+
+    def merge(self, other):
+        for longName in other:
+            if longName in self:
+                self[longName].merge(other[longName])
+            else:
+                self[longName] = other[longName]
+        return self
+
 
 def deletedTemplates():
     deletedStrings = {}
@@ -235,87 +259,92 @@ def countGraph(input_text):
     return counter
 
 
-def licz_jezyki(dump_date):
+class LiczJezykiVisitor(DumpVisitor):
 
-    lista_stron2 = getListFromXML(dump_date)
+    namespaces = (0,)
+    accumulators = ('statList',)
 
-    langs = getAllLanguages()
-    statList = collections.defaultdict()
-    for a in langs:
-        if a.longName != 'termin obcy w języku polskim':
-            statList['%s' % a.longName] = LangStats(a.longName, a.shortName)
+    def __init__(self, filename='output/statystykanowa.txt'):
+        self.filename = filename
 
-    i = 1
+    def begin(self, data):
+        langs = getAllLanguages()
+        self.langs = [(a.longName, a.shortName) for a in langs if a.longName != 'termin obcy w języku polskim']
+        self.newAccumulators()
 
-    templatesToDelete = deletedTemplates()
+        self.templatesToDelete = deletedTemplates()
 
-    for a in lista_stron2:
-        #if (i<1000):
-        try: haslo = Haslo(a)
-        except sectionsNotFound:
-            pass
-        except WrongHeader:
-            pass
-        else:
-            if haslo.type != 5:
-                for b in haslo.listLangs:
-                    if b.type != 2 and b.type != 3:
-                        if b.langLong == 'termin obcy w języku polskim':
-                            b.langLong = 'język polski'
-                        if b.langLong in statList:
-                            b.pola()
-                            if not b.inflectedOnly:
-
-                                statList['%s' % b.langLong].addWord()
-                                statList['%s' % b.langLong].addLength(countLength(b.content, templatesToDelete))
-
-                                audiotmp = countAudio(b.content)
-                                graphtmp = countGraph(b.content)
-                                if audiotmp:
-                                    statList['%s' % b.langLong].addAudio()
-                                    statList['%s' % b.langLong].addAudioAll(audiotmp)
-                                if graphtmp:
-                                    statList['%s' % b.langLong].addGraph()
-                                    statList['%s' % b.langLong].addGraphAll(graphtmp)
-                                if b.type == 1:
-                                    statList['%s' % b.langLong].addMeans(meanings(b.znaczeniaDetail))
-                                    statList['%s' % b.langLong].addRef(refs(b.subSections['źródła'].text, templatesToDelete))
-
-    for c in statList:
-        statList[c].countAvgLen()
-        statList[c].countAvgMean()
-        statList[c].countPercAudio()
-        statList[c].countPercGraph()
-        statList[c].countPercRef()
-
-    text = ''
-
-    countRanks(statList)
-
-    for c in statList:
-        if statList[c].countWords:
-            text += '%s\t%.1f\t%.0f\t%.0f\t%.0f\t%.1f\t%.0f\t%.1f\t%.0f\t%.2f\t%.0f\t%.1f\t%d\t%d\t%d\t%d\t%d\t%d\t%d' % (statList[c].shortName, statList[c].avgLen, statList[c].countWords, statList[c].countLen/1000.0, statList[c].countAudio, statList[c].percAudio, statList[c].countGraph, statList[c].percGraph, statList[c].countMeans, statList[c].avgMean, statList[c].countRef, statList[c].percRef, statList[c].rank['countWords'], statList[c].rank['countMeans'], statList[c].rank['countLen'], statList[c].rank['avgLen'], statList[c].rank['percAudio'], statList[c].rank['percGraph'], statList[c].rank['percRef'])
-
-    with open(filename, encoding='utf-8', mode='w') as f:
-        f.write(text)
-    
-    return statList
+    def newAccumulators(self):
+        self.statList = LangStatsDict(self.langs)
+
+    def visit(self, entry, haslo):
+        if haslo is None or haslo.type == 5:
+            return
+
+        statList = self.statList
+        templatesToDelete = self.templatesToDelete
+        for b in haslo.listLangs:
+            if b.type != 2 and b.type != 3:
+                langLong = b.langLong
+                if langLong == 'termin obcy w języku polskim':
+                    langLong = 'język polski'
+                if langLong in statList:
+                    if not b.inflectedOnly:
+
+                        statList['%s' % langLong].addWord()
+                        statList['%s' % langLong].addLength(countLength(b.content, templatesToDelete))
+
+                        audiotmp = countAudio(b.content)
+                        graphtmp = countGraph(b.content)
+                        if audiotmp:
+                            statList['%s' % langLong].addAudio()
+                            statList['%s' % langLong].addAudioAll(audiotmp)
+                        if graphtmp:
+                            statList['%s' % langLong].addGraph()
+                            statList['%s' % langLong].addGraphAll(graphtmp)
+                        if b.type == 1:
+                            statList['%s' % langLong].addMeans(meanings(b.meanings))
+                            statList['%s' % langLong].addRef(refs(b.subSections['źródła'].text, templatesToDelete))
+
+    def finish(self):
+        statList = self.statList
+        for c in statList:
+            statList[c].countAvgLen()
+            statList[c].countAvgMean()
+            statList[c].countPercAudio()
+            statList[c].countPercGraph()
+            statList[c].countPercRef()
+
+        text = ''
+
+        countRanks(statList)
+
+        for c in statList:
+            if statList[c].countWords:
+                text += '%s\t%.1f\t%.0f\t%.0f\t%.0f\t%.1f\t%.0f\t%.1f\t%.0f\t%.2f\t%.0f\t%.1f\t%d\t%d\t%d\t%d\t%d\t%d\t%d' % (statList[c].shortName, statList[c].avgLen, statList[c].countWords, statList[c].countLen/1000.0, statList[c].countAudio, statList[c].percAudio, statList[c].countGraph, statList[c].percGraph, statList[c].countMeans, statList[c].avgMean, statList[c].countRef, statList[c].percRef, statList[c].rank['countWords'], statList[c].rank['countMeans'], statList[c].rank['countLen'], statList[c].rank['avgLen'], statList[c].rank['percAudio'], statList[c].rank['percGraph'], statList[c].rank['percRef'])
+
+        with open(self.filename, encoding='utf-8', mode='w') as f:
+            f.write(text)
+
+
+def licz_jezyki(dump_date, cache=None, processes=None):
+    visitor = LiczJezykiVisitor()
+    runVisitors(dump_date, [visitor], cache=cache, processes=processes)
+    return visitor.statList
 
 
 def meanings(input):
     """counting different meanings in each page
     """
 
-    re_count = re.compile('(\: \([0-9]\.[0-9]\))')
     counter = 0.0
 
     if input:
-        for elem in input:
-            if '{{forma' in elem[0]:
+        for partOfSpeech, numbered in input.blocks:
+            if '{{forma' in partOfSpeech:
                 continue
             else:
-                s_count = re.findall(re_count, elem[1])
-                counter += len(s_count)*1.0
+                counter += len(numbered)*1.0
 
     return counter
 
@@ -653,7 +682,9 @@ def data_stat():
         stat.save(comment='zmiana daty')
 
 
-def statystyka(oldDate, newDate):
+def statystyka(oldDate, newDate, new=None, cache=None):
+    #new - statistics of the new dump if they have already been collected by LiczJezykiVisitor (see afterDump.py)
+    #cache - parseCache.ParseCache; the old dump was parsed in the previous run, so most of its pages come from the cache
     global offline_mode
     offline_mode = 0
     global filename
@@ -669,8 +700,9 @@ def statystyka(oldDate, newDate):
     file = open(filename, 'w')
     file.close
 
-    new = licz_jezyki(data)
-    old = licz_jezyki(data_old)
+    if new is None:
+        new = licz_jezyki(data, cache)
+    old = licz_jezyki(data_old, cache)
 
     stat_wikitable(old, new)
     dlaczego(new)
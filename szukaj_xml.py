@@ -10,15 +10,18 @@ from pywikibot import pagegenerators
 import re
 from pywikibot import xmlreader
 from klasa import *
+from dumpIndex import DumpIndex
 
 def main():
 
     data = '20120316'
-    lista_stron2 = getListFromXML(data)
 
     re_nieprzechodni_dk_ndk1 = re.compile(r'\'\'czasownik( (nie|)przechodni|)\'\' \({{ndk}} \'\'(\'(.*?)\'|brak)\'\', {{dk}} \'\'(\'(.*?)\'|brak)\'\'\)')
     re_zwrotny_dk_ndk1 = re.compile(r'\'\'czasownik zwrotny\'\' \({{ndk}} \'\'(\'(.*?) (się|sobie)\'|brak)\'\', {{dk}} \'\'(\'(.*?) (się|sobie)\'|brak)\'\'\)')
 
+    # both regexes need {{ndk}} and {{dk}}, only pages with these templates are read from the dump
+    lista_stron2 = DumpIndex(data).search(templates=['ndk', 'dk'], phrases=['\'\'czasownik'], namespaces=[0])
+
     re_nieprzechodni_dk_ndk = re.compile(r'\'\'czasownik( (nie|)przechodni|)\'\' \({{ndk}} \'\'(\'(.*?)\'|brak)\'\', {{dk}} \'\'(\'(.*?)\'|brak)\'\'\)$')
     re_zwrotny_dk_ndk = re.compile(r'\'\'czasownik zwrotny\'\' \({{ndk}} \'\'(\'(.*?) (się|sobie)\'|brak)\'\', {{dk}} \'\'(\'(.*?) (się|sobie)\'|brak)\'\'\)$')
 
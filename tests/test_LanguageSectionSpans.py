@@ -0,0 +1,46 @@
+import unittest
+import klasa as plw
+
+class TestLanguageSectionSpans(unittest.TestCase):
+    # languageSectionSpans() has to find the same sections as Haslo.regex['langs-lang']
+
+    def regexSpans(self, text):
+        return [s.span(1) for s in plw.Haslo.regex['langs-lang'].finditer(text)]
+
+    def assertSameAsRegex(self, text):
+        spans = plw.languageSectionSpans(text)
+        self.assertEqual(spans, self.regexSpans(text))
+        return spans
+
+    def test_two_sections(self):
+        text = '{{podobne|kot}}\n== kot ({{język polski}}) ==\n{{znaczenia}}\n: (1.1) x\n\n== kot ({{język angielski}}) ==\n{{znaczenia}}\n: (1.1) y\n'
+        spans = self.assertSameAsRegex(text)
+        self.assertEqual(len(spans), 2)
+        self.assertTrue(text[spans[0][0]:spans[0][1]].startswith('== kot ({{język polski}}) =='))
+
+    def test_braces_before_header(self):
+        # '==' right after '{' doesn't end a section
+        self.assertSameAsRegex('== a ({{język polski}}) ==\n{{==}}\n: (1.1) x\n{{==\n== a ({{język czeski}}) ==\n: (1.1) y')
+        self.assertSameAsRegex('== a ({{język polski}}) ==\n: (1.1) x{{== a ({{język czeski}}) ==\n: (1.1) y\n')
+
+    def test_final_newline(self):
+        withNewline = self.assertSameAsRegex('== a ({{język polski}}) ==\n: (1.1) x\n')
+        withoutNewline = self.assertSameAsRegex('== a ({{język polski}}) ==\n: (1.1) x')
+        self.assertEqual(withNewline, withoutNewline)
+        self.assertSameAsRegex('== a ({{język polski}}) ==\n')
+        self.assertSameAsRegex('== a ({{język polski}}) ==')
+        self.assertSameAsRegex('== a ({{język polski}}) ==\n: (1.1) x\n\n\n')
+
+    def test_unclosed_header(self):
+        self.assertSameAsRegex('== a ({{język polski}} ==\n: (1.1) x\n')
+        self.assertSameAsRegex('== a ({{język polski}}) ==\n: (1.1) x\n== b ({{język czeski\n: (1.1) y\n')
+        self.assertSameAsRegex('== a ({{język polski ==\n: (1.1) x\n== b ({{język czeski}}) ==\n: (1.1) y\n')
+
+    def test_no_sections(self):
+        self.assertEqual(self.assertSameAsRegex(''), [])
+        self.assertEqual(self.assertSameAsRegex('bez sekcji'), [])
+        self.assertEqual(self.assertSameAsRegex('#PATRZ [[kot]]\n'), [])
+        self.assertEqual(self.assertSameAsRegex('== nagłówek ==\ntekst == inny ==\n'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+from dumpReader import PageFilter, DumpPage, filterPages, splitPages, readChunks, parseDump, xmlEscape
+
+def page(pageId, ns, title, text):
+    return ('  <page>\n    <title>%s</title>\n    <ns>%d</ns>\n    <id>%d</id>\n    <revision>\n'
+            '      <id>%d</id>\n      <sha1>s%d</sha1>\n      <text xml:space="preserve">%s</text>\n'
+            '    </revision>\n  </page>\n') % (xmlEscape(title), ns, pageId, pageId + 100, pageId, xmlEscape(text))
+
+PAGES = [(1, 0, 'kot', '== kot ({{język polski}}) ==\n{{znaczenia}}\n: (1.1) {{lm}} <ref>x</ref>'),
+         (2, 14, 'Kategoria:Koty', '[[Kategoria:Zwierzęta]]'),
+         (3, 0, 'żółw', '== żółw ({{język polski}}) ==\n{{znaczenia}}\n: (1.1) [[gad]] & "skorupa"'),
+         (4, 100, 'Aneks:Koty', 'kot {{lm}}'),
+         (5, 0, 'pies', '== pies ({{język polski}}) ==\n{{znaczenia}}\n: (1.1) [[zwierzę]]')]
+
+DUMP = ('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xml:lang="pl">\n  <siteinfo>\n'
+        '    <sitename>Wikisłownik</sitename>\n  </siteinfo>\n' + ''.join(page(*p) for p in PAGES) + '</mediawiki>\n').encode('utf-8')
+
+class TestPageFilter(unittest.TestCase):
+
+    def read(self, pageFilter, size=1<<20):
+        return [(p.id, p.title) for p in filterPages(readChunks(io.BytesIO(DUMP), size), pageFilter)]
+
+    def test_all_pages(self):
+        pages = list(filterPages(readChunks(io.BytesIO(DUMP)), PageFilter()))
+        self.assertEqual(pages[0], DumpPage('1', '0', 'kot', '101', 's1', PAGES[0][3]))
+        self.assertEqual([p.text for p in pages], [p[3] for p in PAGES])
+        self.assertFalse(PageFilter())
+
+    def test_namespaces(self):
+        self.assertEqual(self.read(PageFilter(namespaces=[0])), [('1', 'kot'), ('3', 'żółw'), ('5', 'pies')])
+        self.assertEqual(self.read(PageFilter(namespaces=[14, 100])), [('2', 'Kategoria:Koty'), ('4', 'Aneks:Koty')])
+        self.assertEqual(self.read(PageFilter(namespaces=[])), [])
+
+    def test_literal_prefilter(self):
+        # the literal is escaped like the page text in the dump
+        self.assertEqual(self.read(PageFilter(prefilter='{{lm}} <ref')), [('1', 'kot')])
+        self.assertEqual(self.read(PageFilter(prefilter='& "skorupa"')), [('3', 'żółw')])
+        self.assertEqual(self.read(PageFilter(prefilter=b'[[zwierz')), [('5', 'pies')])
+        self.assertEqual(self.read(PageFilter(prefilter='{{lm}}', namespaces=[0])), [('1', 'kot')])
+        self.assertEqual(self.read(PageFilter(prefilter=['żółw', 'pies'])), [('3', 'żółw'), ('5', 'pies')])
+
+    def test_regex_prefilter(self):
+        self.assertEqual(self.read(PageFilter(prefilter=re.compile(r'\{\{lm\}\}'))), [('1', 'kot'), ('4', 'Aneks:Koty')])
+        self.assertEqual(self.read(PageFilter(prefilter=re.compile(r'\(1\.1\) \[\[(gad|zwierzę)\]\]'))), [('3', 'żółw'), ('5', 'pies')])
+        self.assertEqual(self.read(PageFilter(prefilter=re.compile(rb'<ns>14</ns>'))), [('2', 'Kategoria:Koty')])
+        self.assertEqual(self.read(PageFilter(prefilter=[re.compile('kot', re.I), 'skorupa'])),
+                         [('1', 'kot'), ('2', 'Kategoria:Koty'), ('3', 'żółw'), ('4', 'Aneks:Koty')])
+
+    def test_ids(self):
+        self.assertEqual(self.read(PageFilter(ids=['3', 4])), [('3', 'żółw'), ('4', 'Aneks:Koty')])
+
+    def test_page_split_across_chunks(self):
+        # every chunk size cuts some page (and '<page>' or '</page>' itself) in two
+        pageFilter = PageFilter(namespaces=[0], prefilter='{{znaczenia}}')
+        expected = self.read(pageFilter)
+        self.assertEqual(len(expected), 3)
+        for size in list(range(1, 40)) + [len(DUMP) // 2, len(DUMP) - 1, len(DUMP)]:
+            self.assertEqual(self.read(pageFilter, size), expected)
+            raw = list(splitPages(readChunks(io.BytesIO(DUMP), size)))
+            self.assertEqual(len(raw), len(PAGES))
+            self.assertTrue(all(r.startswith(b'<page>') and r.endswith(b'</page>') for r in raw))
+
+    def test_match_text(self):
+        # matchText() keeps the same pages as match() for text that isn't xml-escaped
+        pageFilters = [PageFilter(namespaces=[0]), PageFilter(prefilter='{{lm}} <ref'), PageFilter(prefilter='& "skorupa"'),
+                       PageFilter(prefilter=re.compile(r'\[\[(gad|zwierzę)\]\]')), PageFilter(ids=[2, 5])]
+        for pageFilter in pageFilters:
+            self.assertEqual([str(p[0]) for p in PAGES if pageFilter.matchText(p[0], p[1], p[3].encode('utf-8'))],
+                             [pageId for pageId, title in self.read(pageFilter)])
+
+    def test_parse_dump(self):
+        f = tempfile.NamedTemporaryFile(suffix='.xml', delete=False)
+        try:
+            f.write(DUMP)
+            f.close()
+            self.assertEqual([p.id for p in parseDump(f.name)], ['1', '2', '3', '4', '5'])
+            self.assertEqual(list(parseDump(f.name, PageFilter(namespaces=[0], prefilter='pies'))),
+                             [DumpPage('5', '0', 'pies', '105', 's5', PAGES[4][3])])
+        finally:
+            os.unlink(f.name)
+
+if __name__ == '__main__':
+    unittest.main()
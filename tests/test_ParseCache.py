@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+import klasa as plw
+from dumpReader import DumpPage
+from parseCache import ParseCache
+
+TEXT = """{{podobne|Kot}}
+== kot ({{język polski}}) ==
+{{wymowa}} {{IPA3|kɔt}}
+{{znaczenia}}
+''rzeczownik, rodzaj męskozwierzęcy''
+: (1.1) [[zwierzę]] [[domowy|domowe]]
+: (1.2) [[samiec]] [[kot]]a
+''czasownik''
+: (2.1) [[kocić]]
+{{odmiana}}
+{{przykłady}}
+: (1.1) ''Kot łapie myszy.''
+{{składnia}}
+{{kolokacje}}
+{{synonimy}}
+: (1.1) [[kocur]]
+{{antonimy}}
+{{hiperonimy}}
+{{hiponimy}}
+{{holonimy}}
+{{meronimy}}
+{{pokrewne}}
+{{frazeologia}}
+{{etymologia}}
+{{uwagi}}
+{{tłumaczenia}}
+* angielski: (1.1) [[cat]]
+{{źródła}}
+
+== kot ({{język czeski}}) ==
+{{wymowa}}
+{{znaczenia}}
+''rzeczownik''
+: (1.1) [[kot]]
+{{odmiana}}
+{{przykłady}}
+{{składnia}}
+{{kolokacje}}
+{{synonimy}}
+{{antonimy}}
+{{hiperonimy}}
+{{hiponimy}}
+{{holonimy}}
+{{meronimy}}
+{{pokrewne}}
+{{frazeologia}}
+{{etymologia}}
+{{uwagi}}
+{{źródła}}
+== kot ({{termin obcy w języku łacińskim|łaciński}}) ==
+{{znaczenia}}
+: bez części mowy
+"""
+
+class TestParseCache(unittest.TestCase):
+    # a page rebuilt from a cached record has to be the same as the page parsed again
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'parse_cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def entry(self, text, sha1='a1'):
+        return DumpPage('1', '0', 'kot', '5', sha1, text)
+
+    def fromCache(self, entry):
+        # parse the page once, then read it from a new cache opened on the same file
+        cache = ParseCache(filename=self.filename, dump='20170701')
+        cache.parse(entry)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        cache.close()
+        cache = ParseCache(filename=self.filename, dump='20170720')
+        haslo = cache.parse(entry)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+        return haslo
+
+    def assertSameHaslo(self, cached, fresh):
+        self.assertEqual(cached.type, fresh.type)
+        self.assertEqual(cached.title, fresh.title)
+        self.assertEqual(len(cached.listLangs), len(fresh.listLangs))
+        for c, f in zip(cached.listLangs, fresh.listLangs):
+            self.assertEqual((c.header, c.lang, c.langLong, c.type, c.inflectedOnly),
+                             (f.header, f.lang, f.langLong, f.type, f.inflectedOnly))
+            self.assertEqual(c.content, f.content)
+            self.assertEqual(list(c.subSections), list(f.subSections))
+            for name in f.subSections:
+                self.assertEqual(c.subSections[name].text, f.subSections[name].text)
+            # pola() only sets znaczeniaDetail on sections it could split into subsections
+            self.assertEqual(hasattr(c, 'znaczeniaDetail'), hasattr(f, 'znaczeniaDetail'))
+            self.assertEqual(getattr(c, 'znaczeniaDetail', None), getattr(f, 'znaczeniaDetail', None))
+        self.assertEqual(cached.pushText(), fresh.pushText())
+
+    def test_round_trip(self):
+        entry = self.entry(TEXT)
+        fresh = plw.Haslo(entry)
+        for section in fresh.listLangs:
+            section.pola()
+        self.assertEqual([section.type for section in fresh.listLangs], [1, 1, 7])
+        self.assertSameHaslo(self.fromCache(entry), fresh)
+
+    def test_in_memory_record(self):
+        entry = self.entry(TEXT)
+        fresh = plw.Haslo(entry)
+        for section in fresh.listLangs:
+            section.pola()
+        self.assertSameHaslo(plw.Haslo.fromCache(entry, fresh.toCache()), fresh)
+
+    def test_changed_cached_page(self):
+        # a page rebuilt from the cache is edited and pushed like a parsed one
+        entry = self.entry(TEXT)
+        fresh = plw.Haslo(entry)
+        for section in fresh.listLangs:
+            section.pola()
+        cached = self.fromCache(entry)
+        for haslo in (fresh, cached):
+            haslo.listLangs[0].subSections['uwagi'].text = ' zob. [[kocur]]' + haslo.listLangs[0].subSections['uwagi'].text
+            haslo.listLangs[0].saveChanges()
+        self.assertTrue(cached.changed())
+        self.assertSameHaslo(cached, fresh)
+
+    def test_errors_cached(self):
+        cache = ParseCache(filename=self.filename)
+        entry = self.entry('bez sekcji\n', sha1='b2')
+        for i in range(2):
+            with self.assertRaises(plw.sectionsNotFound):
+                cache.parse(entry)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import klasa as plw
+from dumpReader import DumpPage
+
+SECTION = """== kot ({{język %s}}) ==
+{{wymowa}}
+{{znaczenia}}
+''rzeczownik''
+: (1.1) %s
+{{odmiana}}
+{{przykłady}}
+: (1.1) ''kot''
+{{składnia}}
+{{kolokacje}}
+{{synonimy}}
+{{antonimy}}
+{{hiperonimy}}
+{{hiponimy}}
+{{holonimy}}
+{{meronimy}}
+{{pokrewne}}
+{{frazeologia}}
+{{etymologia}}
+{{uwagi}}
+{{tłumaczenia}}
+{{źródła}}"""
+
+class FakePage():
+    #records the saves push() and pushAll() make instead of saving
+
+    def __init__(self):
+        self.saves = []
+
+    def title(self):
+        return 'kot'
+
+    def save(self, comment='', asynchronous=False, callback=None, **args):
+        self.saves.append((self.text, args))
+        if callback is not None:
+            callback(self, None)
+
+class TestPushText(unittest.TestCase):
+
+    def haslo(self, text):
+        haslo = plw.Haslo(DumpPage('1', '0', 'kot', '5', '', text))
+        self.page = FakePage()
+        haslo.setBase(self.page, 5, 'TS')
+        for section in haslo.listLangs:
+            section.pola()
+        return haslo
+
+    def langs(self, text):
+        return [plw.LanguageSection(text[start:end]).lang for start, end in plw.languageSectionSpans(text)]
+
+    def test_unchanged_page_not_saved(self):
+        # the sections aren't in order and the whitespace isn't the usual one, but nothing has been changed
+        text = '{{podobne|kot}}\n' + SECTION % ('niemiecki', 'Katze') + '  \n\n\n' + SECTION % ('polski', 'kot') + '\n'
+        haslo = self.haslo(text)
+        for section in haslo.listLangs:
+            section.saveChanges()
+        self.assertFalse(haslo.changed())
+        haslo.push()
+        self.assertEqual(plw.Haslo.pushAll([haslo]), [])
+        self.assertEqual(self.page.saves, [])
+        self.assertEqual(haslo.pushText(), text.strip())
+
+    def test_one_field_changed(self):
+        sections = [SECTION % ('polski', 'kot'), SECTION % ('angielski', 'cat'), SECTION % ('niemiecki', 'Katze')]
+        text = '\n\n'.join(sections) + '\n'
+        haslo = self.haslo(text)
+        angielski = haslo.listLangs[1]
+        content = angielski.content
+        angielski.subSections['synonimy'].text = ' (1.1) [[kot]]'
+        for section in haslo.listLangs:
+            section.saveChanges()
+        self.assertEqual([section.changed() for section in haslo.listLangs], [False, True, False])
+        self.assertTrue(haslo.changed())
+        # only the changed field is written again, everything else is as it was
+        expected = '\n\n'.join([sections[0], sections[1].replace('{{synonimy}}\n', '{{synonimy}} (1.1) [[kot]]\n'), sections[2]])
+        self.assertEqual(angielski.content, content.replace('{{synonimy}}\n', '{{synonimy}} (1.1) [[kot]]\n'))
+        self.assertEqual(haslo.pushText(), expected)
+        haslo.push(myComment='test')
+        self.assertEqual([save[0] for save in self.page.saves], [expected])
+        self.assertEqual(self.page.saves[0][1]['baserevid'], 5)
+
+    def test_whitespace_between_untouched_sections(self):
+        sections = [SECTION % ('polski', 'kot'), SECTION % ('angielski', 'cat'), SECTION % ('czeski', 'kočka'), SECTION % ('niemiecki', 'Katze')]
+        text = sections[0] + '\n\n' + sections[1] + '\n \n' + sections[2] + '\n' + sections[3] + '\n'
+        haslo = self.haslo(text)
+        haslo.listLangs[0].subSections['synonimy'].text = ' (1.1) [[kot]]'
+        haslo.listLangs[0].saveChanges()
+        pushed = haslo.pushText()
+        # the sections aren't sorted again: only the first one has been changed
+        self.assertEqual(self.langs(pushed), ['polski', 'angielski', 'czeski', 'niemiecki'])
+        self.assertTrue(pushed.endswith(sections[1] + '\n \n' + sections[2] + '\n' + sections[3]))
+        self.assertTrue(pushed.startswith(sections[0].replace('{{synonimy}}\n', '{{synonimy}} (1.1) [[kot]]\n') + '\n\n'))
+
+    def test_added_section_sorted(self):
+        text = '\n\n'.join([SECTION % ('polski', 'kot'), SECTION % ('angielski', 'cat'), SECTION % ('niemiecki', 'Katze')])
+        haslo = self.haslo(text)
+        czeski = plw.LanguageSection(SECTION % ('czeski', 'kočka'), 'kot')
+        czeski.pola()
+        czeski.saveChanges()
+        haslo.addSection(czeski)
+        self.assertTrue(haslo.changed())
+        self.assertEqual(self.langs(haslo.pushText()), ['polski', 'angielski', 'czeski', 'niemiecki'])
+
+    def test_removed_section_sorted(self):
+        # a page out of order is sorted when a section is removed from it
+        text = '\n\n'.join([SECTION % ('niemiecki', 'Katze'), SECTION % ('polski', 'kot'), SECTION % ('czeski', 'kočka'), SECTION % ('angielski', 'cat')])
+        haslo = self.haslo(text)
+        haslo.listLangs = [section for section in haslo.listLangs if section.lang != 'czeski']
+        self.assertTrue(haslo.changed())
+        pushed = haslo.pushText()
+        self.assertEqual(self.langs(pushed), ['polski', 'angielski', 'niemiecki'])
+        # the sections themselves are copied as they were
+        self.assertIn(SECTION % ('niemiecki', 'Katze'), pushed)
+
+if __name__ == '__main__':
+    unittest.main()
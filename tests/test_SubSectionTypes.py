@@ -0,0 +1,71 @@
+import unittest
+import klasa as plw
+from dumpReader import DumpPage
+
+class TestSubSectionTypes(unittest.TestCase):
+    # types pola() gives a language section: 1 - ok, 5 - no numbered meanings, 7 - a subsection that isn't
+    # optional is missing (or out of order), 14 - the number of the last part of speech isn't the number of them
+
+    subSections = ['{{wymowa}}', "{{znaczenia}}\n''czasownik''\n: (1.1) [[robić]]", '{{odmiana}}', '{{przykłady}}',
+                   '{{składnia}}', '{{kolokacje}}', '{{synonimy}}', '{{antonimy}}', '{{hiperonimy}}', '{{hiponimy}}',
+                   '{{holonimy}}', '{{meronimy}}', '{{pokrewne}}', '{{frazeologia}}', '{{etymologia}}', '{{uwagi}}',
+                   '{{tłumaczenia}}', '{{źródła}}']
+
+    def section(self, subSections):
+        text = '== a ({{język polski}}) ==\n' + '\n'.join(subSections) + '\n'
+        haslo = plw.Haslo(DumpPage('1', '0', 'a', '1', '', text))
+        section = haslo.listLangs[0]
+        section.pola()
+        return section
+
+    def withMeanings(self, znaczenia):
+        subSections = list(self.subSections)
+        subSections[1] = '{{znaczenia}}\n' + znaczenia
+        return self.section(subSections)
+
+    def test_ok(self):
+        section = self.section(self.subSections)
+        self.assertEqual(section.type, 1)
+        self.assertEqual(section.znaczeniaDetail, [["''czasownik''", '\n: (1.1) [[robić]]']])
+
+    def test_missing_subsection(self):
+        subSections = [sub for sub in self.subSections if sub != '{{odmiana}}']
+        self.assertEqual(self.section(subSections).type, 7)
+
+    def test_missing_optional_subsection(self):
+        # nothing before {{wymowa}}: the optional 'dodatki' is empty
+        section = self.section(self.subSections)
+        self.assertEqual(section.subSections['dodatki'].text, '')
+        # the subsection before a missing optional one doesn't end, as with the regexes of generateRegexp()
+        subSections = [sub for sub in self.subSections if sub != '{{hiperonimy}}']
+        self.assertEqual(self.section(subSections).type, 7)
+
+    def test_misordered_subsections(self):
+        subSections = list(self.subSections)
+        subSections[2], subSections[3] = subSections[3], subSections[2]
+        self.assertEqual(self.section(subSections).type, 7)
+
+    def test_no_numbered_meanings(self):
+        self.assertEqual(self.withMeanings(': (1.1) [[robić]]').type, 5)
+        self.assertEqual(self.withMeanings("''czasownik''\n[[robić]]").type, 5)
+
+    def test_wrong_numbering(self):
+        self.assertEqual(self.withMeanings("''czasownik''\n: (1.1) a\n''rzeczownik''\n: (1.1) b").type, 14)
+        self.assertEqual(self.withMeanings("''czasownik''\n: (1.1) a\n''rzeczownik''\n: (3.1) b").type, 14)
+        self.assertEqual(self.withMeanings("''czasownik''\n: (1.1) a\n''rzeczownik''\n: (2.1) b\n: (2.2) c").type, 1)
+
+    def test_ten_parts_of_speech(self):
+        # znaczeniaDetail only starts a part of speech at a one-digit number, so (10.1) and the ones after it stay
+        # in the ninth one, which is the last and has the right number
+        meanings = '\n'.join("''czasownik''\n: (%d.1) a" % i for i in range(1, 11))
+        section = self.withMeanings(meanings)
+        self.assertEqual(section.type, 1)
+        self.assertEqual(len(section.znaczeniaDetail), 9)
+        self.assertEqual(self.withMeanings(meanings + "\n''rzeczownik''\n: (11.1) b").type, 1)
+        self.assertEqual(self.withMeanings(meanings + "\n''rzeczownik''\n: (1.1) b").type, 14)
+        nine = '\n'.join("''czasownik''\n: (%d.1) a" % i for i in range(1, 10))
+        self.assertEqual(self.withMeanings(nine).type, 1)
+        self.assertEqual(self.withMeanings(nine + "\n''rzeczownik''\n: (1.1) b").type, 14)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,12 +37,12 @@ def main():
     outputArchaic = set()
     re_arch = re.compile(r'{{przest}}')
     re_numMeans = re.compile(r': \([0-9]\.[0-9]\)')
-    pageList = getListFromXML('xxx', True)
+    pageList = getListFromXML('xxx', True, namespaces=[0], prefilter='{{przest}}')
 
     #below we search for all the words that are purely archaic, i.e. all its meanings have {{przest}} template. I don't know if it's not an overkill -- we could just fetch a Category?
     for page in pageList:
         if '{{przest}}' in page.text:
-            try: word = Haslo(page)
+            try: word = Haslo(page, languages=('polski',))
             except sectionsNotFound:
                 pass
             except WrongHeader: